@@ -1,31 +1,52 @@
-"""Financial Agent - Specialized agent for stock market analysis and financial data."""
+"""Financial Agent - Specialized agent for stock market analysis and financial data.
+
+Importing this module has no side effects: the model and agent are built on first use by
+get_agent(). Run it as a script to execute the example queries.
+"""
 
 # Import financial tools from the separate tools file
+import os
 import sys
+import time
 from pathlib import Path
+from typing import Optional
+from uuid import uuid4
 
+import checkpoints
 import langchain
+import market_feed
+import prefetch
+from agent_factory import lazy, start_warmup
+from cassette import Cassette
+from deadline import DeadlineExceeded, current_deadline
 from langchain.agents import create_agent
+from langchain_core.messages import AIMessage, ToolMessage
 from mlutils import print_model_info, print_response
 from model_switcher import get_model
 
 # Add current directory to path to import the tools module
 sys.path.insert(0, str(Path(__file__).parent))
 
-from tools_16 import (calculate_market_cap_change, compare_stocks,
-                      get_nse_financial_statements, get_nse_stock_price,
-                      get_us_financial_statements, get_us_stock_price)
+from tools_16 import (analyze_portfolio, calculate_market_cap_change,
+                      compare_stocks, get_nse_financial_statements,
+                      get_nse_stock_price, get_quotes,
+                      get_us_financial_statements, get_us_stock_price,
+                      lookup_ticker)
 
-print(f"Langchain version: {langchain.__version__}")
+# Stream tool calls and answer tokens as they happen in run_query (AIML_AGENT_STREAM=0 prints once at the end)
+STREAM = os.environ.get("AIML_AGENT_STREAM", "1") != "0"
 
 # Define the tools available to the financial agent
 tools = [
+    lookup_ticker,
     get_us_stock_price,
     get_nse_stock_price,
+    get_quotes,
     get_us_financial_statements,
     get_nse_financial_statements,
     calculate_market_cap_change,
     compare_stocks,
+    analyze_portfolio,
 ]
 
 # Create system prompt for the financial agent
@@ -36,74 +57,245 @@ Your capabilities include:
 - Analyzing financial statements including revenue, net income, assets, and debt
 - Comparing multiple stocks side by side
 - Calculating market capitalization changes over time
+- Analyzing whole portfolios: returns, volatility, drawdown, beta and correlations
 - Providing insights on PE ratios, 52-week ranges, and market trends
 
 Guidelines:
 - For Indian stocks (NSE), use symbols like RELIANCE, TCS, INFY, HDFCBANK
+- If a question names a company rather than a symbol and you are not sure of it, call lookup_ticker first
 - For US/international stocks, use ticker symbols like AAPL, TSLA, MSFT, GOOGL
+- For several tickers at once (watchlists, "how are X, Y and Z doing"), use get_quotes with all of them in one call
 - When comparing stocks, consider market cap, PE ratio, and price performance
 - Always provide context and analysis with the raw data
 - Format numbers clearly with appropriate currency symbols ($ for USD, ₹ for INR)
 - Be precise and professional in your financial analysis
 """
 
-# Initialize the model
-model = get_model(temperature=0)
-print_model_info(model)
 
-if model is None:
-    print("\nERROR: Failed to initialize model. Please check:")
-    print("1. For Ollama: Install langchain-ollama (pip install langchain-ollama)")
-    print("2. For llama.cpp: Install langchain-openai (pip install langchain-openai)")
-    print("3. Ensure your model provider is properly configured")
-    exit(1)
+@lazy
+def get_financial_model():
+    """Initialize the model (built on first use)."""
+    model = get_model(temperature=0)
+
+    if model is None:
+        raise RuntimeError(
+            "Failed to initialize model. Please check:\n"
+            "1. For Ollama: Install langchain-ollama (pip install langchain-ollama)\n"
+            "2. For llama.cpp: Install langchain-openai (pip install langchain-openai)\n"
+            "3. Ensure your model provider is properly configured"
+        )
+    return model
+
+
+def build_agent(model, checkpointer=None):
+    """
+    Create the financial agent around a chat model (cassette-wrapped when AGENT_CASSETTE is set).
+    With a checkpointer the conversation state is saved per thread_id (see checkpoints.py).
+    """
+    agent_tools = tools
+
+    # Record or replay model and tool traffic when AGENT_CASSETTE is set (see cassette.py)
+    cassette = Cassette.from_env()
+    if cassette is not None:
+        import atexit
+
+        model = cassette.wrap_model(model)
+        agent_tools = cassette.wrap_tools(agent_tools)
+        atexit.register(cassette.save)
+
+    return create_agent(model, agent_tools, system_prompt=system_prompt, checkpointer=checkpointer, debug=False)
+
+
+@lazy
+def get_agent():
+    """Create the financial agent on first use, with SQLite-checkpointed threads unless AIML_CHECKPOINTS=0."""
+    return build_agent(get_financial_model(), checkpoints.get_checkpointer() if checkpoints.ENABLED else None)
+
+
+def warm_up_agent():
+    """Build the agent, pre-import tool dependencies and open the model connection in the background."""
+    def build_and_get_model():
+        get_agent()
+        return get_financial_model()
+
+    return start_warmup(build_and_get_model)
+
+
+def stream_query(query: Optional[str], agent=None, thread_id: Optional[str] = None):
+    """
+    Run a financial query and yield progress events as they happen.
+
+    On a checkpointed agent the conversation is kept per thread_id: a follow-up on the same
+    thread only sends the new message. query=None resumes the thread's interrupted run (crash,
+    timeout); tool calls that had already finished are not executed again. Without a thread_id
+    a new thread is started; its id is returned in the result.
+
+    Built on the agent's "updates" and "messages" stream modes. Yields (event, data) pairs:
+
+        ("tool_call", {"id", "name", "args"})                   as soon as the model asks for a tool
+        ("tool_result", {"id", "name", "result", "latency_s"})  as each tool finishes
+        ("token", {"text"})                                     model text as it is generated
+        ("done", {...answer_query() result...})                 last event
 
-# Create the financial agent
-agent = create_agent(model, tools, system_prompt=system_prompt, debug=False)
+    Every step's latency is recorded in the result's "steps": model turns time from the end of
+    the previous step, tool calls from the model message that requested them.
 
+    Under a deadline (deadline.deadline_scope) the run stops between steps once it has expired
+    and raises DeadlineExceeded; the thread can then be resumed with query=None.
+    """
+    start = time.perf_counter()
+    agent = agent or get_agent()
+    thread_id = thread_id or uuid4().hex
+    config = {"configurable": {"thread_id": thread_id}}
 
-def run_query(query: str):
-    """Run a financial query and display the results with tool usage."""
+    # Start fetching data for the tickers named in the query while the model plans its tool calls
+    warming = prefetch.start(query or "")
+
+    tool_calls = []
+    by_id = {}
+    steps = []
+    final_answer = "No response generated"
+    first_token_s = None
+    last_step = start
+
+    # Only the new message is sent; earlier turns come from the thread's checkpoint
+    agent_input = None if query is None else {"messages": [{"role": "user", "content": query}]}
+    deadline = current_deadline()
+    stream = agent.stream(agent_input, config, stream_mode=["updates", "messages"])
+    for mode, data in stream:
+        now = time.perf_counter()
+        if deadline is not None and deadline.expired:
+            stream.close()
+            raise DeadlineExceeded(f"Query did not finish within {deadline.budget:g}s")
+        if mode == "messages":
+            # Token chunks from the model node (tool results are reported from the updates below)
+            chunk, metadata = data
+            if metadata.get("langgraph_node") == "model" and chunk.text:
+                if first_token_s is None:
+                    first_token_s = round(now - start, 3)
+                yield "token", {"text": chunk.text}
+            continue
+
+        for update in data.values():
+            for msg in update.get("messages", []) if isinstance(update, dict) else []:
+                # Model turn finished: its tool calls start now
+                if isinstance(msg, AIMessage):
+                    steps.append({"step": "model", "latency_s": round(now - last_step, 3)})
+                    for tool_call in msg.tool_calls:
+                        entry = {"id": tool_call.get("id"), "name": tool_call.get("name", "unknown"), "args": tool_call.get("args", {}), "result": None, "started": now}
+                        tool_calls.append(entry)
+                        by_id[entry["id"]] = entry
+                        yield "tool_call", {key: entry[key] for key in ("id", "name", "args")}
+                    if not msg.tool_calls:
+                        final_answer = msg.content
+
+                # One tool finished, possibly while others are still running
+                elif isinstance(msg, ToolMessage):
+                    entry = by_id.get(msg.tool_call_id)
+                    if entry is None:
+                        entry = {"id": msg.tool_call_id, "name": msg.name, "args": {}, "result": None, "started": last_step}
+                        tool_calls.append(entry)
+                    entry["result"] = msg.content
+                    latency = round(now - entry["started"], 3)
+                    steps.append({"step": entry["name"], "latency_s": latency})
+                    yield "tool_result", {"id": entry["id"], "name": entry["name"], "result": entry["result"], "latency_s": latency}
+        last_step = now
+
+    if agent.checkpointer is not None:
+        if final_answer == "No response generated" and query is None:
+            # Resuming a thread whose run had already finished: report its last answer
+            messages = agent.get_state(config).values.get("messages", [])
+            final_answer = messages[-1].content if messages else final_answer
+        checkpoints.maybe_compact()
+
+    yield "done", {
+        "query": query,
+        "thread_id": thread_id,
+        "answer": final_answer,
+        "tool_calls": [{key: entry[key] for key in ("name", "args", "result")} for entry in tool_calls],
+        "steps": steps,
+        "first_token_s": first_token_s,
+        "elapsed_s": round(time.perf_counter() - start, 3),
+        "prefetch": warming.summary() if warming.futures else None,
+    }
+
+
+def answer_query(query: Optional[str], agent=None, on_event=None, thread_id: Optional[str] = None) -> dict:
+    """
+    Run a financial query and collect the answer and tool usage (no printing).
+
+    Args:
+        query: The user's question (None resumes the thread's interrupted run)
+        agent: Agent to run (default: get_agent())
+        on_event: Optional callback(event, data) for each stream_query() event before "done"
+        thread_id: Conversation to continue (default: a new one)
+
+    Returns:
+        {"query", "thread_id", "answer", "tool_calls": [{"name", "args", "result"}], "steps", "first_token_s", "elapsed_s", "prefetch"}
+    """
+    for event, data in stream_query(query, agent, thread_id):
+        if event == "done":
+            return data
+        if on_event is not None:
+            on_event(event, data)
+
+
+def _preview(text: str, limit: int = 200) -> str:
+    return f"{text[:limit]}{'...' if len(text) > limit else ''}"
+
+
+def run_query(query: str, stream: bool = STREAM, thread_id: Optional[str] = None):
+    """Run a financial query and display the results with tool usage (live when stream=True)."""
     print(f"\n{'=' * 80}")
     print(f"Query: {query}")
     print(f"{'=' * 80}")
 
     try:
-        # Invoke the agent with the query
-        result = agent.invoke({"messages": [{"role": "user", "content": query}]})
-
-        # Extract the messages
-        messages = result.get("messages", [])
-
-        # Track and display tool usage
-        print("\nTool Usage:")
-        print("-" * 80)
-        for msg in messages:
-            # Check for AI messages with tool calls
-            if hasattr(msg, "tool_calls") and msg.tool_calls:
-                for tool_call in msg.tool_calls:
-                    tool_name = tool_call.get("name", "unknown")
-                    tool_args = tool_call.get("args", {})
-                    print(f"  Tool: {tool_name}")
-                    print(f"  Arguments: {tool_args}")
-
-            # Check for tool messages (results)
-            if hasattr(msg, "name") and msg.name:
-                tool_result = msg.content if hasattr(msg, "content") else str(msg)
-                print(f"  Result Preview: {tool_result[:200]}{'...' if len(tool_result) > 200 else ''}")
-
-        # Extract final answer
-        if messages:
-            final_message = messages[-1]
-            final_answer = final_message.content if hasattr(final_message, "content") else str(final_message)
+        if not stream:
+            result = answer_query(query, thread_id=thread_id)
+
+            # Display tool usage
+            print("\nTool Usage:")
+            print("-" * 80)
+            for tool_call in result["tool_calls"]:
+                print(f"  Tool: {tool_call['name']}")
+                print(f"  Arguments: {tool_call['args']}")
+                tool_result = tool_call["result"]
+                if tool_result is not None:
+                    print(f"  Result Preview: {_preview(tool_result)}")
+
+            print(f"\n{'─' * 80}")
+            print("Final Answer:")
+            print(f"{'─' * 80}")
+            print(result["answer"])
         else:
-            final_answer = "No response generated"
+            # Print tool calls, results and answer tokens as they arrive
+            in_text = False
+            for event, data in stream_query(query, thread_id=thread_id):
+                if event == "token":
+                    if not in_text:
+                        print(f"\n{'─' * 80}")
+                        in_text = True
+                    print(data["text"], end="", flush=True)
+                    continue
+                if in_text:
+                    print()
+                    in_text = False
+                if event == "tool_call":
+                    print(f"  → {data['name']} {data['args']}", flush=True)
+                elif event == "tool_result":
+                    print(f"  ← {data['name']} [{data['latency_s']:.2f}s] {_preview(' '.join(str(data['result']).split()))}", flush=True)
+                elif event == "done":
+                    result = data
 
-        print(f"\n{'─' * 80}")
-        print("Final Answer:")
+            timeline = " → ".join(f"{step['step']} {step['latency_s']:.2f}s" for step in result["steps"])
+            print(f"{'─' * 80}")
+            print(f"Steps: {timeline}")
+            print(f"First token {result['first_token_s']}s, total {result['elapsed_s']}s")
         print(f"{'─' * 80}")
-        print(final_answer)
-        print(f"{'─' * 80}\n")
+        if result["prefetch"]:
+            print(f"Prefetch: {result['prefetch']}")
+        print()
 
     except Exception as e:
         print(f"Error: {e}")
@@ -113,10 +305,20 @@ def run_query(query: str):
 
 # Example queries for the financial agent
 if __name__ == "__main__":
+    print(f"Langchain version: {langchain.__version__}")
+    print_model_info(get_financial_model())
+    # Pre-import yfinance/pandas/nsepython and open the model connection while the first query starts
+    warm_up_agent()
+    # Live quotes for the AIML_FEED_SYMBOLS subscriptions (no-op unless AIML_FEED_SOURCE is set)
+    market_feed.start_from_env()
+
     # US Stock queries
     run_query("What is the current stock price of Apple (AAPL)?")
     run_query("Show me the financial statements for Tesla (TSLA)")
-    run_query("Compare Apple (AAPL) and Microsoft (MSFT) stocks")
+    conversation = f"demo-{uuid4().hex[:8]}"
+    run_query("Compare Apple (AAPL) and Microsoft (MSFT) stocks", thread_id=conversation)
+    # Follow-up on the same thread: only this message is sent, the comparison comes from the checkpoint
+    run_query("Which of the two has the lower PE ratio?", thread_id=conversation)
 
     # Indian Stock queries
     run_query("What is the stock price of Reliance Industries?")
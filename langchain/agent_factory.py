@@ -0,0 +1,106 @@
+"""
+Lazy construction and background warm-up for the agents.
+
+The agent scripts build their model, bound tools and agent through lazy() builders, so
+importing them does no work; everything is created on first use and shared afterwards.
+start_warmup() optionally pre-imports the heavy tool dependencies and opens the model's
+HTTP connection in a background thread, so the first real query does not pay multi-second
+import and handshake costs.
+"""
+
+import functools
+import importlib
+import threading
+import time
+from typing import Any, Callable, Optional
+
+# Imported lazily by the tools; importing them up front takes several seconds
+WARMUP_MODULES = ("yfinance", "pandas", "numpy", "ddgs", "wikipedia", "nsepython", "python_weather")
+
+_UNSET = object()
+
+
+def lazy(builder: Callable[[], Any]) -> Callable[[], Any]:
+    """
+    Turn a zero-argument builder into a thread-safe, build-once getter.
+
+    The returned function builds the value on first call and returns the cached value
+    afterwards; concurrent first calls block until the single build finishes.
+    Call `getter.reset()` to drop the cached value.
+    """
+    lock = threading.Lock()
+    value = _UNSET
+
+    @functools.wraps(builder)
+    def getter():
+        nonlocal value
+        if value is _UNSET:
+            with lock:
+                if value is _UNSET:
+                    value = builder()
+        return value
+
+    def reset():
+        nonlocal value
+        with lock:
+            value = _UNSET
+
+    getter.reset = reset
+    return getter
+
+
+def open_model_connection(model: Any):
+    """Open the model's HTTP connection with a cheap request (no tokens generated)."""
+    model = getattr(model, "inner", None) or model  # unwrap cassette models
+
+    # ChatOpenAI: list models through the same client (and connection pool) used for chat
+    root_client = getattr(model, "root_client", None)
+    if root_client is not None:
+        root_client.models.list()
+        return
+
+    # ChatOllama
+    client = getattr(model, "_client", None)
+    if client is not None and hasattr(client, "list"):
+        client.list()
+
+
+def warm_up(get_model: Optional[Callable[[], Any]] = None, modules: tuple = WARMUP_MODULES, verbose: bool = False) -> dict:
+    """
+    Pre-import tool dependencies and open model connections.
+
+    Args:
+        get_model: Lazy getter for the model to connect (also builds it)
+        modules: Modules to import ahead of the first tool call
+        verbose: Print timings
+
+    Returns:
+        Seconds spent per step; failed steps are recorded as the error message
+    """
+    timings = {}
+    for name in modules:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(name)
+            timings[name] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            timings[name] = f"error: {e}"
+
+    if get_model is not None:
+        start = time.perf_counter()
+        try:
+            open_model_connection(get_model())
+            timings["model_connection"] = round(time.perf_counter() - start, 3)
+        except Exception as e:
+            timings["model_connection"] = f"error: {e}"
+
+    if verbose:
+        print(f"Warm-up: {timings}")
+    return timings
+
+
+def start_warmup(get_model: Optional[Callable[[], Any]] = None, modules: tuple = WARMUP_MODULES, verbose: bool = False) -> threading.Thread:
+    """Run warm_up() in a daemon thread and return it (join it to wait for completion)."""
+    thread = threading.Thread(target=warm_up, args=(get_model, modules, verbose), name="agent-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,73 @@
+"""
+A long-lived asyncio event loop running in a daemon thread.
+
+Sync tools that call async libraries usually wrap each call in asyncio.run(), which
+creates a new loop (and with it new HTTP sessions and TLS handshakes) every time.
+BackgroundLoop keeps one loop alive for the whole process, so async clients created on it
+(aiohttp sessions, python_weather clients) are reused across calls and threads.
+"""
+
+import asyncio
+import atexit
+import threading
+from typing import Any, Awaitable, Callable, Optional
+
+
+class BackgroundLoop:
+    """
+    Event loop in a daemon thread; submit coroutines from any thread with run().
+
+    Args:
+        name: Thread name (shows up in debuggers and thread dumps)
+    """
+
+    def __init__(self, name: str = "background-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """The running loop (started on first access)."""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name=self.name, daemon=True)
+                self._thread.start()
+        return self._loop
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the loop and wait for its result.
+
+        Raises:
+            TimeoutError: If it does not finish within timeout (the coroutine is cancelled)
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self, cleanup_factory: Optional[Callable[[], Awaitable]] = None, timeout: float = 5.0):
+        """
+        Optionally run a cleanup coroutine (e.g. closing sessions), then stop the loop.
+
+        cleanup_factory is only called if the loop is running, so no coroutine is created
+        (and left un-awaited) when the loop was never started.
+        """
+        if self._loop is None or self._loop.is_closed():
+            return
+        if cleanup_factory is not None:
+            try:
+                asyncio.run_coroutine_threadsafe(cleanup_factory(), self._loop).result(timeout)
+            except Exception:
+                pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+
+    def register_shutdown(self, cleanup_factory: Optional[Callable[[], Awaitable]] = None):
+        """Stop the loop at interpreter exit, running cleanup_factory() first if given."""
+        atexit.register(self.stop, cleanup_factory)
@@ -0,0 +1,205 @@
+"""
+Record/replay cassettes for LLM and tool traffic.
+
+Agents depend on a live model and live data sources (yfinance, DuckDuckGo, Wikipedia), so
+runs cannot be benchmarked reproducibly. In record mode a Cassette captures every model
+request/response and tool invocation; in replay mode it serves them back deterministically,
+optionally with the recorded latency, so Python-side overhead can be profiled offline.
+
+Usage:
+    cassette = Cassette("runs/basic_agent.jsonl.gz", mode="record")
+    model = cassette.wrap_model(get_model())
+    tools = cassette.wrap_tools(tools)
+    ...
+    cassette.save()
+
+Or set AGENT_CASSETTE=<path> and AGENT_CASSETTE_MODE=record|replay and use Cassette.from_env().
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict
+
+
+class CassetteMiss(KeyError):
+    """Raised in replay mode when the cassette has no recording for a request."""
+
+
+def _request_key(kind: str, name: str, payload: Any) -> str:
+    """Stable hash of a request, used to match replays to recordings."""
+    raw = json.dumps([kind, name, payload], sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def _message_fingerprint(message: BaseMessage) -> dict:
+    """The parts of a message that identify a request (run ids and timestamps excluded)."""
+    return {
+        "type": message.type,
+        "content": message.content,
+        "tool_calls": [{"name": c["name"], "args": c["args"]} for c in getattr(message, "tool_calls", None) or []],
+    }
+
+
+class Cassette:
+    """
+    A recording of model and tool interactions.
+
+    Args:
+        path: Cassette file (JSON lines, gzip-compressed if the name ends in .gz)
+        mode: "record" to capture live traffic, "replay" to serve it back
+        latency: "zero" to replay instantly, "recorded" to sleep for the recorded duration
+        strict: In replay, require an exact request match instead of falling back to
+            recording order (order fallback tolerates prompts that embed the current time)
+    """
+
+    def __init__(self, path: str, mode: str = "replay", latency: str = "zero", strict: bool = False):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode: {mode}. Use 'record' or 'replay'")
+        if latency not in ("zero", "recorded"):
+            raise ValueError(f"Unknown latency mode: {latency}. Use 'zero' or 'recorded'")
+
+        self.path = Path(path)
+        self.mode = mode
+        self.latency = latency
+        self.strict = strict
+        self.interactions: list[dict] = []
+        self._lock = threading.Lock()
+
+        # Replay queues: by exact request key, and by stream (kind, name) in recording order
+        self._by_key: dict[str, deque] = defaultdict(deque)
+        self._by_stream: dict[tuple, deque] = defaultdict(deque)
+        if mode == "replay":
+            self._load()
+
+    @classmethod
+    def from_env(cls) -> Optional["Cassette"]:
+        """Build a cassette from AGENT_CASSETTE / AGENT_CASSETTE_MODE / AGENT_CASSETTE_LATENCY, if set."""
+        path = os.environ.get("AGENT_CASSETTE")
+        if not path:
+            return None
+        return cls(
+            path,
+            mode=os.environ.get("AGENT_CASSETTE_MODE", "replay"),
+            latency=os.environ.get("AGENT_CASSETTE_LATENCY", "zero"),
+        )
+
+    def _open(self, mode: str):
+        if self.path.suffix == ".gz":
+            return gzip.open(self.path, mode + "t", encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    def _load(self):
+        with self._open("r") as f:
+            for line in f:
+                if line.strip():
+                    entry = json.loads(line)
+                    self.interactions.append(entry)
+                    self._by_key[entry["key"]].append(entry)
+                    self._by_stream[(entry["kind"], entry["name"])].append(entry)
+
+    def save(self):
+        """Write recorded interactions to the cassette file (record mode only)."""
+        if self.mode != "record":
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._open("w") as f:
+            for entry in self.interactions:
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.save()
+
+    def record(self, kind: str, name: str, key: str, latency: float, response: Any):
+        with self._lock:
+            self.interactions.append({"kind": kind, "name": name, "key": key, "latency": round(latency, 4), "response": response})
+
+    def replay(self, kind: str, name: str, key: str) -> Any:
+        """Return the recorded response for a request, honoring the latency mode."""
+        with self._lock:
+            queue = self._by_key.get(key)
+            if queue:
+                entry = queue.popleft()
+                self._by_stream[(kind, name)].remove(entry)
+            elif self.strict or not self._by_stream.get((kind, name)):
+                raise CassetteMiss(f"No recording for {kind} '{name}' (key {key}) in {self.path}")
+            else:
+                entry = self._by_stream[(kind, name)].popleft()
+                self._by_key[entry["key"]].remove(entry)
+
+        if self.latency == "recorded":
+            time.sleep(entry["latency"])
+        return entry["response"]
+
+    def wrap_model(self, model: BaseChatModel) -> "CassetteChatModel":
+        """Wrap a chat model so its calls are recorded or replayed."""
+        return CassetteChatModel(inner=model, cassette=self)
+
+    def wrap_tools(self, tools: list) -> list:
+        """Return copies of the tools whose invocations are recorded or replayed."""
+        return [self._wrap_tool(tool) for tool in tools]
+
+    def _wrap_tool(self, tool: Any) -> Any:
+        cassette = self
+        func = tool.func
+
+        def wrapped(*args, **kwargs):
+            key = _request_key("tool", tool.name, [args, kwargs])
+            if cassette.mode == "replay":
+                return cassette.replay("tool", tool.name, key)
+
+            start = time.perf_counter()
+            result = func(*args, **kwargs)
+            cassette.record("tool", tool.name, key, time.perf_counter() - start, result)
+            return result
+
+        return tool.model_copy(update={"func": wrapped})
+
+
+class CassetteChatModel(BaseChatModel):
+    """Chat model that records calls to an inner model, or replays them from a cassette."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    inner: Optional[Any] = None
+    cassette: Any = None
+    bound_tools: list = []
+    bind_kwargs: dict = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "cassette"
+
+    def bind_tools(self, tools: list, **kwargs: Any) -> "CassetteChatModel":
+        """Remember the tool schemas; they are bound to the inner model at call time."""
+        return self.model_copy(update={"bound_tools": [convert_to_openai_tool(t) for t in tools], "bind_kwargs": kwargs})
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        tool_names = [t["function"]["name"] for t in self.bound_tools]
+        key = _request_key("model", "chat", {"messages": [_message_fingerprint(m) for m in messages], "tools": tool_names})
+
+        if self.cassette.mode == "replay":
+            message = messages_from_dict([self.cassette.replay("model", "chat", key)])[0]
+        else:
+            runnable = self.inner.bind_tools(self.bound_tools, **self.bind_kwargs) if self.bound_tools else self.inner
+            start = time.perf_counter()
+            message = runnable.invoke(messages, stop=stop, **kwargs)
+            self.cassette.record("model", "chat", key, time.perf_counter() - start, message_to_dict(message))
+
+        if not isinstance(message, AIMessage):
+            message = AIMessage(content=message.content)
+        return ChatResult(generations=[ChatGeneration(message=message)])
@@ -0,0 +1,170 @@
+"""
+Durable agent state for the financial agent: a local SQLite checkpointer keyed by thread id.
+
+Without a checkpointer every follow-up question had to carry the whole conversation from the
+client and the agent reprocessed it from scratch. With one, LangGraph saves the graph state
+after every step under the run's thread_id, so:
+
+- a follow-up only sends the new message; the history is loaded from the checkpoint
+- a run that crashed mid-way (worker killed, tool raised) can be resumed on the same thread;
+  tool calls that already finished are read back from the saved writes instead of re-run
+
+Checkpoints live in .cache/checkpoints/agent.sqlite (AIML_CHECKPOINT_DB) in WAL mode. Only the
+latest checkpoint of a thread is needed to continue or resume it, so compact() keeps the newest
+KEEP_PER_THREAD per thread and drops threads idle for longer than MAX_IDLE_DAYS. It runs when
+the database is opened and then at most every COMPACT_INTERVAL seconds (maybe_compact()).
+
+Set AIML_CHECKPOINTS=0 to run the agent without saved state.
+
+    python checkpoints.py stats
+    python checkpoints.py compact --keep 1 --vacuum
+    python checkpoints.py delete <thread_id>
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+from uuid import UUID
+
+from agent_factory import lazy
+from mlutils import get_cache_dir
+
+ENABLED = os.environ.get("AIML_CHECKPOINTS", "1") != "0"
+KEEP_PER_THREAD = int(os.environ.get("AIML_CHECKPOINT_KEEP", 5))
+MAX_IDLE_DAYS = float(os.environ.get("AIML_CHECKPOINT_MAX_IDLE_DAYS", 30))
+COMPACT_INTERVAL = 3600
+
+_compact_lock = threading.Lock()
+_last_compact = 0.0
+
+
+def db_path() -> str:
+    """Checkpoint database file (AIML_CHECKPOINT_DB or the cache directory; created on first call)."""
+    return os.environ.get("AIML_CHECKPOINT_DB") or str(get_cache_dir("checkpoints") / "agent.sqlite")
+
+
+@lazy
+def get_checkpointer():
+    """Shared SqliteSaver for db_path() (safe to use from several worker threads), compacted on open."""
+    from langgraph.checkpoint.sqlite import SqliteSaver
+
+    conn = sqlite3.connect(db_path(), check_same_thread=False)
+    # WAL (set by SqliteSaver.setup) plus NORMAL sync: durable across process crashes, one fsync per checkpoint
+    conn.execute("PRAGMA synchronous=NORMAL")
+    saver = SqliteSaver(conn)
+    saver.setup()
+    compact(saver)
+    return saver
+
+
+def _checkpoint_time(checkpoint_id: str) -> float:
+    """Unix time encoded in a LangGraph checkpoint id (UUID v6, time-ordered)."""
+    value = UUID(checkpoint_id).int
+    ticks = ((value >> 96) << 28) | (((value >> 80) & 0xFFFF) << 12) | ((value >> 64) & 0x0FFF)
+    return (ticks - 0x01B21DD213814000) / 1e7
+
+
+def compact(saver=None, keep: int = KEEP_PER_THREAD, max_idle_days: float = MAX_IDLE_DAYS, vacuum: bool = False) -> dict:
+    """
+    Drop checkpoints that are no longer needed to continue a thread.
+
+    Args:
+        saver: SqliteSaver to compact (default: get_checkpointer())
+        keep: Newest checkpoints to keep per thread (at least 1)
+        max_idle_days: Delete whole threads whose latest checkpoint is older than this
+        vacuum: Also rebuild the database file to return the freed space to the OS
+
+    Returns:
+        {"threads_deleted", "checkpoints_deleted", "writes_deleted", "elapsed_ms"}
+    """
+    global _last_compact
+    saver = saver or get_checkpointer()
+    start = time.perf_counter()
+    cutoff = time.time() - max_idle_days * 86400
+
+    with _compact_lock, saver.cursor() as cursor:
+        cursor.execute("SELECT thread_id, MAX(checkpoint_id) FROM checkpoints GROUP BY thread_id")
+        idle = [(thread_id,) for thread_id, latest in cursor.fetchall() if _checkpoint_time(latest) < cutoff]
+        cursor.executemany("DELETE FROM checkpoints WHERE thread_id = ?", idle)
+        cursor.executemany("DELETE FROM writes WHERE thread_id = ?", idle)
+
+        # Checkpoint ids sort by creation time, so the newest are the largest
+        cursor.execute(
+            """
+            DELETE FROM checkpoints WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid, ROW_NUMBER() OVER (PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC) AS n
+                    FROM checkpoints
+                ) WHERE n > ?
+            )
+            """,
+            (max(1, keep),),
+        )
+        checkpoints_deleted = cursor.rowcount
+        # Pending writes of deleted checkpoints can never be replayed
+        cursor.execute(
+            """
+            DELETE FROM writes WHERE NOT EXISTS (
+                SELECT 1 FROM checkpoints c
+                WHERE c.thread_id = writes.thread_id AND c.checkpoint_ns = writes.checkpoint_ns AND c.checkpoint_id = writes.checkpoint_id
+            )
+            """
+        )
+        writes_deleted = cursor.rowcount
+    with saver.cursor(transaction=False) as cursor:
+        cursor.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if vacuum:
+            cursor.execute("VACUUM")
+    _last_compact = time.monotonic()
+
+    return {
+        "threads_deleted": len(idle),
+        "checkpoints_deleted": checkpoints_deleted,
+        "writes_deleted": writes_deleted,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
+
+
+def maybe_compact() -> Optional[dict]:
+    """compact() if the checkpointer is open and COMPACT_INTERVAL has passed since the last run."""
+    if not ENABLED or time.monotonic() - _last_compact < COMPACT_INTERVAL:
+        return None
+    return compact()
+
+
+def stats(saver=None) -> dict:
+    """Thread, checkpoint and pending-write counts plus the database size."""
+    saver = saver or get_checkpointer()
+    with saver.cursor(transaction=False) as cursor:
+        threads, checkpoints = cursor.execute("SELECT COUNT(DISTINCT thread_id), COUNT(*) FROM checkpoints").fetchone()
+        writes = cursor.execute("SELECT COUNT(*) FROM writes").fetchone()[0]
+    path = db_path()
+    size = sum(os.path.getsize(file) for file in (path, f"{path}-wal") if os.path.exists(file))
+    return {"path": path, "threads": threads, "checkpoints": checkpoints, "writes": writes, "size_kb": round(size / 1024, 1)}
+
+
+def delete_thread(thread_id: str):
+    """Forget a conversation."""
+    get_checkpointer().delete_thread(thread_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and compact the agent checkpoint database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("stats")
+    compact_parser = commands.add_parser("compact")
+    compact_parser.add_argument("--keep", type=int, default=KEEP_PER_THREAD)
+    compact_parser.add_argument("--max-idle-days", type=float, default=MAX_IDLE_DAYS)
+    compact_parser.add_argument("--vacuum", action="store_true")
+    delete_parser = commands.add_parser("delete")
+    delete_parser.add_argument("thread_id")
+    args = parser.parse_args()
+
+    if args.command == "compact":
+        print(compact(keep=args.keep, max_idle_days=args.max_idle_days, vacuum=args.vacuum))
+    elif args.command == "delete":
+        delete_thread(args.thread_id)
+    print(stats())
@@ -0,0 +1,592 @@
+"""
+City -> IANA timezone index used by identify_timezone.
+
+The index is built once at import: the static city map, aliases and any cities learned from
+the LLM fallback are normalized (case, accents, punctuation, transliteration) and indexed by
+character trigrams. Lookups try an exact match first, then a fuzzy match (trigram candidates
+ranked by edit distance), so typos like "Tokio" never reach the model. Cities resolved by the
+LLM are validated against zoneinfo and persisted, so each unknown city costs at most one
+model call ever.
+"""
+
+import functools
+import json
+import os
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from mlutils import get_cache_dir
+
+# Static mapping for common cities - much faster than LLM
+CITY_TIMEZONE_MAP = {
+
+    # ======================
+    # United States
+    # ======================
+    "new york": "America/New_York",
+    "nyc": "America/New_York",
+    "boston": "America/New_York",
+    "washington dc": "America/New_York",
+    "philadelphia": "America/New_York",
+    "miami": "America/New_York",
+    "orlando": "America/New_York",
+    "atlanta": "America/New_York",
+    "detroit": "America/New_York",
+    "tampa": "America/New_York",
+
+    "chicago": "America/Chicago",
+    "houston": "America/Chicago",
+    "dallas": "America/Chicago",
+    "austin": "America/Chicago",
+    "san antonio": "America/Chicago",
+    "minneapolis": "America/Chicago",
+    "st louis": "America/Chicago",
+    "nashville": "America/Chicago",
+
+    "denver": "America/Denver",
+    "boulder": "America/Denver",
+    "salt lake city": "America/Denver",
+    "albuquerque": "America/Denver",
+
+    "los angeles": "America/Los_Angeles",
+    "la": "America/Los_Angeles",
+    "san francisco": "America/Los_Angeles",
+    "san jose": "America/Los_Angeles",
+    "oakland": "America/Los_Angeles",
+    "palo alto": "America/Los_Angeles",
+    "mountain view": "America/Los_Angeles",
+    "sunnyvale": "America/Los_Angeles",
+    "seattle": "America/Los_Angeles",
+    "portland": "America/Los_Angeles",
+    "san diego": "America/Los_Angeles",
+
+    "phoenix": "America/Phoenix",  # no DST
+    "scottsdale": "America/Phoenix",
+
+    "las vegas": "America/Los_Angeles",
+
+    # ======================
+    # Canada
+    # ======================
+    "toronto": "America/Toronto",
+    "ottawa": "America/Toronto",
+    "montreal": "America/Toronto",
+    "vancouver": "America/Vancouver",
+    "calgary": "America/Edmonton",
+    "edmonton": "America/Edmonton",
+    "winnipeg": "America/Winnipeg",
+    "halifax": "America/Halifax",
+
+    # ======================
+    # United Kingdom
+    # ======================
+    "london": "Europe/London",
+    "manchester": "Europe/London",
+    "birmingham": "Europe/London",
+    "leeds": "Europe/London",
+    "edinburgh": "Europe/London",
+    "glasgow": "Europe/London",
+
+    # ======================
+    # Europe
+    # ======================
+    "paris": "Europe/Paris",
+    "marseille": "Europe/Paris",
+    "lyon": "Europe/Paris",
+
+    "berlin": "Europe/Berlin",
+    "munich": "Europe/Berlin",
+    "hamburg": "Europe/Berlin",
+    "frankfurt": "Europe/Berlin",
+
+    "amsterdam": "Europe/Amsterdam",
+    "brussels": "Europe/Brussels",
+
+    "rome": "Europe/Rome",
+    "milan": "Europe/Rome",
+    "naples": "Europe/Rome",
+
+    "madrid": "Europe/Madrid",
+    "barcelona": "Europe/Madrid",
+    "valencia": "Europe/Madrid",
+
+    "lisbon": "Europe/Lisbon",
+
+    "zurich": "Europe/Zurich",
+    "geneva": "Europe/Zurich",
+
+    "vienna": "Europe/Vienna",
+    "prague": "Europe/Prague",
+    "warsaw": "Europe/Warsaw",
+    "budapest": "Europe/Budapest",
+
+    "stockholm": "Europe/Stockholm",
+    "oslo": "Europe/Oslo",
+    "copenhagen": "Europe/Copenhagen",
+    "helsinki": "Europe/Helsinki",
+
+    "athens": "Europe/Athens",
+
+    "istanbul": "Europe/Istanbul",
+
+    "moscow": "Europe/Moscow",
+
+    # ======================
+    # India
+    # ======================
+    "mumbai": "Asia/Kolkata",
+    "bombay": "Asia/Kolkata",
+    "delhi": "Asia/Kolkata",
+    "new delhi": "Asia/Kolkata",
+    "bangalore": "Asia/Kolkata",
+    "bengaluru": "Asia/Kolkata",
+    "chennai": "Asia/Kolkata",
+    "kolkata": "Asia/Kolkata",
+    "pune": "Asia/Kolkata",
+    "hyderabad": "Asia/Kolkata",
+    "ahmedabad": "Asia/Kolkata",
+    "jaipur": "Asia/Kolkata",
+    "chandigarh": "Asia/Kolkata",
+    "kochi": "Asia/Kolkata",
+    "trivandrum": "Asia/Kolkata",
+
+    # ======================
+    # Asia
+    # ======================
+    "tokyo": "Asia/Tokyo",
+    "osaka": "Asia/Tokyo",
+    "kyoto": "Asia/Tokyo",
+
+    "seoul": "Asia/Seoul",
+
+    "beijing": "Asia/Shanghai",
+    "shanghai": "Asia/Shanghai",
+    "shenzhen": "Asia/Shanghai",
+    "guangzhou": "Asia/Shanghai",
+
+    "hong kong": "Asia/Hong_Kong",
+
+    "taipei": "Asia/Taipei",
+
+    "singapore": "Asia/Singapore",
+
+    "bangkok": "Asia/Bangkok",
+
+    "kuala lumpur": "Asia/Kuala_Lumpur",
+
+    "jakarta": "Asia/Jakarta",
+
+    "manila": "Asia/Manila",
+
+    "dubai": "Asia/Dubai",
+    "abu dhabi": "Asia/Dubai",
+
+    "riyadh": "Asia/Riyadh",
+    "jeddah": "Asia/Riyadh",
+
+    "tel aviv": "Asia/Jerusalem",
+
+    # ======================
+    # Africa
+    # ======================
+    "cairo": "Africa/Cairo",
+    "lagos": "Africa/Lagos",
+    "nairobi": "Africa/Nairobi",
+    "johannesburg": "Africa/Johannesburg",
+    "cape town": "Africa/Johannesburg",
+    "accra": "Africa/Accra",
+
+    # ======================
+    # South America
+    # ======================
+    "sao paulo": "America/Sao_Paulo",
+    "rio de janeiro": "America/Sao_Paulo",
+
+    "buenos aires": "America/Argentina/Buenos_Aires",
+
+    "santiago": "America/Santiago",
+
+    "bogota": "America/Bogota",
+
+    "lima": "America/Lima",
+
+    # ======================
+    # Australia & NZ
+    # ======================
+    "sydney": "Australia/Sydney",
+    "melbourne": "Australia/Melbourne",
+    "brisbane": "Australia/Brisbane",
+    "perth": "Australia/Perth",
+    "adelaide": "Australia/Adelaide",
+
+    "auckland": "Pacific/Auckland",
+    "wellington": "Pacific/Auckland"
+}
+
+# Historic names, local spellings and abbreviations -> canonical key in CITY_TIMEZONE_MAP
+CITY_ALIASES = {
+    "new york city": "new york",
+    "manhattan": "new york",
+    "washington": "washington dc",
+    "sf": "san francisco",
+    "saint louis": "st louis",
+    "calcutta": "kolkata",
+    "madras": "chennai",
+    "poona": "pune",
+    "cochin": "kochi",
+    "thiruvananthapuram": "trivandrum",
+    "gurgaon": "new delhi",
+    "gurugram": "new delhi",
+    "noida": "new delhi",
+    "peking": "beijing",
+    "canton": "guangzhou",
+    "munchen": "munich",
+    "roma": "rome",
+    "milano": "milan",
+    "napoli": "naples",
+    "lisboa": "lisbon",
+    "praha": "prague",
+    "wien": "vienna",
+    "warszawa": "warsaw",
+    "kobenhavn": "copenhagen",
+    "athina": "athens",
+    "moskva": "moscow",
+    "constantinople": "istanbul",
+    "bruxelles": "brussels",
+    "brussel": "brussels",
+    "geneve": "geneva",
+    "zurich hb": "zurich",
+    "rio": "rio de janeiro",
+    "kl": "kuala lumpur",
+    "hk": "hong kong",
+    "sao paulo city": "sao paulo",
+}
+
+# Everyday country names that differ from the ISO 3166 names in tzdata's iso3166.tab
+COUNTRY_ALIASES = {
+    "usa": "US",
+    "america": "US",
+    "united states of america": "US",
+    "uk": "GB",
+    "united kingdom": "GB",
+    "great britain": "GB",
+    "england": "GB",
+    "scotland": "GB",
+    "wales": "GB",
+    "northern ireland": "GB",
+    "uae": "AE",
+    "emirates": "AE",
+    "south korea": "KR",
+    "korea": "KR",
+    "north korea": "KP",
+    "holland": "NL",
+    "czechia": "CZ",
+    "turkey": "TR",
+    "turkiye": "TR",
+    "prc": "CN",
+    "bharat": "IN",
+}
+
+# First-level regions accepted after the comma ("Paris, Texas") -> ISO country code
+REGION_COUNTRIES = {
+    **dict.fromkeys(
+        [
+            "alabama", "alaska", "arizona", "arkansas", "california", "colorado", "connecticut", "delaware",
+            "florida", "georgia", "hawaii", "idaho", "illinois", "indiana", "iowa", "kansas", "kentucky",
+            "louisiana", "maine", "maryland", "massachusetts", "michigan", "minnesota", "mississippi",
+            "missouri", "montana", "nebraska", "nevada", "new hampshire", "new jersey", "new mexico",
+            "new york", "north carolina", "north dakota", "ohio", "oklahoma", "oregon", "pennsylvania",
+            "rhode island", "south carolina", "south dakota", "tennessee", "texas", "utah", "vermont",
+            "virginia", "washington", "west virginia", "wisconsin", "wyoming", "district of columbia", "dc",
+            "al", "ak", "az", "ar", "ca", "co", "ct", "de", "fl", "ga", "hi", "id", "il", "in", "ia", "ks",
+            "ky", "la", "me", "md", "ma", "mi", "mn", "ms", "mo", "mt", "ne", "nv", "nh", "nj", "nm", "ny",
+            "nc", "nd", "oh", "ok", "or", "pa", "ri", "sc", "sd", "tn", "tx", "ut", "vt", "va", "wa", "wv",
+            "wi", "wy",
+        ],
+        "US",
+    ),
+    **dict.fromkeys(
+        [
+            "alberta", "british columbia", "manitoba", "new brunswick", "newfoundland", "nova scotia",
+            "ontario", "prince edward island", "quebec", "saskatchewan", "yukon", "nunavut",
+            "northwest territories", "ab", "bc", "mb", "nb", "nl", "ns", "on", "pe", "qc", "sk", "yt",
+        ],
+        "CA",
+    ),
+    **dict.fromkeys(
+        [
+            "new south wales", "victoria", "queensland", "south australia", "western australia", "tasmania",
+            "northern territory", "australian capital territory", "nsw", "vic", "qld", "wa", "sa", "tas", "nt", "act",
+        ],
+        "AU",
+    ),
+    **dict.fromkeys(
+        [
+            "andhra pradesh", "arunachal pradesh", "assam", "bihar", "chhattisgarh", "goa", "gujarat",
+            "haryana", "himachal pradesh", "jharkhand", "karnataka", "kerala", "madhya pradesh",
+            "maharashtra", "manipur", "meghalaya", "mizoram", "nagaland", "odisha", "punjab", "rajasthan",
+            "sikkim", "tamil nadu", "telangana", "tripura", "uttar pradesh", "uttarakhand", "west bengal",
+            "delhi", "jammu and kashmir", "ladakh", "puducherry", "chandigarh",
+        ],
+        "IN",
+    ),
+}
+
+# Letters that Unicode decomposition does not reduce to ASCII
+_TRANSLITERATION = str.maketrans({"ß": "ss", "ø": "o", "æ": "ae", "œ": "oe", "ł": "l", "đ": "d", "ı": "i", "þ": "th"})
+
+LEARNED_CITIES_FILE = "learned_cities.json"
+
+
+def normalize_city(name: str) -> str:
+    """Normalize a city name: lowercase, ASCII-fold accents, drop punctuation and extra spaces."""
+    name = unicodedata.normalize("NFKD", name.lower().translate(_TRANSLITERATION))
+    name = "".join(ch for ch in name if not unicodedata.combining(ch))
+    name = re.sub(r"[^a-z0-9]+", " ", name)
+    return " ".join(name.split())
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Edit distance counting a swap of adjacent letters as one edit ("Dehli" -> "Delhi"),
+    giving up (returning limit + 1) once it must exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    before, previous = None, list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            cost = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            if before is not None and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > limit:
+            return limit + 1
+        before, previous = previous, current
+    return previous[-1]
+
+
+def _tz_table(name: str) -> list[list[str]]:
+    """Rows of a tzdata table (zone1970.tab, iso3166.tab) from the tzdata package or the system zoneinfo."""
+    try:
+        from importlib.resources import files
+
+        text = files("tzdata").joinpath("zoneinfo", name).read_text(encoding="utf-8")
+    except (ImportError, OSError):
+        try:
+            with open(os.path.join("/usr/share/zoneinfo", name), encoding="utf-8") as f:
+                text = f.read()
+        except OSError:
+            return []
+    return [line.split("\t") for line in text.splitlines() if line and not line.startswith("#")]
+
+
+@functools.lru_cache(maxsize=None)
+def zone_countries() -> dict[str, frozenset]:
+    """IANA zone -> ISO codes of the countries that use it."""
+    countries = defaultdict(set)
+    for row in _tz_table("zone1970.tab") + _tz_table("zone.tab"):
+        if len(row) >= 3:
+            countries[row[2]].update(row[0].split(","))
+    return {zone: frozenset(codes) for zone, codes in countries.items()}
+
+
+@functools.lru_cache(maxsize=None)
+def _country_zone_counts() -> dict[str, int]:
+    """ISO code -> number of IANA zones in use in the country."""
+    counts = defaultdict(int)
+    for codes in zone_countries().values():
+        for code in codes:
+            counts[code] += 1
+    return dict(counts)
+
+
+@functools.lru_cache(maxsize=None)
+def _country_codes() -> dict[str, str]:
+    """Normalized country name, alias or ISO code -> ISO code."""
+    codes = {}
+    for row in _tz_table("iso3166.tab"):
+        if len(row) >= 2:
+            codes[row[0].lower()] = row[0]
+            codes[normalize_city(row[1])] = row[0]
+            codes[normalize_city(re.sub(r"\(.*?\)", "", row[1]))] = row[0]  # "Korea (South)" -> "korea"
+    codes.update(COUNTRY_ALIASES)
+    return codes
+
+
+def qualifier_countries(qualifier: str) -> set[str]:
+    """
+    ISO codes of the countries a qualifier names ("Georgia" and "IN" are countries too). A state or
+    province only counts for a single-zone country ("Maharashtra" -> IN): elsewhere the country
+    does not pin the zone, and "Portland, Maine" must not become Portland, Oregon.
+    """
+    key = normalize_city(qualifier)
+    countries = {_country_codes().get(key)}
+    region_country = REGION_COUNTRIES.get(key)
+    if _country_zone_counts().get(region_country) == 1:
+        countries.add(region_country)
+    return countries - {None}
+
+
+def matches_qualifier(qualifier: str, timezone: str) -> bool:
+    """True if a "City, <qualifier>" qualifier names the zone's continent or region ("Indiana") or a country that pins it."""
+    key = normalize_city(qualifier)
+    if not key:
+        return True
+    if key in {normalize_city(part) for part in timezone.split("/")[:-1]}:  # "Europe", "Indiana"
+        return True
+    return bool(zone_countries().get(timezone, frozenset()) & qualifier_countries(key))
+
+
+def is_valid_timezone(timezone: str) -> bool:
+    """True if zoneinfo knows the IANA identifier."""
+    try:
+        ZoneInfo(timezone)
+        return True
+    except (ZoneInfoNotFoundError, ValueError):
+        return False
+
+
+class CityIndex:
+    """
+    Exact + fuzzy city lookup with a persistent store of learned cities.
+
+    Args:
+        cities: Mapping of city name -> IANA timezone
+        aliases: Mapping of alternate name -> city name
+        learned_path: JSON file of cities resolved by the LLM fallback (None disables persistence)
+    """
+
+    def __init__(self, cities: dict, aliases: Optional[dict] = None, learned_path: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._zones: dict[str, str] = {}
+        self._trigram_index: dict[str, set[str]] = defaultdict(set)
+        self.learned_path = learned_path
+
+        for city, timezone in cities.items():
+            self._add(city, timezone)
+        for alias, city in (aliases or {}).items():
+            if normalize_city(city) in self._zones:
+                self._add(alias, self._zones[normalize_city(city)])
+        for city, timezone in self._load_learned().items():
+            self._add(city, timezone)
+
+    def __len__(self):
+        return len(self._zones)
+
+    def _add(self, city: str, timezone: str):
+        key = normalize_city(city)
+        self._zones[key] = timezone
+        for gram in _trigrams(key):
+            self._trigram_index[gram].add(key)
+
+    def _load_learned(self) -> dict:
+        if not self.learned_path or not os.path.exists(self.learned_path):
+            return {}
+        try:
+            with open(self.learned_path, encoding="utf-8") as f:
+                learned = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {city: tz for city, tz in learned.items() if is_valid_timezone(tz)}
+
+    def exact(self, city: str) -> Optional[str]:
+        return self._zones.get(normalize_city(city))
+
+    def fuzzy(self, city: str, max_candidates: int = 20) -> Optional[str]:
+        """Timezone of the only indexed city within a typo or two of the name, else None."""
+        key = normalize_city(city)
+        if len(key) < 4:
+            return None
+
+        counts = defaultdict(int)
+        for gram in _trigrams(key):
+            for candidate in self._trigram_index.get(gram, ()):
+                counts[candidate] += 1
+        candidates = sorted(counts, key=counts.get, reverse=True)[:max_candidates]
+
+        # One typo for short names, two for long ones ("Atlantis" must not become "Atlanta")
+        limit = 1 if len(key) < 10 else 2
+        close = [candidate for candidate in candidates if edit_distance(key, candidate, limit) <= limit]
+        if len(key) < 6:
+            # Short names are often other real cities ("Nome", "Lome", "Puno"): only fix a typo
+            # inside the name, and only when a single indexed city is that close ("Tokio")
+            close = [candidate for candidate in close if candidate[0] == key[0] and candidate[-1] == key[-1]]
+            return self._zones[close[0]] if len(close) == 1 else None
+        zones = {self._zones[candidate] for candidate in close}
+        # Two plausible cities: a guess would be as likely wrong as right
+        return zones.pop() if len(zones) == 1 else None
+
+    def lookup(self, city: str, fuzzy: bool = True) -> Optional[str]:
+        """
+        Resolve a city to an IANA timezone without calling the model.
+
+        Tries the full name exactly, then the part before a comma exactly and (with fuzzy)
+        then fuzzily. A qualifier after the comma ("Paris, FR", "Pune, Maharashtra") must match
+        the zone found (see matches_qualifier), otherwise None ("Paris, Texas" is not Paris).
+        """
+        timezone = self.exact(city)
+        if timezone or "," not in city:
+            return timezone or (self.fuzzy(city) if fuzzy else None)
+
+        name, _, qualifier = city.partition(",")
+        timezone = self.exact(name) or (self.fuzzy(name) if fuzzy else None)
+        return timezone if timezone and matches_qualifier(qualifier, timezone) else None
+
+    def learn(self, city: str, timezone: str) -> bool:
+        """
+        Remember a city resolved by the LLM, after validating the timezone with zoneinfo.
+
+        Returns:
+            True if the city was added (and persisted)
+        """
+        if not normalize_city(city) or not is_valid_timezone(timezone):
+            return False
+
+        with self._lock:
+            self._add(city, timezone)
+            if self.learned_path:
+                learned = self._load_learned()
+                learned[normalize_city(city)] = timezone
+                tmp_path = f"{self.learned_path}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(learned, f, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.learned_path)
+        return True
+
+
+# Built once at import and shared by every identify_timezone call
+city_index = CityIndex(CITY_TIMEZONE_MAP, CITY_ALIASES, learned_path=str(get_cache_dir() / LEARNED_CITIES_FILE))
+
+
+def resolve_city(city: str) -> Optional[str]:
+    """
+    Resolve a city without the model: exact index match, then the compiled gazetteer (if built),
+    then a fuzzy index match. Exact and qualified gazetteer entries ("Nome", "Paris, Texas")
+    must win over a typo-distance guess from the small index, and a name the gazetteer knows
+    is never fuzzy-matched to another city.
+    """
+    timezone = city_index.lookup(city, fuzzy=False)
+    if timezone:
+        return timezone
+
+    from gazetteer import get_gazetteer
+
+    gazetteer = get_gazetteer()
+    entry = gazetteer.lookup(city) if gazetteer is not None else None
+    if entry:
+        return entry.timezone
+    if gazetteer is not None and gazetteer.candidates(city.partition(",")[0]):
+        return None
+    return city_index.lookup(city)
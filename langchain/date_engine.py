@@ -0,0 +1,223 @@
+"""
+Vectorized date arithmetic on NumPy datetime64.
+
+calculate_future_date / calculate_date_difference parse and compute one date per call and
+approximate months as 30 days. These functions take whole arrays of dates and offsets and
+are calendar-aware (month lengths, leap years):
+
+- date_differences: years/months/days breakdown plus totals in months, weeks, days, hours
+- add_offsets: add years, months and days (month-end clipping, e.g. Jan 31 + 1 month = Feb 28)
+- business_days / add_business_days: weekday-only counting via np.busday_*
+- next_weekday: next Monday/Tuesday/... on or after each date
+
+Run this file to benchmark 1M date pairs against the per-call calculate_date_difference tool:
+    python date_engine.py [--pairs 1000000]
+"""
+
+import argparse
+import time
+from datetime import date
+from typing import Optional, Union
+
+import numpy as np
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+DateInput = Union[str, list, np.ndarray]
+
+
+def parse_dates(values: DateInput) -> np.ndarray:
+    """
+    Parse dates into a datetime64[D] array.
+
+    ISO dates (YYYY-MM-DD) are parsed in one vectorized call; anything else ("13 jun 1986",
+    "today") falls back to per-item parsing.
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind == "M":
+        return values.astype("datetime64[D]")
+    if isinstance(values, str):
+        values = [values]
+
+    try:
+        return np.array(values, dtype="datetime64[D]")
+    except ValueError:
+        from dateutil import parser
+
+        def parse_one(value: str) -> np.datetime64:
+            text = str(value).strip().lower()
+            if text in ("today", "now"):
+                return np.datetime64(date.today(), "D")
+            try:
+                return np.datetime64(text, "D")
+            except ValueError:
+                return np.datetime64(parser.parse(text).date(), "D")
+
+        return np.array([parse_one(v) for v in values], dtype="datetime64[D]")
+
+
+def _civil_from_days(days: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Days since 1970-01-01 -> (year, month 1-12, day 1-31), in pure integer arithmetic.
+
+    Same result as casting to datetime64[Y]/[M], which is several times slower on large arrays.
+    """
+    z = days + 719468
+    era = np.floor_divide(z, 146097)
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = np.where(mp < 10, mp + 3, mp - 9)
+    year = yoe + era * 400 + (month <= 2)
+    return year, month, day
+
+
+def _days_from_civil(year: np.ndarray, month: np.ndarray, day: np.ndarray) -> np.ndarray:
+    """(year, month, day) -> days since 1970-01-01 (inverse of _civil_from_days)."""
+    year = year - (month <= 2)
+    era = np.floor_divide(year, 400)
+    yoe = year - era * 400
+    doy = (153 * np.where(month > 2, month - 3, month + 9) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def _month_length(year: np.ndarray, month: np.ndarray) -> np.ndarray:
+    leap = ((year % 4 == 0) & (year % 100 != 0)) | (year % 400 == 0)
+    return np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])[month] + (leap & (month == 2))
+
+
+def _add_months(days: np.ndarray, months) -> np.ndarray:
+    """Add whole months to day numbers, clipping the day to the end of the target month."""
+    year, month, day = _civil_from_days(days)
+    index = year * 12 + (month - 1) + np.asarray(months, dtype=np.int64)
+    year, month = np.floor_divide(index, 12), index % 12 + 1
+    return _days_from_civil(year, month, np.minimum(day, _month_length(year, month)))
+
+
+def add_offsets(dates: DateInput, years=0, months=0, days=0) -> np.ndarray:
+    """
+    Add calendar offsets to dates (scalars or arrays, broadcast together).
+
+    Months are added first with the day clipped to the end of the target month, then days.
+    """
+    numbers = parse_dates(dates).astype(np.int64)
+    total_months = np.asarray(years, dtype=np.int64) * 12 + np.asarray(months, dtype=np.int64)
+    return (_add_months(numbers, total_months) + np.asarray(days, dtype=np.int64)).astype("datetime64[D]")
+
+
+def date_differences(start: DateInput, end: Optional[DateInput] = None) -> dict[str, np.ndarray]:
+    """
+    Calendar-aware difference between pairs of dates (end defaults to today).
+
+    Returns:
+        Dict of arrays: years, months, days (the calendar breakdown, e.g. 39y 4m 6d),
+        total_months, total_weeks, total_days, total_hours and sign (-1 if end < start)
+    """
+    start = parse_dates(start)
+    end = parse_dates(end) if end is not None else np.datetime64(date.today(), "D")
+    start, end = np.broadcast_arrays(start, end)
+
+    start, end = start.astype(np.int64), end.astype(np.int64)
+    sign = np.where(end < start, -1, 1)
+    earlier, later = np.minimum(start, end), np.maximum(start, end)
+
+    y1, m1, _ = _civil_from_days(earlier)
+    y2, m2, _ = _civil_from_days(later)
+    total_months = (y2 - y1) * 12 + (m2 - m1)
+
+    # Whole months are counted from the earlier date (clipped to month end, so Jan 31 ->
+    # Feb 28 is one month); step back one where that overshoots. The rest are days.
+    anchor = _add_months(earlier, total_months)
+    overshoot = anchor > later
+    total_months -= overshoot
+    anchor = np.where(overshoot, _add_months(earlier, total_months), anchor)
+    remaining_days = later - anchor
+    total_days = later - earlier
+
+    return {
+        "years": total_months // 12,
+        "months": total_months % 12,
+        "days": remaining_days,
+        "total_months": total_months,
+        "total_weeks": total_days // 7,
+        "total_days": total_days,
+        "total_hours": total_days * 24,
+        "sign": sign,
+    }
+
+
+def business_days(start: DateInput, end: DateInput, holidays: Optional[list] = None) -> np.ndarray:
+    """Number of weekdays in [start, end) for each pair (negative if end < start)."""
+    return np.busday_count(parse_dates(start), parse_dates(end), holidays=parse_dates(holidays) if holidays else [])
+
+
+def add_business_days(dates: DateInput, offsets, holidays: Optional[list] = None) -> np.ndarray:
+    """Move each date by a number of weekdays (weekend start dates roll forward first)."""
+    return np.busday_offset(parse_dates(dates), offsets, roll="forward", holidays=parse_dates(holidays) if holidays else [])
+
+
+def weekday_index(dates: DateInput) -> np.ndarray:
+    """Monday=0 ... Sunday=6 (1970-01-01 was a Thursday)."""
+    return (parse_dates(dates).astype(np.int64) + 3) % 7
+
+
+def next_weekday(dates: DateInput, weekday: str, include_same_day: bool = False) -> np.ndarray:
+    """
+    Next occurrence of a weekday after each date ("next sunday").
+
+    Args:
+        dates: Reference dates
+        weekday: Day name ("sunday", "Sun", ...)
+        include_same_day: Return the date itself if it already falls on that weekday
+    """
+    matches = [i for i, name in enumerate(WEEKDAYS) if name.startswith(weekday.strip().lower()[:3])]
+    if not matches:
+        raise ValueError(f"Unknown weekday: {weekday}")
+    dates = parse_dates(dates)
+    delta = (matches[0] - weekday_index(dates)) % 7
+    if not include_same_day:
+        delta = np.where(delta == 0, 7, delta)
+    return dates + delta
+
+
+def format_dates(dates: np.ndarray) -> list[str]:
+    """ISO date with day name, e.g. '2025-06-13 (Friday)'."""
+    names = np.array([name.title() for name in WEEKDAYS])[weekday_index(dates)]
+    return [f"{d} ({n})" for d, n in zip(np.datetime_as_string(dates, unit="D"), names)]
+
+
+def _benchmark(pairs: int):
+    from tools_15 import calculate_date_difference
+
+    rng = np.random.default_rng(0)
+    base = np.datetime64("1950-01-01")
+    starts = base + rng.integers(0, 25_000, pairs)
+    ends = base + rng.integers(0, 30_000, pairs)
+    start_strings = np.datetime_as_string(starts, unit="D").tolist()
+    end_strings = np.datetime_as_string(ends, unit="D").tolist()
+
+    t = time.perf_counter()
+    parsed_starts, parsed_ends = parse_dates(start_strings), parse_dates(end_strings)
+    parsing = time.perf_counter() - t
+    result = date_differences(parsed_starts, parsed_ends)
+    vectorized = time.perf_counter() - t
+
+    t = time.perf_counter()
+    per_call = [calculate_date_difference.func(a, b) for a, b in zip(start_strings, end_strings)]
+    serial = time.perf_counter() - t
+
+    # Sanity check: both paths agree on the total number of days
+    sample = int(per_call[0].split()[1])
+    assert sample == abs(int(result["total_days"][0])), (sample, result["total_days"][0])
+
+    print(f"{pairs:,} date pairs")
+    print(f"  per-call calculate_date_difference: {serial:8.3f}s ({serial / pairs * 1e6:.2f} us/pair)")
+    print(f"  date_differences (vectorized):       {vectorized:8.3f}s ({vectorized / pairs * 1e6:.3f} us/pair, {parsing:.3f}s of it parsing strings)")
+    print(f"  speedup: {serial / vectorized:.0f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark vectorized date differences")
+    parser.add_argument("--pairs", type=int, default=1_000_000)
+    _benchmark(parser.parse_args().pairs)
@@ -0,0 +1,109 @@
+"""
+Per-query deadlines for the agent loop.
+
+A Deadline is created once per query and passed down to every model and tool call.
+call_with_deadline() runs the call with whatever budget is left and raises DeadlineExceeded
+instead of hanging when it does not finish in time. While the call runs, the deadline is the
+current one, so tools can size their own network timeouts with remaining_time().
+Code that must not be abandoned (it holds a worker or writes shared state) runs inside
+deadline_scope() instead and checks the deadline between steps.
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a call does not finish within the remaining time budget."""
+
+
+class Deadline:
+    """A point in time (monotonic clock) by which a query must finish."""
+
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self, reserve: float = 0.0) -> float:
+        """Seconds left, keeping `reserve` seconds back (never negative)."""
+        return max(0.0, self.expires_at - time.monotonic() - reserve)
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def elapsed(self) -> float:
+        return self.budget - (self.expires_at - time.monotonic())
+
+
+_current_deadline: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Return the deadline of the query being processed, if any."""
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Deadline):
+    """Make `deadline` the current one for code run in this thread (the previous one is restored on exit)."""
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def remaining_time(default: float) -> float:
+    """Remaining budget of the current query, capped at `default` (used for network timeouts)."""
+    deadline = current_deadline()
+    if deadline is None:
+        return default
+    return max(0.1, min(default, deadline.remaining()))
+
+
+def call_with_deadline(fn: Callable, deadline: Deadline, *args: Any, reserve: float = 0.0, **kwargs: Any) -> Any:
+    """
+    Run fn(*args, **kwargs) with the budget left on `deadline`.
+
+    The call runs in a daemon thread where `deadline` is the current deadline. A call that
+    overruns is abandoned, not killed: its thread keeps running in the background but no
+    longer blocks the query or interpreter exit.
+
+    Args:
+        fn: Model or tool call
+        deadline: Deadline of the current query
+        reserve: Seconds to keep back for later calls (e.g. the final model answer)
+
+    Raises:
+        DeadlineExceeded: If the call did not finish in time
+    """
+    timeout = deadline.remaining(reserve)
+    if timeout <= 0:
+        raise DeadlineExceeded("No time budget left")
+
+    outcome = {}
+    context = contextvars.copy_context()
+
+    def run():
+        _current_deadline.set(deadline)
+        return fn(*args, **kwargs)
+
+    def target():
+        try:
+            outcome["result"] = context.run(run)
+        except BaseException as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=target, name=f"deadline-{getattr(fn, '__name__', 'call')}", daemon=True)
+    worker.start()
+    worker.join(timeout)
+
+    if worker.is_alive():
+        raise DeadlineExceeded(f"Call did not finish within {timeout:.1f}s")
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["result"]
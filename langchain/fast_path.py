@@ -0,0 +1,166 @@
+"""
+Deterministic fast path for tool-only queries.
+
+Queries like "what is 2 + 4" or "what is current time in New York?" always resolve to the
+same fixed tool sequence, so routing them through the model only adds round trips. The
+matcher below recognizes those intents, calls the tools directly and formats the answer.
+Anything it does not recognize (or cannot answer cleanly) returns None and falls through
+to the LLM.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Optional
+
+
+@dataclass
+class FastPathAnswer:
+    """Answer produced without the model, plus the tool calls that produced it."""
+
+    intent: str
+    answer: str
+    tool_calls: list = field(default_factory=list)
+
+
+# Operator symbol -> tool name. The math tools take integers only.
+_OPERATOR_TOOLS = {
+    "+": "add",
+    "plus": "add",
+    "-": "subtract",
+    "minus": "subtract",
+    "*": "multiply",
+    "x": "multiply",
+    "times": "multiply",
+    "/": "divide",
+    "divided by": "divide",
+}
+
+_PREFIX = r"^\s*(?:what\s+is|what's|whats|calculate|compute|how\s+much\s+is)?\s*(?:the\s+)?"
+
+_ARITHMETIC = re.compile(
+    _PREFIX + r"(-?\d+)\s*(\+|-|\*|x|/|plus|minus|times|divided\s+by)\s*(-?\d+)\s*[?.!]?\s*$",
+    re.IGNORECASE,
+)
+_DATE_AND_TIME = re.compile(_PREFIX + r"(?:current|today'?s)\s+date\s+and\s+time\s*[?.!]?\s*$", re.IGNORECASE)
+_DATE = re.compile(_PREFIX + r"(?:current\s+date|date\s+today|today'?s\s+date)\s*[?.!]?\s*$", re.IGNORECASE)
+_LOCAL_TIME = re.compile(_PREFIX + r"(?:current\s+)?time(?:\s+now)?\s*[?.!]?\s*$", re.IGNORECASE)
+_TIME_IN_CITY = re.compile(_PREFIX + r"(?:current\s+)?time\s+(?:now\s+)?in\s+([a-z][a-z .,'-]*?)\s*(?:now\s*)?[?.!]?\s*$", re.IGNORECASE)
+# Tickers are matched case-sensitively so ordinary words are never mistaken for symbols
+_STOCK_PRICE = re.compile(
+    r"^\s*(?:(?:what\s+is|what's|get(?:\s+me)?|show(?:\s+me)?)\s+)?(?:the\s+)?(?:current\s+)?"
+    r"(?:stock\s+price|share\s+price|price)\s+(?:of|for)\s+([A-Z]{1,5}(?:\.(?:NS|BO))?)\s*[?.!]?\s*$"
+)
+
+
+def _call(tools_by_name: dict, calls: list, name: str, args: dict) -> Any:
+    """Invoke a tool by name and record the call for display."""
+    result = tools_by_name[name].invoke(args)
+    calls.append({"name": name, "args": args, "result": result})
+    return result
+
+
+def _arithmetic(match: re.Match, tools_by_name: dict, calls: list) -> Optional[str]:
+    a, op, b = int(match.group(1)), " ".join(match.group(2).lower().split()), int(match.group(3))
+    result = _call(tools_by_name, calls, _OPERATOR_TOOLS[op], {"a": a, "b": b})
+    if isinstance(result, str):  # divide() reports errors as strings
+        return None
+    if isinstance(result, float) and result.is_integer():
+        result = int(result)
+    return f"{a} {match.group(2)} {b} = {result}"
+
+
+def _date_and_time(match: re.Match, tools_by_name: dict, calls: list) -> Optional[str]:
+    now = _call(tools_by_name, calls, "get_current_time", {})
+    return f"The current date and time is {now}."
+
+
+def _date(match: re.Match, tools_by_name: dict, calls: list) -> Optional[str]:
+    today = _call(tools_by_name, calls, "get_current_date", {})
+    return f"Today's date is {today}."
+
+
+def _local_time(match: re.Match, tools_by_name: dict, calls: list) -> Optional[str]:
+    now = _call(tools_by_name, calls, "get_current_time", {})
+    return f"The current time is {now.split(' ')[-1]}."
+
+
+def _time_in_city(match: re.Match, tools_by_name: dict, calls: list) -> Optional[str]:
+    city = match.group(1).strip(" ,.")
+    timezone = _call(tools_by_name, calls, "identify_timezone", {"city": city})
+    if not timezone or timezone.startswith("Error"):
+        return None
+
+    result = _call(tools_by_name, calls, "calculate_time_in_timezone", {"timezone": timezone})
+    if result.startswith("Error"):
+        return None
+
+    # "Current time: 2025-01-01 10:00:00 EST" -> "2025-01-01 10:00:00 EST"
+    lines = dict(line.split(": ", 1) for line in result.strip().splitlines() if ": " in line)
+    current = lines.get("Current time")
+    if current is None:
+        return None
+    return f"The current time in {city.title()} is {current} ({timezone})."
+
+
+def _stock_price(match: re.Match, tools_by_name: dict, calls: list) -> Optional[str]:
+    ticker = match.group(1)
+    result = _call(tools_by_name, calls, "get_us_stock_price", {"ticker": ticker})
+    try:
+        data = json.loads(result)
+    except (TypeError, ValueError):
+        return None  # error string, let the model explain it
+
+    name = data.get("company_name") or data["symbol"]
+    answer = f"{name} ({data['symbol']}) is trading at {data['current_price']}"
+    details = []
+    if data.get("market_cap_formatted"):
+        details.append(f"market cap {data['market_cap_formatted']}")
+    if data.get("pe_ratio"):
+        details.append(f"PE {data['pe_ratio']:.2f}")
+    if data.get("52_week_low") and data.get("52_week_high"):
+        details.append(f"52-week range {data['52_week_low']}-{data['52_week_high']}")
+    if details:
+        answer += f" ({', '.join(details)})"
+    return answer + "."
+
+
+# Order matters: "date and time" must be tried before the plain date/time rules
+_RULES: list[tuple[str, re.Pattern, Callable, tuple]] = [
+    ("arithmetic", _ARITHMETIC, _arithmetic, ("add", "subtract", "multiply", "divide")),
+    ("current_date_time", _DATE_AND_TIME, _date_and_time, ("get_current_time",)),
+    ("current_date", _DATE, _date, ("get_current_date",)),
+    ("current_time", _LOCAL_TIME, _local_time, ("get_current_time",)),
+    ("time_in_city", _TIME_IN_CITY, _time_in_city, ("identify_timezone", "calculate_time_in_timezone")),
+    ("stock_price", _STOCK_PRICE, _stock_price, ("get_us_stock_price",)),
+]
+
+
+def match_fast_path(query: str, tools_by_name: dict) -> Optional[FastPathAnswer]:
+    """
+    Answer a query directly with tools if it matches a known deterministic intent.
+
+    Args:
+        query: Raw user query
+        tools_by_name: Mapping of tool name -> LangChain tool
+
+    Returns:
+        FastPathAnswer, or None if the query should go to the model
+    """
+    for intent, pattern, handler, required_tools in _RULES:
+        match = pattern.match(query)
+        if not match or not all(name in tools_by_name for name in required_tools):
+            continue
+
+        calls = []
+        try:
+            answer = handler(match, tools_by_name, calls)
+        except Exception:
+            answer = None
+
+        # A matched intent that could not be answered cleanly still falls through
+        if answer is None:
+            return None
+        return FastPathAnswer(intent=intent, answer=answer, tool_calls=calls)
+
+    return None
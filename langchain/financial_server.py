@@ -0,0 +1,385 @@
+"""
+Financial agent as a long-running local HTTP service (aiohttp).
+
+One process serves every request, so the model connection, the agent graph and all tool
+caches (quotes, .info, statements, NSE session, price store) are shared across requests.
+
+- POST /query {"query": "..."}: runs the agent on a bounded pool of WORKERS threads and
+  returns {"answer", "tool_calls", "elapsed_s", ...}. With "Accept: text/event-stream" (or
+  ?stream=1) the response is Server-Sent Events forwarded live from the agent run: queued,
+  started, then tool_call / tool_result / token as they happen, answer, done.
+- Conversations: pass "thread_id" to continue one (only the new message is sent; the history
+  is in the agent's SQLite checkpoints) and {"thread_id": ..., "resume": true} to finish a run
+  that was interrupted. Every response carries its thread_id. A thread runs one request at a
+  time; a second concurrent request on it gets 409.
+- At most MAX_QUEUE requests wait for a worker; beyond that requests are shed immediately
+  with 429 and a Retry-After header instead of piling up.
+- GET /health: liveness plus current load; GET /metrics: counters, latency percentiles and
+  tool cache statistics.
+
+    python financial_server.py serve --port 8016
+    python financial_server.py serve --stub-model            # no LLM needed
+    python financial_server.py loadtest --requests 200 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from uuid import uuid4
+
+from aiohttp import ClientSession, web
+
+from deadline import Deadline, deadline_scope
+
+WORKERS = int(os.environ.get("AIML_SERVER_WORKERS", 4))
+MAX_QUEUE = int(os.environ.get("AIML_SERVER_QUEUE", 16))
+REQUEST_TIMEOUT = float(os.environ.get("AIML_SERVER_TIMEOUT", 120))
+KEEPALIVE_INTERVAL = 10
+
+financial_agent = importlib.import_module("16_financial_agent")
+
+
+class AgentService:
+    """Admission control, worker pool and metrics around answer_query()."""
+
+    def __init__(self, agent=None, workers: int = WORKERS, max_queue: int = MAX_QUEUE):
+        self.agent = agent
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agent-worker")
+        self._slots: Optional[asyncio.Semaphore] = None  # created on the server's loop
+        self.admitted = 0  # running + queued
+        self.active_threads: set[str] = set()
+        self.running = 0
+        self.counts = {"requests": 0, "completed": 0, "failed": 0, "rejected": 0, "timeouts": 0}
+        self.latencies = deque(maxlen=1000)
+        self.started_at = time.time()
+
+    @property
+    def queued(self) -> int:
+        return self.admitted - self.running
+
+    def try_admit(self, thread_id: str) -> bool:
+        """Reserve a place (running or queued) for thread_id; False when the queue is full."""
+        self.counts["requests"] += 1
+        if self.admitted >= self.workers + self.max_queue:
+            self.counts["rejected"] += 1
+            return False
+        self.admitted += 1
+        self.active_threads.add(thread_id)
+        return True
+
+    def release(self, thread_id: str):
+        """Give back the place and the thread taken by try_admit()."""
+        self.admitted -= 1
+        self.active_threads.discard(thread_id)
+
+    def _finished(self, thread_id: str):
+        self.running -= 1
+        self._slots.release()
+        self.release(thread_id)
+
+    def _answer(self, query: Optional[str], on_event, thread_id: Optional[str]) -> dict:
+        # Runs to the end on the worker (never abandoned, so no second run can touch the thread's
+        # checkpoints): the agent stops between steps once the deadline passes and tools size
+        # their network timeouts from it
+        with deadline_scope(Deadline(REQUEST_TIMEOUT)):
+            return financial_agent.answer_query(query, self.agent, on_event, thread_id)
+
+    async def run(self, query: Optional[str], on_start=None, on_event=None, thread_id: Optional[str] = None) -> dict:
+        """
+        Wait for a worker, run the query on it and release the place (call after try_admit).
+        The worker and the thread stay taken until the run itself ends, even if the caller
+        stops waiting. on_event(event, data) is called from the worker thread for each
+        stream_query() event. query=None resumes thread_id's interrupted run.
+        """
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        start = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            self.release(thread_id)
+            raise
+        self.running += 1
+        try:
+            if on_start:
+                await on_start()
+            future = asyncio.get_running_loop().run_in_executor(self._executor, self._answer, query, on_event, thread_id)
+        except BaseException:
+            self._finished(thread_id)
+            raise
+
+        def finished(done: asyncio.Future):
+            self._finished(thread_id)
+            if not done.cancelled():
+                done.exception()  # retrieved here in case the caller stopped waiting
+
+        future.add_done_callback(finished)
+        try:
+            # shield: a timeout or a disconnected client ends this wait, not the run or its accounting
+            result = await asyncio.wait_for(asyncio.shield(future), REQUEST_TIMEOUT)
+        except TimeoutError:
+            self.counts["timeouts"] += 1
+            raise
+        except Exception:
+            self.counts["failed"] += 1
+            raise
+        self.counts["completed"] += 1
+        self.latencies.append(time.perf_counter() - start)
+        return result
+
+    def metrics(self) -> dict:
+        import market_data
+        import nse_client
+
+        ordered = sorted(self.latencies)
+
+        def percentile(p: float) -> Optional[float]:
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 3) if ordered else None
+
+        caches = {"market_data": market_data.cache_stats()}
+        if nse_client._client is not None:
+            caches["nse"] = nse_client._client.cache_stats()
+        return {
+            **self.counts,
+            "running": self.running,
+            "queued": self.queued,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "latency_s": {"p50": percentile(0.5), "p95": percentile(0.95), "max": ordered[-1] if ordered else None, "samples": len(ordered)},
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "caches": caches,
+        }
+
+
+def _sse(event: str, data) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n".encode()
+
+
+async def handle_query(request: web.Request) -> web.StreamResponse:
+    service: AgentService = request.app["service"]
+    try:
+        body = await request.json()
+        thread_id = str(body["thread_id"]) if body.get("thread_id") else None
+        resume = bool(body.get("resume"))
+        query = None if resume else str(body["query"]).strip()
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return web.json_response({"error": 'Expected a JSON body like {"query": "...", "thread_id": "..."}'}, status=400)
+    if resume and not thread_id:
+        return web.json_response({"error": "resume needs a thread_id"}, status=400)
+    if not resume and not query:
+        return web.json_response({"error": "Empty query"}, status=400)
+
+    # Two runs on one thread would interleave their checkpoints
+    thread_id = thread_id or uuid4().hex
+    if thread_id in service.active_threads:
+        return web.json_response({"error": f"Thread {thread_id} is already running a request"}, status=409)
+    if not service.try_admit(thread_id):
+        return web.json_response({"error": "Server busy, retry shortly", "queued": service.queued}, status=429, headers={"Retry-After": "2"})
+    return await _respond(request, service, query, thread_id)
+
+
+async def _respond(request: web.Request, service: AgentService, query: Optional[str], thread_id: str) -> web.StreamResponse:
+
+    streaming = request.query.get("stream") == "1" or "text/event-stream" in request.headers.get("Accept", "")
+    if not streaming:
+        try:
+            return web.json_response(await service.run(query, thread_id=thread_id))
+        except asyncio.TimeoutError:
+            return web.json_response({"error": f"Timed out after {REQUEST_TIMEOUT:g}s"}, status=504)
+        except Exception as e:
+            return web.json_response({"error": str(e)}, status=500)
+
+    response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    try:
+        await response.prepare(request)
+        await response.write(_sse("queued", {"ahead": service.queued - 1, "thread_id": thread_id}))
+    except BaseException:
+        service.release(thread_id)
+        raise
+
+    async def started():
+        await response.write(_sse("started", {}))
+
+    # Agent events arrive on the worker thread; hand them to this loop in order
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def on_event(event: str, data: dict):
+        loop.call_soon_threadsafe(events.put_nowait, (event, data))
+
+    task = asyncio.ensure_future(service.run(query, on_start=started, on_event=on_event, thread_id=thread_id))
+    try:
+        while not task.done() or not events.empty():
+            next_event = asyncio.ensure_future(events.get())
+            done, _ = await asyncio.wait({task, next_event}, timeout=KEEPALIVE_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+            if next_event in done:
+                await response.write(_sse(*next_event.result()))
+                continue
+            next_event.cancel()
+            # Comment lines keep proxies and clients from timing out while the request waits or runs
+            if not done:
+                await response.write(b": keep-alive\n\n")
+        result = task.result()
+        await response.write(_sse("answer", {"answer": result["answer"]}))
+        await response.write(_sse("done", {key: result[key] for key in ("thread_id", "steps", "first_token_s", "elapsed_s", "prefetch")}))
+    except asyncio.TimeoutError:
+        await response.write(_sse("error", {"error": f"Timed out after {REQUEST_TIMEOUT:g}s"}))
+    except (ConnectionResetError, asyncio.CancelledError):
+        task.cancel()
+        raise
+    except Exception as e:
+        await response.write(_sse("error", {"error": str(e)}))
+    await response.write_eof()
+    return response
+
+
+async def handle_health(request: web.Request) -> web.Response:
+    service: AgentService = request.app["service"]
+    return web.json_response(
+        {"status": "ok", "running": service.running, "queued": service.queued, "saturated": service.admitted >= service.workers + service.max_queue}
+    )
+
+
+async def handle_metrics(request: web.Request) -> web.Response:
+    return web.json_response(request.app["service"].metrics())
+
+
+def create_app(agent=None, workers: int = WORKERS, max_queue: int = MAX_QUEUE) -> web.Application:
+    """aiohttp application around one shared AgentService (agent=None uses the configured model)."""
+    app = web.Application()
+    app["service"] = AgentService(agent, workers=workers, max_queue=max_queue)
+    app.router.add_post("/query", handle_query)
+    app.router.add_get("/health", handle_health)
+    app.router.add_get("/metrics", handle_metrics)
+    return app
+
+
+def stub_agent(latency: float = 0.2, checkpointer=None):
+    """
+    Financial agent on a stub chat model (no LLM): the first turn calls get_quotes for the
+    tickers named in the query, the second answers. Each model call sleeps `latency`.
+    """
+    from langchain_core.language_models.chat_models import BaseChatModel
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    from prefetch import find_listings
+
+    class StubChatModel(BaseChatModel):
+        latency: float = 0.2
+
+        @property
+        def _llm_type(self) -> str:
+            return "stub"
+
+        def bind_tools(self, tools, **kwargs):
+            return self
+
+        def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+            time.sleep(self.latency)
+            last = messages[-1]
+            if isinstance(last, HumanMessage):
+                symbols = [listing.yahoo_symbol for listing in find_listings(str(last.content))]
+                if symbols:
+                    call = {"name": "get_quotes", "args": {"tickers": symbols}, "id": f"call_{uuid4().hex[:8]}"}
+                    return ChatResult(generations=[ChatGeneration(message=AIMessage(content="", tool_calls=[call]))])
+            results = sum(isinstance(m, ToolMessage) for m in messages)
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"Stub answer based on {results} tool result(s)."))])
+
+    return financial_agent.build_agent(StubChatModel(latency=latency), checkpointer)
+
+
+async def _load_test(requests: int, concurrency: int, workers: int, max_queue: int, model_latency: float, yahoo_latency: float):
+    import market_data
+
+    market_data._simulate_yahoo(yahoo_latency)
+    app = create_app(stub_agent(model_latency), workers=workers, max_queue=max_queue)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{site._server.sockets[0].getsockname()[1]}"
+
+    queries = [
+        "How are AAPL and MSFT doing today?",
+        "What is the stock price of Reliance Industries?",
+        "Quote NVDA, TSLA and AMZN",
+        "Compare Infosys and TCS",
+        "What is the price of GOOGL?",
+    ]
+    statuses: dict = {}
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(session: ClientSession, i: int):
+        # Clients back off and retry when shed (429), as a well-behaved caller would
+        async with semaphore:
+            start = time.perf_counter()
+            for attempt in range(1, 30):
+                async with session.post(f"{url}/query", json={"query": queries[i % len(queries)]}) as response:
+                    await response.read()
+                    statuses[response.status] = statuses.get(response.status, 0) + 1
+                    if response.status != 429:
+                        break
+                await asyncio.sleep(min(0.1 * attempt, 1.0))
+            if response.status == 200:
+                latencies.append(time.perf_counter() - start)
+
+    async with ClientSession() as session:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(session, i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+        async with session.get(f"{url}/metrics") as response:
+            metrics = await response.json()
+    await runner.cleanup()
+
+    latencies.sort()
+    print(f"{requests} requests, {concurrency} concurrent, {workers} workers, queue {max_queue}, model {model_latency * 1000:.0f} ms/call, yahoo {yahoo_latency * 1000:.0f} ms")
+    print(f"  {elapsed:.2f}s total, {statuses.get(200, 0) / elapsed:.1f} answered/s, responses by status {statuses} (429 = shed, then retried)")
+    if latencies:
+        print(f"  client latency incl. retries p50 {latencies[len(latencies) // 2]:.2f}s, p95 {latencies[int(len(latencies) * 0.95)]:.2f}s; server p50 {metrics['latency_s']['p50']}s")
+    print(f"  quote cache: {metrics['caches']['market_data']['quotes']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Financial agent HTTP service")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8016)
+    serve.add_argument("--stub-model", action="store_true", help="Answer with a stub model instead of the configured LLM")
+    load = commands.add_parser("loadtest", help="Load-test an in-process server on a stub model and simulated Yahoo")
+    load.add_argument("--requests", type=int, default=200)
+    load.add_argument("--concurrency", type=int, default=32)
+    load.add_argument("--model-latency", type=float, default=0.2)
+    load.add_argument("--yahoo-latency", type=float, default=0.3)
+    for command in (serve, load):
+        command.add_argument("--workers", type=int, default=WORKERS)
+        command.add_argument("--max-queue", type=int, default=MAX_QUEUE)
+    args = parser.parse_args()
+
+    if args.command == "loadtest":
+        asyncio.run(_load_test(args.requests, args.concurrency, args.workers, args.max_queue, args.model_latency, args.yahoo_latency))
+        return
+
+    import market_feed
+
+    if args.stub_model:
+        agent = stub_agent(checkpointer=financial_agent.checkpoints.get_checkpointer() if financial_agent.checkpoints.ENABLED else None)
+    else:
+        financial_agent.warm_up_agent()
+        agent = None
+    market_feed.start_from_env()
+    web.run_app(create_app(agent, workers=args.workers, max_queue=args.max_queue), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
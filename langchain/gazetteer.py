@@ -0,0 +1,290 @@
+"""
+Compact memory-mapped gazetteer for large-scale city -> timezone lookup.
+
+A 100k+ city gazetteer loaded as Python dicts costs tens of MB and seconds at startup. The
+build step compiles it once into a single binary file instead:
+
+    header | records | sorted name hashes | record ids | zone table | string blob
+
+Records are fixed-width (name, admin region, country, zone id, population) and the name
+hashes are a sorted uint64 array, so a lookup is one binary search (O(log n)) over the
+memory-mapped file. Opening it only maps the file (near-zero load time), and since the
+mapping is read-only the pages are shared by every worker process.
+
+Build from GeoNames (https://download.geonames.org/export/dump/, e.g. cities15000.txt):
+    python gazetteer.py build cities15000.txt --admin1 admin1CodesASCII.txt
+or from a CSV with columns city,admin,country,timezone,population:
+    python gazetteer.py build my_cities.csv
+
+Look up:
+    python gazetteer.py lookup "Kolhapur, Maharashtra"
+"""
+
+import argparse
+import csv
+import hashlib
+import os
+import struct
+import sys
+import time
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from city_index import normalize_city, qualifier_countries
+from mlutils import get_cache_dir
+
+MAGIC = b"GAZETTR1"
+# magic, n_records, n_keys, records offset, keys offset, key->record offset, zones offset, zones length, blob offset
+HEADER = struct.Struct("<8sIIQQQQQQ")
+
+RECORD_DTYPE = np.dtype(
+    [
+        ("name_off", "<u4"),
+        ("name_len", "<u2"),
+        ("admin_off", "<u4"),
+        ("admin_len", "<u2"),
+        ("country", "S2"),
+        ("zone", "<u2"),
+        ("population", "<u4"),
+    ]
+)
+
+DEFAULT_FILE = "gazetteer.bin"
+
+
+class GazetteerEntry(NamedTuple):
+    name: str
+    admin: str
+    country: str
+    timezone: str
+    population: int
+
+
+def name_hash(name: str) -> int:
+    """64-bit hash of a normalized city name (stable across processes and builds)."""
+    return int.from_bytes(hashlib.blake2b(normalize_city(name).encode(), digest_size=8).digest(), "little")
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _read_geonames(path: str, admin1_path: Optional[str] = None, alternate_names: bool = False):
+    """Yield (names, city, admin, country, timezone, population) from a GeoNames cities file."""
+    admin1 = {}
+    if admin1_path:
+        with open(admin1_path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) >= 2:
+                    admin1[parts[0]] = parts[1]
+
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) < 18 or not cols[17]:
+                continue
+            name, ascii_name, country, timezone = cols[1], cols[2], cols[8], cols[17]
+            names = {name, ascii_name}
+            if alternate_names and cols[3]:
+                names.update(cols[3].split(","))
+            admin = admin1.get(f"{country}.{cols[10]}", cols[10])
+            yield names, name, admin, country, timezone, int(cols[14] or 0)
+
+
+def _read_csv(path: str):
+    """Yield (names, city, admin, country, timezone, population) from a city,admin,country,timezone,population CSV."""
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            if row.get("city") and row.get("timezone"):
+                yield {row["city"]}, row["city"], row.get("admin", ""), row.get("country", ""), row["timezone"], int(row.get("population") or 0)
+
+
+def build_gazetteer(source: str, output: str, admin1_path: Optional[str] = None, alternate_names: bool = False) -> int:
+    """
+    Compile a gazetteer source file into the binary format.
+
+    Args:
+        source: GeoNames cities file (tab-separated) or CSV (city,admin,country,timezone,population)
+        output: Path of the binary file to write
+        admin1_path: Optional GeoNames admin1CodesASCII.txt to store region names instead of codes
+        alternate_names: Also index GeoNames alternate names (larger file)
+
+    Returns:
+        Number of cities written
+    """
+    rows = _read_csv(source) if source.endswith(".csv") else _read_geonames(source, admin1_path, alternate_names)
+
+    blob = bytearray()
+    strings: dict[str, tuple[int, int]] = {}
+    zones: dict[str, int] = {}
+    records, keys, key_records = [], [], []
+
+    def intern(text: str) -> tuple[int, int]:
+        if text not in strings:
+            data = text.encode("utf-8")[:65535]
+            strings[text] = (len(blob), len(data))
+            blob.extend(data)
+        return strings[text]
+
+    for names, city, admin, country, timezone, population in rows:
+        record_id = len(records)
+        name_off, name_len = intern(city)
+        admin_off, admin_len = intern(admin)
+        zone = zones.setdefault(timezone, len(zones))
+        records.append((name_off, name_len, admin_off, admin_len, country.encode()[:2], zone, min(population, 2**32 - 1)))
+        for key in {name_hash(n) for n in names if normalize_city(n)}:
+            keys.append(key)
+            key_records.append(record_id)
+
+    record_array = np.array(records, dtype=RECORD_DTYPE)
+    key_array = np.array(keys, dtype="<u8")
+    key_record_array = np.array(key_records, dtype="<u4")
+
+    # Sort by hash, most populous first within the same name
+    order = np.lexsort((-record_array["population"][key_record_array].astype(np.int64), key_array))
+    key_array, key_record_array = key_array[order], key_record_array[order]
+
+    zone_table = "\n".join(sorted(zones, key=zones.get)).encode()
+
+    records_off = _align(HEADER.size)
+    keys_off = _align(records_off + record_array.nbytes)
+    key_records_off = _align(keys_off + key_array.nbytes)
+    zones_off = _align(key_records_off + key_record_array.nbytes)
+    blob_off = _align(zones_off + len(zone_table))
+
+    tmp_path = f"{output}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(record_array), len(key_array), records_off, keys_off, key_records_off, zones_off, len(zone_table), blob_off))
+        for offset, data in (
+            (records_off, record_array.tobytes()),
+            (keys_off, key_array.tobytes()),
+            (key_records_off, key_record_array.tobytes()),
+            (zones_off, zone_table),
+            (blob_off, bytes(blob)),
+        ):
+            f.write(b"\0" * (offset - f.tell()))
+            f.write(data)
+    os.replace(tmp_path, output)
+    return len(record_array)
+
+
+class Gazetteer:
+    """Read-only view over a compiled gazetteer file (memory-mapped, nothing is copied)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._data = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, n_records, n_keys, records_off, keys_off, key_records_off, zones_off, zones_len, blob_off = HEADER.unpack_from(self._data, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compiled gazetteer")
+
+        self.records = self._data[records_off : records_off + n_records * RECORD_DTYPE.itemsize].view(RECORD_DTYPE)
+        self.keys = self._data[keys_off : keys_off + n_keys * 8].view("<u8")
+        self.key_records = self._data[key_records_off : key_records_off + n_keys * 4].view("<u4")
+        self.zones = bytes(self._data[zones_off : zones_off + zones_len]).decode().split("\n")
+        self._blob_off = blob_off
+
+    def __len__(self):
+        return len(self.records)
+
+    def _string(self, offset: int, length: int) -> str:
+        start = self._blob_off + int(offset)
+        return bytes(self._data[start : start + int(length)]).decode("utf-8")
+
+    def _entry(self, record_id: int) -> GazetteerEntry:
+        r = self.records[record_id]
+        return GazetteerEntry(
+            name=self._string(r["name_off"], r["name_len"]),
+            admin=self._string(r["admin_off"], r["admin_len"]),
+            country=r["country"].decode(),
+            timezone=self.zones[r["zone"]],
+            population=int(r["population"]),
+        )
+
+    def candidates(self, name: str) -> list[GazetteerEntry]:
+        """All cities indexed under a name, most populous first."""
+        key = np.uint64(name_hash(name))
+        start = int(np.searchsorted(self.keys, key, side="left"))
+        end = int(np.searchsorted(self.keys, key, side="right"))
+        seen, entries = set(), []
+        for record_id in self.key_records[start:end]:
+            if int(record_id) not in seen:
+                seen.add(int(record_id))
+                entries.append(self._entry(int(record_id)))
+        return entries
+
+    def lookup(self, query: str) -> Optional[GazetteerEntry]:
+        """
+        Resolve "City", "City, Region" or "City, CC" to the best matching entry.
+
+        A qualifier after the comma is matched against the admin region name first, then the
+        country code and the country name ("Portland, Maine" is not the larger Portland, Oregon);
+        if it matches none of the candidates the result is None rather than a same-named city
+        elsewhere. Without one the most populous city wins.
+        """
+        name, _, qualifier = query.partition(",")
+        entries = self.candidates(name)
+        if not entries:
+            return None
+
+        qualifier = normalize_city(qualifier)
+        if not qualifier:
+            return entries[0]
+        for entry in entries:
+            if qualifier == normalize_city(entry.admin):
+                return entry
+        countries = qualifier_countries(qualifier)
+        return next((entry for entry in entries if entry.country in countries), None)
+
+
+_gazetteer = None
+_gazetteer_checked = False
+
+
+def get_gazetteer() -> Optional[Gazetteer]:
+    """Open the compiled gazetteer (AIML_GAZETTEER or .cache/gazetteer.bin) once, if it exists."""
+    global _gazetteer, _gazetteer_checked
+    if not _gazetteer_checked:
+        path = os.environ.get("AIML_GAZETTEER") or str(get_cache_dir() / DEFAULT_FILE)
+        _gazetteer = Gazetteer(path) if os.path.exists(path) else None
+        _gazetteer_checked = True
+    return _gazetteer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the memory-mapped city gazetteer")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Compile a GeoNames/CSV file into the binary gazetteer")
+    build.add_argument("source")
+    build.add_argument("-o", "--output", default=None, help=f"Output file (default: .cache/{DEFAULT_FILE})")
+    build.add_argument("--admin1", default=None, help="GeoNames admin1CodesASCII.txt for region names")
+    build.add_argument("--alternate-names", action="store_true", help="Also index alternate names")
+
+    lookup = subparsers.add_parser("lookup", help="Look up cities")
+    lookup.add_argument("cities", nargs="+")
+    lookup.add_argument("-f", "--file", default=None)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        output = args.output or str(get_cache_dir() / DEFAULT_FILE)
+        start = time.perf_counter()
+        count = build_gazetteer(args.source, output, args.admin1, args.alternate_names)
+        print(f"Wrote {count} cities to {output} ({os.path.getsize(output) / 1e6:.1f} MB) in {time.perf_counter() - start:.1f}s")
+    else:
+        start = time.perf_counter()
+        gazetteer = Gazetteer(args.file) if args.file else get_gazetteer()
+        if gazetteer is None:
+            sys.exit("No gazetteer found. Build one first: python gazetteer.py build cities15000.txt")
+        print(f"Opened {len(gazetteer)} cities in {(time.perf_counter() - start) * 1000:.2f} ms")
+        for city in args.cities:
+            start = time.perf_counter()
+            entry = gazetteer.lookup(city)
+            print(f"{city}: {entry} ({(time.perf_counter() - start) * 1e6:.0f} us)")
+
+
+if __name__ == "__main__":
+    main()
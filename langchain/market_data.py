@@ -0,0 +1,312 @@
+"""
+Shared market-data access for the stock tools, with per-symbol caching.
+
+The quote tools used to create a yf.Ticker per symbol and read `.info`, one slow HTTP call
+per ticker. This module gives them:
+
+- get_info(symbol): `.info` cached per symbol for INFO_TTL seconds, shared by every tool
+- get_infos(symbols): the same for many symbols, fetched in parallel on a bounded pool
+- compare_table(infos): comparison metrics for N stocks in one vectorized pandas pass
+- get_quotes(symbols): quote rows for many symbols from ONE bulk yf.download request
+  (price, day change, 52-week range and position, volume), computed in a single vectorized
+  pandas pass and cached per symbol for QUOTE_TTL seconds; symbols on the live feed
+  (market_feed.py) are answered from its ring buffers instead
+
+A 50-name watchlist therefore costs about the same as one symbol.
+
+Benchmarks (add --offline to replace Yahoo with a simulated 300 ms round trip):
+    python market_data.py quotes
+    python market_data.py compare
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from ttl_cache import TTLCache
+
+QUOTE_TTL = float(os.environ.get("AIML_QUOTE_TTL", 60))
+INFO_TTL = float(os.environ.get("AIML_INFO_TTL", 300))
+# Parallel .info requests; Yahoo starts rate limiting well before 50 concurrent requests
+INFO_WORKERS = int(os.environ.get("AIML_INFO_WORKERS", 8))
+
+QUOTE_COLUMNS = ["symbol", "price", "change", "change_pct", "day_high", "day_low", "volume", "52w_high", "52w_low", "52w_position_pct", "as_of"]
+
+_info_cache = TTLCache(ttl=INFO_TTL, maxsize=1024)
+_quote_cache = TTLCache(ttl=QUOTE_TTL, maxsize=4096)
+
+
+def normalize_symbol(symbol: str) -> str:
+    return symbol.strip().upper()
+
+
+def _fetch_info(symbol: str) -> dict:
+    import yfinance as yf
+
+    return yf.Ticker(symbol).info or {}
+
+
+def get_info(symbol: str) -> dict:
+    """yfinance `.info` for a symbol, cached (raises whatever yfinance raises on failure)."""
+    symbol = normalize_symbol(symbol)
+    info = _info_cache.get(symbol)
+    if info is None:
+        info = _fetch_info(symbol)
+        if info:
+            _info_cache.set(symbol, info)
+    return info
+
+
+def peek_info(symbol: str) -> Optional[dict]:
+    """Cached `.info` for a symbol, or None (never fetches)."""
+    return _info_cache.get(normalize_symbol(symbol))
+
+
+def get_infos(symbols: list[str], max_workers: int = INFO_WORKERS) -> tuple[dict, dict]:
+    """
+    `.info` for many symbols, uncached ones fetched in parallel (at most max_workers at a time).
+
+    Returns:
+        ({symbol: info} for symbols that returned data, {symbol: error message} for the rest)
+    """
+    symbols = list(dict.fromkeys(normalize_symbol(s) for s in symbols if s.strip()))
+    infos, errors = {}, {}
+
+    def fetch(symbol):
+        try:
+            return symbol, get_info(symbol), None
+        except Exception as e:
+            return symbol, None, str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols)))) as pool:
+        for symbol, info, error in pool.map(fetch, symbols):
+            if info:
+                infos[symbol] = info
+            else:
+                errors[symbol] = error or "no data"
+    return infos, errors
+
+
+def compare_table(infos: dict):
+    """
+    Side-by-side metrics for N stocks from their `.info` dicts, computed column-wise in one pass.
+
+    Returns:
+        DataFrame indexed by symbol: price, market cap, PE, 52-week range and change, plus
+        derived 52-week position, distance from the high, earnings yield and ranks
+    """
+    import numpy as np
+    import pandas as pd
+
+    fields = {
+        "company_name": ("longName", "shortName"),
+        "current_price": ("regularMarketPrice", "currentPrice"),
+        "market_cap": ("marketCap",),
+        "pe_ratio": ("trailingPE", "forwardPE"),
+        "52_week_high": ("fiftyTwoWeekHigh",),
+        "52_week_low": ("fiftyTwoWeekLow",),
+        "52_week_change_percent": ("52WeekChange",),
+    }
+    table = pd.DataFrame(
+        {column: [next((info[k] for k in keys if info.get(k) is not None), None) for info in infos.values()] for column, keys in fields.items()},
+        index=pd.Index(list(infos), name="symbol"),
+    )
+    numeric = [c for c in fields if c != "company_name"]
+    table[numeric] = table[numeric].apply(pd.to_numeric, errors="coerce")
+
+    price, high, low, pe = table["current_price"], table["52_week_high"], table["52_week_low"], table["pe_ratio"]
+    table["52_week_change_percent"] = (table["52_week_change_percent"] * 100).round(2)
+    table["52_week_position_pct"] = ((price - low) / (high - low).replace(0, np.nan) * 100).round(1)
+    table["pct_below_52_week_high"] = ((1 - price / high) * 100).round(2)
+    table["earnings_yield_pct"] = (100 / pe.where(pe > 0)).round(2)
+    table["market_cap_rank"] = table["market_cap"].rank(ascending=False, method="min")
+    table["pe_rank"] = pe.where(pe > 0).rank(method="min")  # 1 = cheapest on earnings
+    return table
+
+
+def download_history(symbols: list[str], period: str = "1y", interval: str = "1d"):
+    """
+    Daily OHLCV for many symbols in one bulk request.
+
+    Returns:
+        DataFrame with (field, symbol) MultiIndex columns, e.g. history["Close"]["AAPL"]
+    """
+    import pandas as pd
+    import yfinance as yf
+
+    data = yf.download(symbols, period=period, interval=interval, group_by="column", auto_adjust=False, progress=False, threads=True)
+    if data is None or data.empty:
+        return pd.DataFrame()
+    if not isinstance(data.columns, pd.MultiIndex):
+        data.columns = pd.MultiIndex.from_product([data.columns, symbols])
+    return data
+
+
+def quote_table(history):
+    """
+    Quote rows for every symbol in a download_history() frame, in one vectorized pass.
+
+    Returns:
+        DataFrame indexed by symbol with the QUOTE_COLUMNS fields (symbols without data are dropped)
+    """
+    import numpy as np
+    import pandas as pd
+
+    # Last two closes of each symbol on its own calendar (an NSE holiday must not read as a 0% day)
+    close = history["Close"]
+    has_close = close.notna()
+    closes_from_end = has_close[::-1].cumsum()[::-1]
+    last = close.where(has_close & (closes_from_end == 1)).max()
+    previous = close.where(has_close & (closes_from_end == 2)).max()
+    last_idx = has_close[::-1].idxmax()  # last date with data, per symbol
+    high_52w = history["High"].max()
+    low_52w = history["Low"].min()
+    price_range = (high_52w - low_52w).replace(0, np.nan)
+
+    table = pd.DataFrame(
+        {
+            "price": last,
+            "change": last - previous,
+            "change_pct": (last / previous - 1) * 100,
+            "day_high": history["High"].ffill().iloc[-1],
+            "day_low": history["Low"].ffill().iloc[-1],
+            "volume": history["Volume"].ffill().iloc[-1],
+            "52w_high": high_52w,
+            "52w_low": low_52w,
+            "52w_position_pct": (last - low_52w) / price_range * 100,
+            "as_of": last_idx.map(lambda d: str(d.date())),
+        }
+    )
+    table = table[table["price"].notna()]
+    numeric = table.columns.drop("as_of")
+    table[numeric] = table[numeric].astype(float).round(2)
+    table.index.name = "symbol"
+    return table
+
+
+def get_quotes(symbols: list[str], period: str = "1y") -> tuple[list[dict], list[str]]:
+    """
+    Quotes for many symbols: symbols on the live feed and cached symbols are served locally,
+    the rest in one bulk request.
+
+    Returns:
+        (one row dict per symbol found, in request order; symbols with no data)
+    """
+    from market_feed import streamed_quote
+
+    symbols = list(dict.fromkeys(normalize_symbol(s) for s in symbols if s.strip()))
+    rows = {}
+    missing = []
+    for symbol in symbols:
+        streamed = streamed_quote(symbol)
+        if streamed is not None:
+            # Live price fields; 52-week fields only if an earlier pull is still cached
+            pulled = _quote_cache.get(symbol) or {}
+            high, low = pulled.get("52w_high"), pulled.get("52w_low")
+            high, low = (max(high, streamed["price"]), min(low, streamed["price"])) if high and low else (None, None)
+            position = round((streamed["price"] - low) / (high - low) * 100, 2) if high and high > low else None
+            rows[symbol] = {**dict.fromkeys(QUOTE_COLUMNS), **streamed, "52w_high": high, "52w_low": low, "52w_position_pct": position}
+            continue
+        row = _quote_cache.get(symbol)
+        if row is not None:
+            rows[symbol] = row
+        else:
+            missing.append(symbol)
+
+    if missing:
+        history = download_history(missing, period=period)
+        if not history.empty:
+            for symbol, values in quote_table(history).iterrows():
+                row = {"symbol": symbol, **{k: (None if v != v else v) for k, v in values.items()}}
+                _quote_cache.set(symbol, row)
+                rows[symbol] = row
+
+    return [rows[s] for s in symbols if s in rows], [s for s in symbols if s not in rows]
+
+
+def cache_stats() -> dict:
+    return {"quotes": _quote_cache.stats(), "info": _info_cache.stats()}
+
+
+def _simulate_yahoo(latency: float):
+    """Replace the Yahoo calls with synthetic data behind a fixed round-trip delay (benchmarks)."""
+    import numpy as np
+    import pandas as pd
+
+    global _fetch_info, download_history
+
+    def fake_info(symbol):
+        time.sleep(latency)
+        rng = np.random.default_rng(abs(hash(symbol)) % 2**32)
+        low = rng.uniform(20, 400)
+        return {
+            "shortName": symbol, "currentPrice": low * rng.uniform(1.0, 1.6), "marketCap": rng.uniform(1e9, 3e12),
+            "trailingPE": rng.uniform(5, 60), "fiftyTwoWeekLow": low, "fiftyTwoWeekHigh": low * 1.7, "52WeekChange": rng.uniform(-0.4, 0.8),
+        }
+
+    def fake_history(symbols, period="1y", interval="1d"):
+        time.sleep(latency * (1 + len(symbols) / 50))  # one request; payload grows with symbols
+        index = pd.bdate_range(end=pd.Timestamp.today(), periods=252)
+        prices = 100 + np.random.default_rng(0).standard_normal((252, len(symbols))).cumsum(axis=0)
+        return pd.concat({field: pd.DataFrame(prices, index=index, columns=symbols) for field in ("Open", "High", "Low", "Close", "Volume")}, axis=1)
+
+    _fetch_info, download_history = fake_info, fake_history
+
+
+def _benchmark_quotes(watchlist: list[str]):
+    for batch in (watchlist[:1], watchlist):
+        _quote_cache.clear()
+        start = time.perf_counter()
+        found, missing = get_quotes(batch)
+        print(f"get_quotes, {len(batch)} symbol(s): {time.perf_counter() - start:.2f}s ({len(found)} found, missing {missing})")
+
+    start = time.perf_counter()
+    get_quotes(watchlist)
+    print(f"get_quotes, {len(watchlist)} symbols cached: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+def _benchmark_compare(watchlist: list[str]):
+    for n in (2, 10, 50):
+        symbols = watchlist[:n]
+
+        # Previous compare_stocks: one uncached .info call after another
+        start = time.perf_counter()
+        serial = {symbol: _fetch_info(symbol) for symbol in symbols}
+        serial_time = time.perf_counter() - start
+
+        _info_cache.clear()
+        start = time.perf_counter()
+        infos, _ = get_infos(symbols)
+        fetch_time = time.perf_counter() - start
+        start = time.perf_counter()
+        compare_table(infos)
+        metrics_time = time.perf_counter() - start
+
+        print(
+            f"compare N={n:>2}: serial {serial_time:6.2f}s | parallel ({INFO_WORKERS} workers) {fetch_time:6.2f}s"
+            f" + metrics {metrics_time * 1000:.1f} ms | speedup {serial_time / (fetch_time + metrics_time):.1f}x ({len(serial)} fetched)"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark batched quotes and N-way stock comparison")
+    parser.add_argument("benchmark", choices=["quotes", "compare"])
+    parser.add_argument("--offline", nargs="?", type=float, const=0.3, default=None, metavar="LATENCY", help="Simulate Yahoo with this round trip (s)")
+    args = parser.parse_args()
+
+    if args.offline is not None:
+        _simulate_yahoo(args.offline)
+
+    watchlist = [
+        "AAPL", "MSFT", "GOOGL", "AMZN", "NVDA", "META", "TSLA", "BRK-B", "JPM", "V",
+        "UNH", "XOM", "JNJ", "WMT", "MA", "PG", "HD", "CVX", "MRK", "ABBV",
+        "PEP", "KO", "AVGO", "COST", "ADBE", "CSCO", "CRM", "ACN", "MCD", "TMO",
+        "ABT", "NFLX", "AMD", "LIN", "DHR", "ORCL", "TXN", "NKE", "PM", "INTC",
+        "WFC", "DIS", "VZ", "CMCSA", "QCOM", "HON", "IBM", "AMGN", "BA", "CAT",
+    ]
+    if args.benchmark == "quotes":
+        _benchmark_quotes(watchlist)
+    else:
+        _benchmark_compare(watchlist)
@@ -0,0 +1,342 @@
+"""
+Optional streaming market-data feed with an in-memory ring buffer per symbol.
+
+Without it every price question pulls a fresh quote from Yahoo/NSE. With a feed configured,
+a background thread subscribes to a fixed symbol set and appends every tick to a fixed-size
+NumPy ring buffer for its symbol; the quote tools read the latest tick (and the day's range,
+maintained per tick) at memory speed and only fall back to pulling for unsubscribed symbols.
+
+Configuration (the feed is off unless AIML_FEED_SOURCE is set):
+    AIML_FEED_SOURCE    file:/path/ticks.jsonl   replay a JSONL tick file (looped)
+                        tcp:HOST:PORT            newline-delimited JSON ticks over a socket
+    AIML_FEED_SYMBOLS   AAPL,MSFT,RELIANCE.NS    symbols to subscribe to (Yahoo style)
+    AIML_FEED_BUFFER    ticks kept per symbol (default 4096)
+    AIML_FEED_STALE     seconds after which the last tick is ignored (default 60)
+
+A tick is {"symbol": "AAPL", "price": 231.4, "volume": 1200, "ts": 1760000000.0} with an
+optional "prev_close" (used for change/change_pct).
+
+    python market_feed.py --demo        # local socket replay, ingest rate and read latency
+"""
+
+import argparse
+import json
+import math
+import os
+import socket
+import socketserver
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+FEED_SOURCE = os.environ.get("AIML_FEED_SOURCE", "")
+FEED_SYMBOLS = [s.strip().upper() for s in os.environ.get("AIML_FEED_SYMBOLS", "").split(",") if s.strip()]
+BUFFER_SIZE = int(os.environ.get("AIML_FEED_BUFFER", 4096))
+STALE_AFTER = float(os.environ.get("AIML_FEED_STALE", 60))
+RECONNECT_DELAY = 2.0
+
+TICK_DTYPE = np.dtype([("ts", "f8"), ("price", "f8"), ("volume", "f8")])
+
+# A source takes the subscribed symbols and yields tick dicts until it is exhausted or fails
+Source = Callable[[list[str]], Iterable[dict]]
+
+
+class RingBuffer:
+    """Fixed-size tick buffer: appends overwrite the oldest tick once full."""
+
+    def __init__(self, size: int = BUFFER_SIZE):
+        self.size = size
+        self._data = np.zeros(size, dtype=TICK_DTYPE)
+        self._count = 0
+
+    def __len__(self):
+        return min(self._count, self.size)
+
+    def append(self, ts: float, price: float, volume: float):
+        self._data[self._count % self.size] = (ts, price, volume)
+        self._count += 1
+
+    def latest(self):
+        return self._data[(self._count - 1) % self.size] if self._count else None
+
+    def window(self) -> np.ndarray:
+        """Buffered ticks, oldest first (a copy)."""
+        if self._count <= self.size:
+            return self._data[: self._count].copy()
+        start = self._count % self.size
+        return np.concatenate((self._data[start:], self._data[:start]))
+
+
+class MarketFeed:
+    """Consumes a tick source on a daemon thread into one RingBuffer per subscribed symbol."""
+
+    def __init__(self, symbols: list[str], source: Source, buffer_size: int = BUFFER_SIZE, stale_after: float = STALE_AFTER):
+        self.symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+        self.source = source
+        self.stale_after = stale_after
+        self._buffers = {symbol: RingBuffer(buffer_size) for symbol in self.symbols}
+        self._prev_close: dict = {}
+        self._day: dict = {}  # symbol -> [day start ts, open, high, low], updated per tick
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.counts = {"ticks": 0, "ignored": 0, "bad_ticks": 0, "errors": 0}
+
+    def start(self) -> "MarketFeed":
+        self._thread = threading.Thread(target=self._consume, name="market-feed", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _consume(self):
+        while not self._stop.is_set():
+            try:
+                for tick in self.source(self.symbols):
+                    if self._stop.is_set():
+                        return
+                    self._ingest(tick)
+            except Exception:
+                self.counts["errors"] += 1
+            # Source ended or failed: reconnect / replay again after a short pause
+            self._stop.wait(RECONNECT_DELAY)
+
+    def _ingest(self, tick: dict):
+        # A malformed tick is counted and skipped; raising would drop the connection (or restart a replay)
+        try:
+            symbol = str(tick.get("symbol", "")).upper()
+            buffer = self._buffers.get(symbol)
+            if buffer is None:
+                self.counts["ignored"] += 1
+                return
+            ts, price = float(tick.get("ts") or time.time()), float(tick["price"])
+            volume = float(tick.get("volume") or 0)
+            prev_close = float(tick["prev_close"]) if tick.get("prev_close") is not None else None
+            if not (math.isfinite(ts) and math.isfinite(price) and price > 0):
+                raise ValueError(f"bad price {price!r}")
+        except (AttributeError, KeyError, TypeError, ValueError):
+            self.counts["bad_ticks"] += 1
+            return
+        with self._lock:
+            buffer.append(ts, price, volume)
+            if prev_close is not None:
+                self._prev_close[symbol] = prev_close
+            day = self._day.get(symbol)
+            if day is None or ts >= day[0] + 86400:
+                day_start = datetime.fromtimestamp(ts).replace(hour=0, minute=0, second=0, microsecond=0).timestamp()
+                self._day[symbol] = [day_start, price, price, price]
+            else:
+                day[2], day[3] = max(day[2], price), min(day[3], price)
+        self.counts["ticks"] += 1
+
+    def subscribed(self, symbol: str) -> bool:
+        return symbol.strip().upper() in self._buffers
+
+    def quote(self, symbol: str) -> Optional[dict]:
+        """
+        Latest price and the day's range (kept up to date on every tick, so reads are O(1)).
+
+        Returns:
+            None when the symbol is not subscribed, has no ticks yet, or the last tick is stale
+        """
+        symbol = symbol.strip().upper()
+        buffer = self._buffers.get(symbol)
+        if buffer is None:
+            return None
+        with self._lock:
+            last = buffer.latest()
+            if last is None or time.time() - last["ts"] > self.stale_after:
+                return None
+            ts, price, volume = float(last["ts"]), float(last["price"]), float(last["volume"])
+            _, day_open, day_high, day_low = self._day[symbol]
+            reference = self._prev_close.get(symbol) or day_open
+
+        return {
+            "symbol": symbol,
+            "price": round(price, 2),
+            "change": round(price - reference, 2),
+            "change_pct": round((price / reference - 1) * 100, 2) if reference else None,
+            "day_high": round(day_high, 2),
+            "day_low": round(day_low, 2),
+            "volume": volume,
+            "as_of": datetime.fromtimestamp(ts).isoformat(timespec="seconds"),
+        }
+
+    def stats(self) -> dict:
+        return {**self.counts, "symbols": len(self.symbols), "buffered": {s: len(b) for s, b in self._buffers.items()}}
+
+
+def file_source(path: str, speed: float = 0.0, loop: bool = True) -> Source:
+    """
+    Replay ticks from a JSONL file.
+
+    Args:
+        speed: 0 replays as fast as possible; otherwise the recorded gaps divided by speed
+        loop: Start over at the end of the file
+
+    Ticks are re-stamped with the current time, so replayed data counts as live.
+    """
+
+    def ticks(symbols: list[str]) -> Iterable[dict]:
+        wanted = set(symbols)
+        while True:
+            previous_ts = None
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        tick = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # a corrupt line must not restart the replay
+                    if not isinstance(tick, dict):
+                        continue
+                    if speed and previous_ts is not None and tick.get("ts"):
+                        time.sleep(max(0.0, (tick["ts"] - previous_ts) / speed))
+                    previous_ts = tick.get("ts")
+                    if tick.get("symbol", "").upper() in wanted:
+                        yield {**tick, "ts": time.time()}
+            if not loop:
+                return
+
+    return ticks
+
+
+def socket_source(host: str, port: int) -> Source:
+    """Newline-delimited JSON ticks over TCP; the first line sent is {"subscribe": [symbols]}."""
+
+    def ticks(symbols: list[str]) -> Iterable[dict]:
+        with socket.create_connection((host, port), timeout=30) as conn:
+            conn.sendall((json.dumps({"subscribe": symbols}) + "\n").encode())
+            with conn.makefile("r", encoding="utf-8") as lines:
+                for line in lines:
+                    if not line.strip():
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # skip it; the feed keeps the connection
+
+    return ticks
+
+
+def source_from_spec(spec: str) -> Source:
+    """'file:/path/ticks.jsonl' or 'tcp:host:port'."""
+    kind, _, target = spec.partition(":")
+    if kind == "file":
+        return file_source(target)
+    if kind == "tcp":
+        host, _, port = target.rpartition(":")
+        return socket_source(host or "127.0.0.1", int(port))
+    raise ValueError(f"Unknown feed source {spec!r} (use file:PATH or tcp:HOST:PORT)")
+
+
+_feed: Optional[MarketFeed] = None
+
+
+def start_from_env() -> Optional[MarketFeed]:
+    """Start the process-wide feed if AIML_FEED_SOURCE and AIML_FEED_SYMBOLS are set."""
+    global _feed
+    if _feed is None and FEED_SOURCE and FEED_SYMBOLS:
+        _feed = MarketFeed(FEED_SYMBOLS, source_from_spec(FEED_SOURCE)).start()
+    return _feed
+
+
+def set_feed(feed: Optional[MarketFeed]):
+    """Install (or remove, with None) the process-wide feed the quote tools read from."""
+    global _feed
+    _feed = feed
+
+
+def streamed_quote(symbol: str) -> Optional[dict]:
+    """Live quote from the process-wide feed, or None (no feed, unsubscribed, or stale)."""
+    return _feed.quote(symbol) if _feed is not None else None
+
+
+def sample_ticks(symbols: list[str], count: int, seed: int = 0) -> list[dict]:
+    """Synthetic random-walk ticks (round robin over symbols) for replays and benchmarks."""
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(50, 500, len(symbols))
+    steps = 1 + rng.normal(0, 0.0005, (count // len(symbols) + 1, len(symbols)))
+    prices = start * np.cumprod(steps, axis=0)
+    now = time.time()
+    return [
+        {"symbol": symbols[i % len(symbols)], "price": round(float(prices[i // len(symbols), i % len(symbols)]), 2),
+         "volume": 100 * (i // len(symbols) + 1), "ts": now + i * 0.001, "prev_close": round(float(start[i % len(symbols)]), 2)}
+        for i in range(count)
+    ]
+
+
+def serve_replay(ticks: list[dict], interval: float = 0.0, loop: bool = True) -> tuple[socketserver.ThreadingTCPServer, int]:
+    """
+    Local socket stand-in for a market-data server (daemon thread, free port).
+
+    Each client sends {"subscribe": [...]} and receives the matching ticks as JSON lines,
+    re-stamped with the current time, `interval` seconds apart.
+
+    Returns:
+        (server, port)
+    """
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            wanted = set(json.loads(self.rfile.readline()).get("subscribe", []))
+            try:
+                while True:
+                    for tick in ticks:
+                        if tick["symbol"] in wanted:
+                            self.wfile.write((json.dumps({**tick, "ts": time.time()}) + "\n").encode())
+                            if interval:
+                                time.sleep(interval)
+                    if not loop:
+                        return
+            except (BrokenPipeError, ConnectionResetError):
+                return
+
+    server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="feed-replay", daemon=True).start()
+    return server, server.server_address[1]
+
+
+def _demo(symbols: list[str], count: int):
+    ticks = sample_ticks(symbols, count)
+    server, port = serve_replay(ticks, loop=False)
+    feed = MarketFeed(symbols, socket_source("127.0.0.1", port)).start()
+
+    start = time.perf_counter()
+    while feed.counts["ticks"] < count and time.perf_counter() - start < 30:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    print(f"Ingested {feed.counts['ticks']} ticks for {len(symbols)} symbols in {elapsed:.2f}s ({feed.counts['ticks'] / elapsed:,.0f} ticks/s)")
+
+    reads = 10_000
+    start = time.perf_counter()
+    for i in range(reads):
+        feed.quote(symbols[i % len(symbols)])
+    print(f"quote(): {(time.perf_counter() - start) / reads * 1e6:.1f} us per read")
+    print(json.dumps(feed.quote(symbols[0]), indent=2))
+    feed.stop()
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming market-data feed")
+    parser.add_argument("--demo", action="store_true", help="Replay synthetic ticks over a local socket")
+    parser.add_argument("--symbols", default="AAPL,MSFT,NVDA,TSLA,RELIANCE.NS,TCS.NS")
+    parser.add_argument("--ticks", type=int, default=50_000)
+    args = parser.parse_args()
+
+    if args.demo or not FEED_SOURCE:
+        _demo(args.symbols.upper().split(","), args.ticks)
+    else:
+        feed = start_from_env()
+        while True:
+            time.sleep(5)
+            print({symbol: (feed.quote(symbol) or {}).get("price") for symbol in feed.symbols})
@@ -2,6 +2,8 @@
 Utility functions for LangChain examples.
 """
 
+import os
+from pathlib import Path
 from typing import Any
 
 
@@ -68,3 +70,19 @@ def print_model_info(model: Any):
         print(f"Max Tokens: {model.max_tokens}")
 
     print("=" * 60)
+
+
+def get_cache_dir(*parts: str) -> Path:
+    """
+    Return (and create) a local cache directory for the examples.
+
+    Args:
+        *parts: Optional subdirectory names, e.g. get_cache_dir("search")
+
+    Returns:
+        Path under AIML_CACHE_DIR (default: .cache next to this file)
+    """
+    root = Path(os.environ.get("AIML_CACHE_DIR", Path(__file__).parent / ".cache"))
+    path = root.joinpath(*parts)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
@@ -0,0 +1,275 @@
+"""
+Persistent NSE quote client.
+
+nsepython.nse_eq opens a new requests.Session for every quote and loads two NSE pages to get
+cookies before the actual API call, so each quote costs three round trips. NSEClient keeps
+one warm session instead:
+
+- cookies are fetched once and refreshed only after COOKIE_TTL seconds or when NSE rejects
+  them (401/403 or a non-JSON body), then the request is retried once
+- requests are spaced at least MIN_INTERVAL seconds apart across all threads (NSE blocks
+  clients that burst)
+- quotes() looks up many symbols in one call: cached ones are served locally, the rest are
+  fetched on a small thread pool sharing the session
+- quotes are cached for QUOTE_TTL seconds
+
+A local stand-in for the NSE endpoints (cookie handshake, quote API, simulated latency) makes
+the client testable and benchmarkable offline:
+
+    python nse_client.py --stand-in             # per-call sessions vs the persistent client
+    python nse_client.py RELIANCE TCS INFY      # live NSE
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, quote, urlparse
+
+from ttl_cache import TTLCache
+
+NSE_BASE_URL = os.environ.get("AIML_NSE_BASE_URL", "https://www.nseindia.com")
+COOKIE_TTL = float(os.environ.get("AIML_NSE_COOKIE_TTL", 300))
+MIN_INTERVAL = float(os.environ.get("AIML_NSE_MIN_INTERVAL", 0.2))
+QUOTE_TTL = float(os.environ.get("AIML_NSE_QUOTE_TTL", 30))
+MAX_WORKERS = 4
+TIMEOUT = 10
+
+HEADERS = {
+    "accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "accept-language": "en-US,en;q=0.9,en-IN;q=0.8",
+    "user-agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/129.0.0.0 Safari/537.36",
+}
+
+
+class NSEClient:
+    """One warm NSE session shared by all quote lookups (thread-safe)."""
+
+    def __init__(self, base_url: str = NSE_BASE_URL, cookie_ttl: float = COOKIE_TTL, min_interval: float = MIN_INTERVAL, quote_ttl: float = QUOTE_TTL):
+        import requests
+
+        self.base_url = base_url.rstrip("/")
+        self.cookie_ttl = cookie_ttl
+        self.min_interval = min_interval
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+        self._cache = TTLCache(ttl=quote_ttl, maxsize=2048)
+        self._cookie_lock = threading.Lock()
+        self._cookies_at = 0.0
+        self._rate_lock = threading.Lock()
+        self._next_slot = 0.0
+        self.counts = {"requests": 0, "cookie_refreshes": 0, "retries": 0}
+
+    def _throttle(self):
+        """Wait for this thread's turn so requests are at least min_interval apart."""
+        with self._rate_lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _get(self, url: str):
+        self._throttle()
+        self.counts["requests"] += 1
+        return self.session.get(url, timeout=TIMEOUT)
+
+    def _ensure_cookies(self, force: bool = False):
+        with self._cookie_lock:
+            if not force and time.monotonic() - self._cookies_at < self.cookie_ttl:
+                return
+            self.session.cookies.clear()
+            self._get(self.base_url)
+            self._cookies_at = time.monotonic()
+            self.counts["cookie_refreshes"] += 1
+
+    def _api(self, path: str) -> dict:
+        """GET an NSE API path as JSON, refreshing cookies and retrying once if they were rejected."""
+        self._ensure_cookies()
+        for attempt in range(2):
+            response = self._get(f"{self.base_url}{path}")
+            if response.status_code not in (401, 403):
+                try:
+                    return response.json()
+                except ValueError:
+                    pass  # NSE answers with an HTML page when the session is no longer valid
+            if attempt == 0:
+                self.counts["retries"] += 1
+                self._ensure_cookies(force=True)
+        response.raise_for_status()
+        raise ValueError(f"NSE returned a non-JSON response for {path}")
+
+    def quote(self, symbol: str) -> dict:
+        """Raw quote-equity payload for a symbol (same shape as nsepython.nse_eq), cached for quote_ttl."""
+        symbol = symbol.strip().upper()
+        payload = self._cache.get(symbol)
+        if payload is None:
+            payload = self._api(f"/api/quote-equity?symbol={quote(symbol)}")
+            if payload.get("priceInfo"):  # unknown symbols come back as {} or an error body
+                self._cache.set(symbol, payload)
+        return payload
+
+    def peek(self, symbol: str) -> Optional[dict]:
+        """Cached quote payload for a symbol, or None (never fetches)."""
+        return self._cache.get(symbol.strip().upper())
+
+    def quotes(self, symbols: list[str], max_workers: int = MAX_WORKERS) -> tuple[dict, dict]:
+        """
+        Quotes for many symbols; uncached ones are fetched concurrently on the shared session.
+
+        Returns:
+            ({symbol: payload}, {symbol: error message})
+        """
+        symbols = list(dict.fromkeys(s.strip().upper() for s in symbols if s.strip()))
+        payloads, errors = {}, {}
+
+        def fetch(symbol):
+            try:
+                return symbol, self.quote(symbol), None
+            except Exception as e:
+                return symbol, None, str(e)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(symbols)))) as pool:
+            for symbol, payload, error in pool.map(fetch, symbols):
+                if payload and payload.get("priceInfo"):
+                    payloads[symbol] = payload
+                else:
+                    errors[symbol] = error or "no data"
+        return payloads, errors
+
+    def cache_stats(self) -> dict:
+        return {**self._cache.stats(), **self.counts}
+
+
+_client: Optional[NSEClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> NSEClient:
+    """Process-wide client (created on first use)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = NSEClient()
+        return _client
+
+
+def _stand_in_payload(symbol: str) -> dict:
+    seed = sum(map(ord, symbol))
+    price = 100 + seed % 3000
+    return {
+        "info": {"symbol": symbol, "companyName": f"{symbol.title()} Ltd"},
+        "metadata": {"symbol": symbol, "pdSymbolPe": round(10 + seed % 40, 2), "marketCap": None},
+        "priceInfo": {"lastPrice": price, "change": 1.5, "pChange": round(150 / price, 2), "weekHighLow": {"max": price * 1.3, "min": price * 0.8}},
+    }
+
+
+def serve_stand_in(latency: float = 0.05, cookie_ttl: float = 60) -> tuple[ThreadingHTTPServer, str]:
+    """
+    Start a local stand-in for the NSE endpoints on a free port (daemon thread).
+
+    "/" sets a session cookie; "/api/quote-equity?symbol=X" needs a cookie younger than
+    cookie_ttl (else 401) and answers with a synthetic quote. Every request sleeps `latency`.
+
+    Returns:
+        (server, base_url); server.counts tracks page and API hits
+    """
+    issued: dict = {}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, body: bytes, content_type: str, headers: Optional[dict] = None):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            time.sleep(latency)
+            url = urlparse(self.path)
+            if not url.path.startswith("/api/"):
+                server.counts["pages"] += 1
+                token = f"t{time.monotonic_ns()}"
+                issued[token] = time.monotonic()
+                self._send(200, b"<html>NSE</html>", "text/html", {"Set-Cookie": f"nsit={token}; Path=/"})
+                return
+
+            server.counts["api"] += 1
+            cookies = dict(c.strip().split("=", 1) for c in self.headers.get("Cookie", "").split(";") if "=" in c)
+            if time.monotonic() - issued.get(cookies.get("nsit"), float("-inf")) > cookie_ttl:
+                self._send(401, b"Unauthorized", "text/plain")
+                return
+            symbol = parse_qs(url.query).get("symbol", [""])[0].upper()
+            self._send(200, json.dumps(_stand_in_payload(symbol)).encode(), "application/json")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.counts = {"pages": 0, "api": 0}
+    threading.Thread(target=server.serve_forever, name="nse-stand-in", daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def _per_call_quote(base_url: str, symbol: str) -> dict:
+    """What nsepython.nse_eq does: a new session and two cookie pages for every quote."""
+    import requests
+
+    session = requests.Session()
+    session.get(base_url, headers=HEADERS, timeout=TIMEOUT)
+    session.get(f"{base_url}/option-chain", headers=HEADERS, timeout=TIMEOUT)
+    return session.get(f"{base_url}/api/quote-equity?symbol={quote(symbol)}", headers=HEADERS, timeout=TIMEOUT).json()
+
+
+def _benchmark(symbols: list[str], latency: float):
+    server, base_url = serve_stand_in(latency=latency)
+    print(f"Stand-in NSE at {base_url}, {latency * 1000:.0f} ms per request, {len(symbols)} symbols")
+
+    start = time.perf_counter()
+    for symbol in symbols:
+        _per_call_quote(base_url, symbol)
+    print(f"  per-call sessions (nse_eq style): {time.perf_counter() - start:6.2f}s, {sum(server.counts.values())} requests")
+
+    client = NSEClient(base_url, min_interval=0.02)
+    server.counts.update(pages=0, api=0)
+    start = time.perf_counter()
+    for symbol in symbols:
+        client.quote(symbol)
+    print(f"  persistent client, one by one:    {time.perf_counter() - start:6.2f}s, {sum(server.counts.values())} requests")
+
+    client = NSEClient(base_url, min_interval=0.02)
+    server.counts.update(pages=0, api=0)
+    start = time.perf_counter()
+    payloads, errors = client.quotes(symbols)
+    print(f"  persistent client, batched:       {time.perf_counter() - start:6.2f}s, {sum(server.counts.values())} requests ({len(payloads)} ok)")
+
+    start = time.perf_counter()
+    client.quotes(symbols)
+    print(f"  batched again (cached):           {(time.perf_counter() - start) * 1000:6.2f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="NSE quote client")
+    parser.add_argument("symbols", nargs="*", default=["RELIANCE", "TCS", "INFY", "HDFCBANK", "ICICIBANK", "SBIN", "ITC", "LT", "BHARTIARTL", "HINDUNILVR"])
+    parser.add_argument("--stand-in", nargs="?", type=float, const=0.05, default=None, metavar="LATENCY", help="Benchmark against a local stand-in server")
+    args = parser.parse_args()
+
+    if args.stand_in is not None:
+        _benchmark(args.symbols, args.stand_in)
+    else:
+        client = get_client()
+        start = time.perf_counter()
+        payloads, errors = client.quotes(args.symbols)
+        for symbol, payload in payloads.items():
+            print(f"{symbol}: {payload['priceInfo'].get('lastPrice')}")
+        for symbol, error in errors.items():
+            print(f"{symbol}: error {error}")
+        print(f"{len(args.symbols)} symbols in {time.perf_counter() - start:.2f}s, {client.cache_stats()}")
@@ -0,0 +1,198 @@
+"""
+Vectorized portfolio analytics over one aligned price matrix.
+
+Given daily closes for N tickers (dates x tickers), everything is computed column-wise
+with NumPy/pandas, with no per-ticker Python loops:
+
+- per ticker: total return, annualized volatility, Sharpe (risk-free 0), max drawdown,
+  beta against a benchmark
+- portfolio (weighted, daily rebalanced): the same metrics
+- correlation matrix, average pairwise correlation, most/least correlated pairs
+
+Cost is linear in ticker count except the correlation matrix, which is inherently N^2 (it
+only starts to dominate in the hundreds of tickers).
+
+summarize() reduces this to a compact, LLM-sized dict (top/bottom names instead of full
+tables once N is large); save_artifact() writes the full per-ticker table and correlation
+matrix to .cache/artifacts/ for anyone who needs everything.
+
+    python portfolio.py --benchmark      # scaling in ticker count on synthetic prices
+"""
+
+import argparse
+import json
+import time
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from mlutils import get_cache_dir
+
+TRADING_DAYS = 252
+# Per-ticker rows are included in the summary up to this many tickers
+FULL_TABLE_LIMIT = 20
+
+
+def price_matrix(symbols: list[str], days: int = 365) -> pd.DataFrame:
+    """Aligned daily closes (dates x symbols) from the local price store."""
+    from price_store import history_many
+
+    frames = history_many(symbols, days)
+    closes = pd.DataFrame({symbol: frames[symbol.upper()]["Close"] for symbol in symbols if symbol.upper() in frames})
+    return closes.sort_index().ffill().dropna(how="all")
+
+
+def _max_drawdown(values: np.ndarray) -> np.ndarray:
+    """Max drawdown (negative fraction) of each column of a value/price matrix."""
+    running_peak = np.fmax.accumulate(values, axis=0)
+    return np.nanmin(values / running_peak - 1, axis=0)
+
+
+def compute_analytics(prices: pd.DataFrame, weights: Optional[dict] = None, benchmark: Optional[pd.Series] = None) -> dict:
+    """
+    Portfolio and per-ticker metrics from a price matrix.
+
+    Args:
+        prices: Daily closes, dates x tickers (forward-filled; leading gaps allowed)
+        weights: {ticker: weight}, normalized to sum to 1 (default: equal weight)
+        benchmark: Daily closes of the benchmark index, for beta
+
+    Returns:
+        {"per_ticker": DataFrame, "portfolio": dict, "correlation": DataFrame}
+    """
+    returns = prices.pct_change(fill_method=None).iloc[1:]
+    values = returns.to_numpy()
+    tickers = list(prices.columns)
+
+    w = np.array([(weights or {}).get(t, 0.0 if weights else 1.0) for t in tickers], dtype=float)
+    w = w / w.sum() if w.sum() else np.full(len(tickers), 1 / len(tickers))
+
+    first = prices.bfill().iloc[0].to_numpy()
+    last = prices.iloc[-1].to_numpy()
+    mean = np.nanmean(values, axis=0)
+    std = np.nanstd(values, axis=0, ddof=1)
+
+    per_ticker = pd.DataFrame(
+        {
+            "weight": w,
+            "total_return_pct": (last / first - 1) * 100,
+            "volatility_pct": std * np.sqrt(TRADING_DAYS) * 100,
+            "sharpe": np.where(std > 0, mean / std * np.sqrt(TRADING_DAYS), np.nan),
+            "max_drawdown_pct": _max_drawdown(prices.bfill().to_numpy()) * 100,
+        },
+        index=pd.Index(tickers, name="ticker"),
+    )
+
+    # Portfolio: daily-rebalanced weighted returns (missing returns count as 0)
+    portfolio_returns = np.nan_to_num(values) @ w
+    portfolio_value = np.cumprod(1 + portfolio_returns)
+    portfolio_std = portfolio_returns.std(ddof=1)
+    portfolio = {
+        "tickers": len(tickers),
+        "days": int(len(returns)),
+        "start": str(prices.index[0].date()),
+        "end": str(prices.index[-1].date()),
+        "total_return_pct": float(portfolio_value[-1] - 1) * 100,
+        "volatility_pct": float(portfolio_std * np.sqrt(TRADING_DAYS)) * 100,
+        "sharpe": float(portfolio_returns.mean() / portfolio_std * np.sqrt(TRADING_DAYS)) if portfolio_std > 0 else None,
+        "max_drawdown_pct": float(_max_drawdown(np.concatenate([[1.0], portfolio_value])[:, None])[0]) * 100,
+    }
+
+    if benchmark is not None:
+        bench = benchmark.reindex(prices.index).ffill().pct_change(fill_method=None).iloc[1:].to_numpy()
+        valid = ~np.isnan(bench)
+        b = bench[valid] - bench[valid].mean()
+        variance = (b @ b) / (len(b) - 1)
+        x = np.nan_to_num(values[valid] - np.nanmean(values[valid], axis=0))
+        per_ticker["beta"] = (b @ x) / (len(b) - 1) / variance
+        portfolio["beta"] = float(per_ticker["beta"].to_numpy() @ w)
+
+    correlation = returns.corr()
+    return {"per_ticker": per_ticker, "portfolio": portfolio, "correlation": correlation}
+
+
+def _pairs(correlation: pd.DataFrame, count: int, largest: bool) -> list:
+    matrix = correlation.to_numpy()
+    upper = np.triu_indices_from(matrix, k=1)
+    values = matrix[upper]
+    order = np.argsort(values)
+    order = order[::-1] if largest else order
+    tickers = correlation.columns
+    return [[tickers[upper[0][i]], tickers[upper[1][i]], round(float(values[i]), 3)] for i in order[:count] if not np.isnan(values[i])]
+
+
+def summarize(analytics: dict, top: int = 5) -> dict:
+    """Compact, LLM-sized view of compute_analytics() output."""
+    per_ticker, correlation = analytics["per_ticker"].round(3), analytics["correlation"]
+    summary = {"portfolio": {k: (round(v, 3) if isinstance(v, float) else v) for k, v in analytics["portfolio"].items()}}
+
+    if len(per_ticker) <= FULL_TABLE_LIMIT:
+        summary["per_ticker"] = {"columns": ["ticker", *per_ticker.columns], "rows": [[t, *row] for t, row in zip(per_ticker.index, per_ticker.to_numpy().tolist())]}
+    else:
+        def ranked(column: str, ascending: bool) -> dict:
+            return per_ticker[column].dropna().sort_values(ascending=ascending).head(top).round(2).to_dict()
+
+        summary["best_return_pct"] = ranked("total_return_pct", False)
+        summary["worst_return_pct"] = ranked("total_return_pct", True)
+        summary["highest_volatility_pct"] = ranked("volatility_pct", False)
+        summary["deepest_drawdown_pct"] = ranked("max_drawdown_pct", True)
+        if "beta" in per_ticker:
+            summary["highest_beta"] = ranked("beta", False)
+
+    if len(correlation) > 1:
+        matrix = correlation.to_numpy()
+        summary["average_pairwise_correlation"] = round(float(np.nanmean(matrix[np.triu_indices_from(matrix, k=1)])), 3)
+        summary["most_correlated_pairs"] = _pairs(correlation, 3, largest=True)
+        summary["least_correlated_pairs"] = _pairs(correlation, 3, largest=False)
+    return summary
+
+
+def save_artifact(analytics: dict, name: str = "portfolio") -> str:
+    """Write the full per-ticker table and correlation matrix as JSON; returns the path."""
+    path = get_cache_dir("artifacts") / f"{name}_{datetime.now():%Y%m%d_%H%M%S}.json"
+    artifact = {
+        "portfolio": analytics["portfolio"],
+        "per_ticker": json.loads(analytics["per_ticker"].to_json(orient="index")),
+        "correlation": json.loads(analytics["correlation"].round(4).to_json(orient="split")),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, indent=1)
+    return str(path)
+
+
+def _synthetic_prices(tickers: int, days: int = TRADING_DAYS, seed: int = 0) -> tuple[pd.DataFrame, pd.Series]:
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days)
+    market = rng.normal(0.0004, 0.01, days)
+    betas = rng.uniform(0.5, 1.5, tickers)
+    returns = market[:, None] * betas + rng.normal(0, 0.015, (days, tickers))
+    prices = pd.DataFrame(100 * np.cumprod(1 + returns, axis=0), index=index, columns=[f"T{i:03d}" for i in range(tickers)])
+    return prices, pd.Series(100 * np.cumprod(1 + market), index=index)
+
+
+def _benchmark():
+    print(f"{'tickers':>8} {'total ms':>10} {'us/ticker':>10}")
+    for n in (20, 50, 100, 200, 400):
+        prices, market = _synthetic_prices(n)
+        compute_analytics(prices, benchmark=market)  # warm up
+        runs = 20
+        start = time.perf_counter()
+        for _ in range(runs):
+            summarize(compute_analytics(prices, benchmark=market))
+        elapsed = (time.perf_counter() - start) / runs
+        print(f"{n:>8} {elapsed * 1000:>10.2f} {elapsed / n * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Portfolio analytics")
+    parser.add_argument("tickers", nargs="*", help="Analyze these tickers (equal weight) from the price store")
+    parser.add_argument("--benchmark", action="store_true", help="Time compute_analytics for 20-400 synthetic tickers")
+    args = parser.parse_args()
+
+    if args.benchmark or not args.tickers:
+        _benchmark()
+    else:
+        analytics = compute_analytics(price_matrix(args.tickers), benchmark=price_matrix(["SPY"])["SPY"])
+        print(json.dumps(summarize(analytics), indent=2))
@@ -0,0 +1,190 @@
+"""
+Query-time data prefetch for the financial agent.
+
+For "Compare the PE ratios of AAPL and TSLA" the agent used to wait for the model to plan
+and only then fetch each quote as the model asked for it. plan() instead reads the raw query
+with cheap rules: tickers and company names via symbol_index (exact matches only, no fuzzy
+guessing) and intents via keywords. start() then warms the same caches the tools read from,
+on a thread pool, while the first LLM call is still in flight:
+
+    price / PE / compare      market_data.get_info (US) or the NSE client quote (NSE)
+    financial statements      statements.get_statements
+    market cap change         price_store.history + shares_outstanding
+    portfolio / correlation   price_store.history_many
+
+By the time the model emits its tool calls the data is usually cached. Prefetch is best
+effort: errors are counted and otherwise ignored, and the tools fetch as usual on a miss.
+
+Set AIML_PREFETCH=0 to disable.
+
+    python prefetch.py "Compare the PE ratios of AAPL and TSLA"    # show the plan
+"""
+
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, NamedTuple, Optional
+
+from symbol_index import Listing, get_index
+
+ENABLED = os.environ.get("AIML_PREFETCH", "1") != "0"
+MAX_WORKERS = 8
+MAX_SYMBOLS = 10
+MAX_NGRAM = 4
+
+INTENT_PATTERNS = {
+    "financials": re.compile(r"\b(financials?|revenue|net income|earnings|balance sheet|debt|assets|statements?|profit)\b", re.IGNORECASE),
+    "market_cap_change": re.compile(r"\bmarket ?cap\w*\b.*\b(chang\w*|grow\w*|fell|rose|last|past|over)\b", re.IGNORECASE),
+    "portfolio": re.compile(r"\b(portfolio|correlat\w*|volatility|drawdown|sharpe|beta)\b", re.IGNORECASE),
+    "price": re.compile(r"\b(price|quote|trading|worth|pe|p/e|valuation|compare|52.week|market ?cap)\b", re.IGNORECASE),
+}
+# Without an intent keyword a named company is only prefetched when the query is about markets
+_FINANCE_RE = re.compile(r"\b(stocks?|shares?|tickers?|equity|markets?|invest\w*|buy|sell|dividends?|nse|bse|nyse|nasdaq)\b", re.IGNORECASE)
+_DAYS_RE = re.compile(r"\b(\d{1,4})\s*days?\b", re.IGNORECASE)
+_TICKER_WORD_RE = re.compile(r"\b[A-Z][A-Z0-9&\-]{1,11}(?:\.(?:NS|BO))?\b")
+_WORD_RE = re.compile(r"[\w&'’.-]+")
+
+_pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="prefetch")
+
+
+class Plan(NamedTuple):
+    listings: list[Listing]
+    intents: list[str]
+    days: int
+
+
+def find_listings(query: str) -> list[Listing]:
+    """Listings mentioned in a query: upper-case tickers and exact company names or aliases."""
+    index = get_index()
+    found: dict[Listing, None] = {}
+
+    for word in _TICKER_WORD_RE.findall(query):
+        for listing in index.ticker(word):
+            found[listing] = None
+
+    words = [w.strip(".'’") for w in _WORD_RE.findall(query)]
+    i = 0
+    while i < len(words):
+        # Longest name first: "tata consultancy services" before "tata"
+        for n in range(min(MAX_NGRAM, len(words) - i), 0, -1):
+            phrase = " ".join(words[i : i + n])
+            matches = index.by_name(phrase)
+            if matches:
+                found[matches[0].listing] = None
+                i += n
+                break
+        else:
+            i += 1
+    return list(found)[:MAX_SYMBOLS]
+
+
+def plan(query: str) -> Plan:
+    """What to prefetch for a query (no network)."""
+    listings = find_listings(query)
+    intents = [name for name, pattern in INTENT_PATTERNS.items() if pattern.search(query)]
+    if listings and not intents and (_FINANCE_RE.search(query) or any(get_index().ticker(w) for w in _TICKER_WORD_RE.findall(query))):
+        intents = ["price"]
+    days = int(_DAYS_RE.search(query).group(1)) if _DAYS_RE.search(query) else 30
+    return Plan(listings, intents, days)
+
+
+def _tasks(query_plan: Plan) -> list[tuple[str, Callable]]:
+    """(label, callable) pairs that warm the tool caches for a plan."""
+    from market_feed import streamed_quote
+
+    tasks = []
+    for listing in query_plan.listings:
+        symbol = listing.yahoo_symbol
+        if "price" in query_plan.intents and streamed_quote(symbol) is None:
+            if listing.exchange == "NSE":
+                from nse_client import get_client
+
+                tasks.append((f"quote:{listing.symbol}", lambda s=listing.symbol: get_client().quote(s)))
+            else:
+                from market_data import get_info
+
+                tasks.append((f"info:{symbol}", lambda s=symbol: get_info(s)))
+        if "financials" in query_plan.intents:
+            from statements import get_statements
+
+            tasks.append((f"statements:{symbol}", lambda s=symbol: get_statements(s)))
+        if "market_cap_change" in query_plan.intents:
+            import price_store
+
+            tasks.append((f"history:{symbol}", lambda s=symbol: price_store.history(s, query_plan.days)))
+            tasks.append((f"shares:{symbol}", lambda s=symbol: price_store.shares_outstanding(s)))
+
+    if "portfolio" in query_plan.intents and query_plan.listings:
+        import price_store
+
+        symbols = [listing.yahoo_symbol for listing in query_plan.listings]
+        tasks.append((f"histories:{len(symbols)}", lambda: price_store.history_many(symbols, 365)))
+    return tasks
+
+
+class Prefetch:
+    """Handle for one query's prefetch tasks."""
+
+    def __init__(self, query_plan: Plan, futures: dict[str, Future]):
+        self.plan = query_plan
+        self.futures = futures
+        self.started = time.perf_counter()
+        self._finished: dict[str, float] = {}
+        self._lock = threading.Lock()
+        for label, future in futures.items():
+            future.add_done_callback(lambda _, label=label: self._done(label))
+
+    def _done(self, label: str):
+        with self._lock:
+            self._finished[label] = time.perf_counter() - self.started
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until every task finished (True) or the timeout passed (False)."""
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        for future in self.futures.values():
+            remaining = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            try:
+                future.result(timeout=remaining)
+            except TimeoutError:
+                return False
+            except Exception:
+                pass
+        return True
+
+    def summary(self) -> dict:
+        done = [f for f in self.futures.values() if f.done()]
+        return {
+            "symbols": [listing.yahoo_symbol for listing in self.plan.listings],
+            "intents": self.plan.intents,
+            "tasks": len(self.futures),
+            "done": len(done),
+            "errors": sum(1 for f in done if f.exception() is not None),
+            "slowest_ms": round(max(self._finished.values(), default=0) * 1000, 1),
+        }
+
+
+def start(query: str) -> Prefetch:
+    """Plan the query and start warming caches in the background; returns immediately."""
+    query_plan = plan(query) if ENABLED else Plan([], [], 0)
+    return Prefetch(query_plan, {label: _pool.submit(task) for label, task in _tasks(query_plan)})
+
+
+if __name__ == "__main__":
+    queries = sys.argv[1:] or [
+        "What is the current stock price of Apple (AAPL)?",
+        "Show me the financial statements for Tesla (TSLA)",
+        "Compare the PE ratios of AAPL and TSLA. Which is a better value?",
+        "What is the stock price of Reliance Industries?",
+        "How much has Tesla's market cap changed in the last 90 days?",
+        "Get financial data for TCS",
+        "Tell me a joke",
+    ]
+    for text in queries:
+        start_time = time.perf_counter()
+        query_plan = plan(text)
+        elapsed = (time.perf_counter() - start_time) * 1000
+        tasks = [label for label, _ in _tasks(query_plan)]
+        print(f"{text!r} [{elapsed:.2f} ms]\n  symbols={[l.yahoo_symbol for l in query_plan.listings]} intents={query_plan.intents} tasks={tasks}")
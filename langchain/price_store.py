@@ -0,0 +1,286 @@
+"""
+Local columnar price-history store (one Parquet file per symbol).
+
+calculate_market_cap_change downloaded `history(period=f"{days}d")` from scratch on every
+call and read `.info` again for shares outstanding. This store keeps daily OHLCV per
+symbol under .cache/prices/ and:
+
+- reads files memory-mapped through pyarrow, with an in-process copy keyed by file mtime,
+  so repeated 30/90/365-day lookups take a few milliseconds and no network calls
+- on refresh (at most every PRICE_REFRESH seconds) downloads only the trailing days after
+  the last stored bar (the last bar is re-fetched, since it may have been intraday), and
+  backfills older days only when a longer window than stored is requested
+- both downloads overlap the store by a complete bar; Yahoo's Close is split-adjusted, so if
+  the overlap no longer matches (a split since the bars were stored) the whole range is
+  downloaded again instead of mixing two price bases
+- caches shares-outstanding snapshots per symbol (refreshed every SHARES_TTL seconds), kept
+  as a dated series so market cap history can use the snapshot in effect at each date
+- history_many() fills all not-yet-stored symbols of a portfolio with one bulk download
+
+    python price_store.py AAPL MSFT --days 365     # fill / refresh and time repeated lookups
+"""
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import Optional
+
+from mlutils import get_cache_dir
+
+PRICE_REFRESH = float(os.environ.get("AIML_PRICE_REFRESH", 3600))
+SHARES_TTL = float(os.environ.get("AIML_SHARES_TTL", 7 * 86400))
+# First download covers at least this many days, so later 30/90/365-day lookups are local
+MIN_HISTORY_DAYS = 400
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+# Relative Close difference on overlapping bars that means the history was re-adjusted
+REBASE_TOLERANCE = 1e-3
+
+_frames: dict = {}  # symbol -> (mtime, DataFrame)
+_locks: dict = {}
+_locks_guard = threading.Lock()
+_meta_lock = threading.Lock()
+
+
+def _store_dir():
+    return get_cache_dir("prices")
+
+
+def _path(symbol: str) -> str:
+    return str(_store_dir() / f"{symbol.upper().replace('/', '_')}.parquet")
+
+
+def _meta_path() -> str:
+    return str(_store_dir() / "_meta.json")
+
+
+def _symbol_lock(symbol: str) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(symbol, threading.Lock())
+
+
+def _read_meta() -> dict:
+    try:
+        with open(_meta_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _update_meta(symbol: str, **fields):
+    with _meta_lock:
+        meta = _read_meta()
+        meta.setdefault(symbol, {}).update(fields)
+        tmp_path = f"{_meta_path()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=1)
+        os.replace(tmp_path, _meta_path())
+
+
+def load(symbol: str):
+    """Stored history for a symbol (memory-mapped read, cached until the file changes), or None."""
+    import pyarrow.parquet as pq
+
+    symbol = symbol.upper()
+    path = _path(symbol)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    cached = _frames.get(symbol)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    frame = pq.read_table(path, memory_map=True).to_pandas()
+    _frames[symbol] = (mtime, frame)
+    return frame
+
+
+def _save(symbol: str, frame):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    path = _path(symbol)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(pa.Table.from_pandas(frame, preserve_index=True), tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _download(symbol: str, start: date, end: Optional[date] = None):
+    """Daily bars in [start, end) from Yahoo, tz-naive date index, COLUMNS only."""
+    import yfinance as yf
+
+    frame = yf.Ticker(symbol).history(start=start.isoformat(), end=(end or date.today() + timedelta(days=1)).isoformat(), auto_adjust=False)
+    if frame.empty:
+        return frame
+    if frame.index.tz is not None:
+        frame.index = frame.index.tz_localize(None)
+    frame.index = frame.index.normalize()
+    frame.index.name = "Date"
+    return frame[COLUMNS].astype("float64")
+
+
+def _rebased(frame, download) -> bool:
+    """True if re-fetched complete bars disagree with the stored ones (adjusted for a split since)."""
+    common = frame.index.intersection(download.index)
+    common = common[common < frame.index[-1]]  # the last stored bar may have been intraday
+    if common.empty:
+        return False
+    change = download.loc[common, "Close"] / frame.loc[common, "Close"] - 1
+    return bool((change.abs() > REBASE_TOLERANCE).any())
+
+
+def refresh(symbol: str, days: int = MIN_HISTORY_DAYS, force: bool = False):
+    """
+    Make sure the store covers the last `days` days and is reasonably current.
+
+    Only the missing trailing days (and, if needed, missing older days) are downloaded, plus
+    one overlapping bar each; if those no longer match, everything is downloaded again.
+
+    Returns:
+        The full stored DataFrame (may be empty if Yahoo has no data)
+    """
+    import pandas as pd
+
+    symbol = symbol.upper()
+    with _symbol_lock(symbol):
+        frame = load(symbol)
+        meta = _read_meta().get(symbol, {})
+        checked_at = meta.get("checked_at", 0)
+        wanted_start = date.today() - timedelta(days=max(days, 1))
+
+        if frame is None or frame.empty:
+            frame = _download(symbol, date.today() - timedelta(days=max(days, MIN_HISTORY_DAYS)))
+            if not frame.empty:
+                _save(symbol, frame)
+            _update_meta(symbol, checked_at=time.time())
+            return load(symbol) if not frame.empty else frame
+
+        downloads = []
+        first, last = frame.index[0].date(), frame.index[-1].date()
+        backfilled_from = date.fromisoformat(meta.get("backfilled_from", first.isoformat()))
+        # Backfill only beyond what was already tried (allowing for weekends/holidays at the edge)
+        if wanted_start < min(first - timedelta(days=4), backfilled_from):
+            downloads.append(_download(symbol, wanted_start, first + timedelta(days=1)))
+            _update_meta(symbol, backfilled_from=wanted_start.isoformat())
+        if force or time.time() - checked_at > PRICE_REFRESH:
+            # From the bar before the last, the newest one known to be a complete day
+            downloads.append(_download(symbol, frame.index[-2].date() if len(frame) > 1 else last))
+            _update_meta(symbol, checked_at=time.time())
+
+        downloads = [d for d in downloads if not d.empty]
+        if not downloads:
+            return frame
+        if any(_rebased(frame, d) for d in downloads):
+            # Stored bars are on the pre-split basis: replace them rather than append to them
+            fresh = _download(symbol, min(first, wanted_start))
+            if fresh.empty:
+                return frame
+            _save(symbol, fresh)
+            return load(symbol)
+        merged = pd.concat([frame, *downloads])
+        merged = merged[~merged.index.duplicated(keep="last")].sort_index()
+        if merged.equals(frame):
+            return frame
+        _save(symbol, merged)
+        return load(symbol)
+
+
+def history_many(symbols: list[str], days: int, max_workers: int = 8) -> dict:
+    """
+    Histories for many symbols: symbols not stored yet are filled with ONE bulk download,
+    stored ones are refreshed incrementally in parallel.
+
+    Returns:
+        {symbol: DataFrame of the last `days` days} (symbols without data are left out)
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    import yfinance as yf
+
+    symbols = list(dict.fromkeys(s.upper() for s in symbols))
+    new = [s for s in symbols if load(s) is None]
+    if len(new) > 1:
+        start = date.today() - timedelta(days=max(days, MIN_HISTORY_DAYS))
+        bulk = yf.download(new, start=start.isoformat(), group_by="ticker", auto_adjust=False, progress=False, threads=True)
+        for symbol in new:
+            if bulk is None or bulk.empty or symbol not in bulk.columns.get_level_values(0):
+                continue
+            frame = bulk[symbol][COLUMNS].dropna(how="all").astype("float64")
+            if frame.empty:
+                continue
+            if frame.index.tz is not None:
+                frame.index = frame.index.tz_localize(None)
+            frame.index = frame.index.normalize()
+            frame.index.name = "Date"
+            with _symbol_lock(symbol):
+                _save(symbol, frame)
+                _update_meta(symbol, checked_at=time.time())
+
+    def fetch(symbol):
+        try:
+            return symbol, history(symbol, days)
+        except Exception:
+            return symbol, None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return {symbol: frame for symbol, frame in pool.map(fetch, symbols) if frame is not None and not frame.empty}
+
+
+def history(symbol: str, days: int):
+    """Daily bars for the last `days` calendar days (refreshing the store only if needed)."""
+    import pandas as pd
+
+    frame = refresh(symbol, days)
+    if frame.empty:
+        return frame
+    return frame[frame.index >= pd.Timestamp(date.today() - timedelta(days=days))]
+
+
+def shares_outstanding(symbol: str, on: Optional[date] = None) -> Optional[float]:
+    """
+    Shares outstanding from the cached snapshots (a fresh snapshot is taken every SHARES_TTL).
+
+    Args:
+        on: Return the snapshot in effect on this date (default: latest)
+    """
+    symbol = symbol.upper()
+    snapshots = _read_meta().get(symbol, {}).get("shares", [])  # [[iso date, shares, taken_at], ...]
+
+    if not snapshots or time.time() - snapshots[-1][2] > SHARES_TTL:
+        from market_data import get_info
+
+        shares = get_info(symbol).get("sharesOutstanding")
+        if shares:
+            today = date.today().isoformat()
+            snapshots = [s for s in snapshots if s[0] != today] + [[today, float(shares), time.time()]]
+            _update_meta(symbol, shares=snapshots)
+
+    if not snapshots:
+        return None
+    if on is not None:
+        earlier = [s for s in snapshots if s[0] <= on.isoformat()]
+        return (earlier[-1] if earlier else snapshots[0])[1]
+    return snapshots[-1][1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill the local price store and time repeated lookups")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--days", type=int, default=365)
+    args = parser.parse_args()
+
+    for symbol in args.symbols:
+        start = time.perf_counter()
+        frame = refresh(symbol, args.days)
+        print(f"{symbol}: {len(frame)} bars stored in {time.perf_counter() - start:.2f}s -> {_path(symbol)}")
+        for days in (30, 90, 365):
+            start = time.perf_counter()
+            window = history(symbol, days)
+            print(f"  {days:>3}d lookup: {len(window)} bars in {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
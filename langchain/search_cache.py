@@ -0,0 +1,230 @@
+"""
+Cached web search on a persistent DuckDuckGo session.
+
+The search tool used to open a new DDGS() session on every call, and agents often repeat
+near-identical searches within one run. Here:
+
+- DDGS sessions are created once and reused (a small pool, so a background prefetch does
+  not block a foreground search).
+- Queries are normalized (case, whitespace, punctuation, filler words) before caching, so
+  "Tell me the capital of France, please" and "capital of france" share one entry.
+- Results are cached in memory (SEARCH_TTL) and on disk in SQLite (SEARCH_DISK_TTL), so
+  they also survive restarts.
+- With prefetch enabled (AIML_SEARCH_PREFETCH=1 or prefetch=True), the next results page
+  is fetched in the background after each miss.
+- Hits, misses and prefetches are counted; stats_since() gives the numbers for one run.
+"""
+
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from deadline import remaining_time
+from mlutils import get_cache_dir
+from ttl_cache import TTLCache
+
+SEARCH_TTL = float(os.environ.get("AIML_SEARCH_TTL", 1800))
+SEARCH_DISK_TTL = float(os.environ.get("AIML_SEARCH_DISK_TTL", 86400))
+PREFETCH_DEFAULT = os.environ.get("AIML_SEARCH_PREFETCH", "0") == "1"
+SESSION_POOL_SIZE = 2
+SESSION_TIMEOUT = 10
+SESSION_WAIT = 0.5  # longest wait for a pooled session before using a one-off one
+
+# Filler only: question words, auxiliaries and prepositions change the meaning ("when was" /
+# "where was", "who is" / "who was", "to" / "from") and stay in the key
+STOP_WORDS = frozenset("a an the please".split())
+FILLER_RE = re.compile(r"\b(?:(?:can|could|would|will)\s+you|tell\s+me|show\s+me|give\s+me|i\s+(?:want|would\s+like)\s+to\s+know|do\s+you\s+know)\b")
+
+_memory = TTLCache(ttl=SEARCH_TTL, maxsize=512)
+_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "errors": 0, "prefetched": 0, "prefetch_hits": 0}
+_stats_lock = threading.Lock()
+_prefetched_keys: set = set()
+_prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="search-prefetch")
+_sessions: Optional[queue.Queue] = None
+_sessions_lock = threading.Lock()
+_db_lock = threading.Lock()
+_db: Optional[sqlite3.Connection] = None
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and filler words, collapse whitespace (word order is kept)."""
+    words = re.findall(r"[\w.+#-]+", FILLER_RE.sub(" ", re.sub(r"['’]s\b", "", query.lower())))
+    words = [w.strip(".-") for w in words if w.strip(".-")]
+    content = [w for w in words if w not in STOP_WORDS]
+    return " ".join(content or words)
+
+
+def _count(name: str, amount: int = 1):
+    with _stats_lock:
+        _stats[name] += amount
+
+
+def stats() -> dict:
+    """Cumulative counters for this process."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def stats_since(snapshot: dict) -> dict:
+    """Counters accumulated since an earlier stats() snapshot (e.g. the start of a query)."""
+    current = stats()
+    delta = {name: current[name] - snapshot.get(name, 0) for name in current}
+    lookups = delta["memory_hits"] + delta["disk_hits"] + delta["misses"]
+    delta["hit_rate"] = round((delta["memory_hits"] + delta["disk_hits"]) / lookups, 3) if lookups else 0.0
+    return delta
+
+
+def _connect() -> sqlite3.Connection:
+    """Shared connection to the disk tier (callers hold _db_lock)."""
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(str(get_cache_dir() / "search_cache.sqlite"), timeout=5, check_same_thread=False)
+        _db.execute("CREATE TABLE IF NOT EXISTS search_results (key TEXT PRIMARY KEY, fetched_at REAL NOT NULL, results TEXT NOT NULL)")
+    return _db
+
+
+def _disk_get(key: str) -> Optional[list]:
+    try:
+        with _db_lock:
+            row = _connect().execute("SELECT fetched_at, results FROM search_results WHERE key = ?", (key,)).fetchone()
+    except sqlite3.Error:
+        return None
+    if row is None or time.time() - row[0] > SEARCH_DISK_TTL:
+        return None
+    return json.loads(row[1])
+
+
+def _disk_set(key: str, results: list):
+    try:
+        with _db_lock, _connect() as conn:  # the connection context manager commits
+            conn.execute("INSERT OR REPLACE INTO search_results VALUES (?, ?, ?)", (key, time.time(), json.dumps(results)))
+    except sqlite3.Error:
+        pass
+
+
+def _session_pool() -> queue.Queue:
+    global _sessions
+    with _sessions_lock:
+        if _sessions is None:
+            from ddgs import DDGS
+
+            _sessions = queue.Queue()
+            for _ in range(SESSION_POOL_SIZE):
+                _sessions.put(DDGS(timeout=SESSION_TIMEOUT))
+    return _sessions
+
+
+def _fetch(query: str, max_results: int, page: int) -> list:
+    """Search on a pooled session, bounded by the current query's remaining time budget."""
+    from ddgs import DDGS
+
+    timeout = remaining_time(SESSION_TIMEOUT)
+    # A session's engines keep the HTTP timeout they were created with, so a shorter budget
+    # gets a one-off session created with it
+    if timeout < SESSION_TIMEOUT:
+        return DDGS(timeout=max(1, int(timeout))).text(query, max_results=max_results, page=page)
+
+    pool = _session_pool()
+    try:
+        session = pool.get(timeout=SESSION_WAIT)
+    except queue.Empty:
+        # Every session is held (e.g. by an abandoned over-deadline call): use a one-off session
+        return DDGS(timeout=SESSION_TIMEOUT).text(query, max_results=max_results, page=page)
+    try:
+        return session.text(query, max_results=max_results, page=page)
+    finally:
+        pool.put(session)
+
+
+def _cache_key(query: str, max_results: int, page: int) -> str:
+    return f"{normalize_query(query)}|{max_results}|{page}"
+
+
+def _cached(key: str) -> Optional[list]:
+    results = _memory.get(key)
+    if results is not None:
+        _count("memory_hits")
+    else:
+        results = _disk_get(key)
+        if results is None:
+            return None
+        _count("disk_hits")
+        _memory.set(key, results)
+
+    if key in _prefetched_keys:
+        _prefetched_keys.discard(key)
+        _count("prefetch_hits")
+    return results
+
+
+def _prefetch(query: str, max_results: int, page: int):
+    key = _cache_key(query, max_results, page)
+    if _memory.get(key) is not None:
+        return
+    try:
+        results = _fetch(query, max_results, page)
+    except Exception:
+        return
+    _memory.set(key, results)
+    _disk_set(key, results)
+    _prefetched_keys.add(key)
+    _count("prefetched")
+
+
+def cached_search(query: str, max_results: int = 5, page: int = 1, prefetch: Optional[bool] = None) -> list[dict]:
+    """
+    Search results for a query, served from cache when an equivalent query was seen.
+
+    Args:
+        query: Search query (normalized for the cache key; sent to DDGS as given)
+        max_results: Results per page
+        page: Results page (1-based)
+        prefetch: Fetch the next page in the background on a miss (default: AIML_SEARCH_PREFETCH)
+
+    Returns:
+        List of result dicts (title, body, href)
+    """
+    key = _cache_key(query, max_results, page)
+    results = _cached(key)
+    if results is not None:
+        return results
+
+    _count("misses")
+    try:
+        results = _fetch(query, max_results, page)
+    except Exception:
+        _count("errors")
+        raise
+    _memory.set(key, results)
+    _disk_set(key, results)
+
+    if (PREFETCH_DEFAULT if prefetch is None else prefetch) and len(results) >= max_results:
+        _prefetch_pool.submit(_prefetch, query, max_results, page + 1)
+    return results
+
+
+def clear(disk: bool = False):
+    """Drop cached results (memory only, or memory and disk)."""
+    _memory.clear()
+    if disk:
+        with _db_lock, _connect() as conn:
+            conn.execute("DELETE FROM search_results")
+
+
+if __name__ == "__main__":
+    queries = ["Tell me the capital of France, please", "capital of france", "  Capital  of FRANCE ", "latest python release"]
+    before = stats()
+    for q in queries:
+        start = time.perf_counter()
+        try:
+            found = cached_search(q, prefetch=True)
+            print(f"{q!r} -> {normalize_query(q)!r}: {len(found)} results in {(time.perf_counter() - start) * 1000:.1f} ms")
+        except Exception as e:
+            print(f"{q!r}: error {str(e).splitlines()[0][:200]}")
+    print(f"Stats: {stats_since(before)}")
@@ -0,0 +1,197 @@
+"""
+Financial-statement engine shared by the US and NSE statement tools.
+
+Both tools used to read `stock.financials` and then `stock.balance_sheet` (two sequential
+Yahoo round trips) on every call, although the numbers only change once a quarter. Here:
+
+- full statement frames are cached on disk per (symbol, statement, period) as Parquet under
+  .cache/statements/, valid for STATEMENT_TTL seconds, with an in-process copy keyed by file mtime
+- on a miss, all missing statements of a request are fetched concurrently
+- any number of periods and line items are served from the cached frames, so follow-up
+  questions ("and the year before?", "operating income?") need no network at all
+
+    python statements.py AAPL MSFT --periods 3     # cold vs cached timings
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from mlutils import get_cache_dir
+
+STATEMENT_TTL = float(os.environ.get("AIML_STATEMENT_TTL", 7 * 86400))
+
+# statement -> yfinance Ticker attribute, per period
+STATEMENTS = {
+    "income": {"annual": "financials", "quarterly": "quarterly_financials"},
+    "balance": {"annual": "balance_sheet", "quarterly": "quarterly_balance_sheet"},
+    "cashflow": {"annual": "cashflow", "quarterly": "quarterly_cashflow"},
+}
+# Summary line items: output key -> (statement, row label)
+KEY_ITEMS = {
+    "revenue": ("income", "Total Revenue"),
+    "net_income": ("income", "Net Income"),
+    "total_assets": ("balance", "Total Assets"),
+    "total_debt": ("balance", "Total Debt"),
+}
+
+_frames: dict = {}  # path -> (mtime, DataFrame)
+
+
+def _path(symbol: str, statement: str, period: str) -> str:
+    return str(get_cache_dir("statements") / f"{symbol.upper()}_{statement}_{period}.parquet")
+
+
+def _load(path: str):
+    """Cached frame (line items x period dates) if present and younger than STATEMENT_TTL, else None."""
+    import pandas as pd
+
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    if time.time() - mtime / 1e9 > STATEMENT_TTL:
+        return None
+
+    cached = _frames.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    frame = pd.read_parquet(path).T  # stored transposed: Parquet wants string column names
+    _frames[path] = (mtime, frame)
+    return frame
+
+
+def _save(path: str, frame):
+    tmp_path = f"{path}.tmp"
+    stored = frame.T
+    stored.columns = stored.columns.astype(str)
+    stored.to_parquet(tmp_path)
+    os.replace(tmp_path, path)
+
+
+def _fetch(symbol: str, statement: str, period: str):
+    import yfinance as yf
+
+    return getattr(yf.Ticker(symbol), STATEMENTS[statement][period])
+
+
+def get_statements(symbol: str, statements: tuple = ("income", "balance"), period: str = "annual") -> dict:
+    """
+    Statement frames for a symbol, from the disk cache or fetched concurrently on a miss.
+
+    Args:
+        symbol: Yahoo symbol (e.g. AAPL, RELIANCE.NS)
+        statements: Any of "income", "balance", "cashflow"
+        period: "annual" or "quarterly"
+
+    Returns:
+        {statement: DataFrame of line items x period end dates, newest first} (empty if Yahoo has none)
+    """
+    import pandas as pd
+
+    symbol = symbol.upper()
+    frames, missing = {}, []
+    for statement in statements:
+        frame = _load(_path(symbol, statement, period))
+        if frame is None:
+            missing.append(statement)
+        else:
+            frames[statement] = frame
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=len(missing)) as pool:
+            fetched = list(pool.map(lambda statement: _fetch(symbol, statement, period), missing))
+        for statement, frame in zip(missing, fetched):
+            frame = frame if frame is not None else pd.DataFrame()
+            if not frame.empty:
+                frame = frame[sorted(frame.columns, reverse=True)]
+                _save(_path(symbol, statement, period), frame)
+            frames[statement] = frame
+    return frames
+
+
+def _value(frame, label: str, column: int) -> Optional[float]:
+    if label not in frame.index or column >= frame.shape[1]:
+        return None
+    value = frame.iloc[frame.index.get_loc(label), column]
+    return None if value != value else float(value)  # NaN -> None
+
+
+def format_amount(value: float, currency: str) -> str:
+    """Readable amount: $B/$M for USD, ₹ Crore for INR."""
+    if currency == "INR":
+        return f"₹{value / 10_000_000:.2f} Cr" if abs(value) >= 10_000_000 else f"₹{value:,.0f}"
+    if abs(value) >= 1_000_000_000:
+        return f"${value / 1_000_000_000:.2f}B"
+    if abs(value) >= 1_000_000:
+        return f"${value / 1_000_000:.2f}M"
+    return f"${value:,.0f}"
+
+
+def key_figures(symbol: str, currency: str, periods: int = 1, period: str = "annual", items: Optional[list[str]] = None) -> list[dict]:
+    """
+    Revenue, net income, total assets and total debt (plus any extra line items) per period.
+
+    Args:
+        symbol: Yahoo symbol
+        currency: "USD" or "INR" (for the *_formatted fields)
+        periods: Number of most recent periods
+        period: "annual" or "quarterly"
+        items: Extra line item labels, e.g. ["Operating Income", "Free Cash Flow"]
+
+    Returns:
+        One dict per period, newest first (empty if no data)
+    """
+    wanted = dict(KEY_ITEMS)
+    frames = get_statements(symbol, tuple(STATEMENTS) if items else ("income", "balance"), period)
+    for label in items or []:
+        statement = next((s for s in STATEMENTS if label in frames[s].index), None)
+        if statement:
+            wanted[label] = (statement, label)
+
+    income = frames["income"]
+    if income.empty or frames["balance"].empty:
+        return []
+
+    # Balance-sheet dates can differ slightly from the income statement's; match by position
+    results = []
+    for column in range(min(periods, income.shape[1])):
+        end = income.columns[column]
+        result = {"period": str(end.date()) if hasattr(end, "date") else str(end), "currency": currency}
+        for key, (statement, label) in wanted.items():
+            result[key] = _value(frames[statement], label, column)
+        for key in wanted:
+            if result[key] is not None:
+                result[f"{key}_formatted"] = format_amount(result[key], currency)
+        results.append(result)
+    return results
+
+
+def clear():
+    """Drop cached statements (memory and disk)."""
+    _frames.clear()
+    for path in get_cache_dir("statements").glob("*.parquet"):
+        path.unlink()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time cold vs cached statement lookups")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--periods", type=int, default=1)
+    args = parser.parse_args()
+
+    for symbol in args.symbols:
+        for label in ("cold", "cached"):
+            if label == "cold":
+                for statement in STATEMENTS:
+                    for period in ("annual", "quarterly"):
+                        path = _path(symbol, statement, period)
+                        if os.path.exists(path):
+                            os.remove(path)
+            start = time.perf_counter()
+            figures = key_figures(symbol, "INR" if symbol.upper().endswith(".NS") else "USD", periods=args.periods)
+            print(f"{symbol} {label}: {len(figures)} period(s) in {(time.perf_counter() - start) * 1000:.1f} ms")
+        for figure in figures:
+            print(f"  {figure['period']}: revenue {figure.get('revenue_formatted')}, net income {figure.get('net_income_formatted')}")
@@ -0,0 +1,361 @@
+"""
+Company name -> ticker index for the financial tools (NSE and US listings).
+
+Questions like "stock price of Reliance Industries" or "Apple's financials" used to rely on
+the model guessing RELIANCE / AAPL; a wrong guess cost a failed tool call and another round
+trip. The index resolves names, aliases, ISINs and tickers locally, with the same
+normalization and trigram + edit-distance fuzzy matching as city_index:
+
+- ISIN ("INE002A01018") and exact ticker ("AAPL", "TCS.NS") matches
+- exact name or alias ("apple", "ril", "state bank of india"), corporate suffixes ignored
+- leading-words match ("reliance" -> Reliance Industries, "tata steel" -> Tata Steel)
+- fuzzy match for typos ("microsfot", "infosis")
+
+Each match carries its exchange, so callers know whether to use the NSE or US tools and
+which Yahoo symbol to query. A small table of large caps is built in; a full listing can be
+compiled from the exchanges' own files:
+
+    python symbol_index.py build --nse EQUITY_L.csv --us nasdaqlisted.txt otherlisted.txt
+    python symbol_index.py resolve "reliance industries" apple INE009A01021
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import NamedTuple, Optional
+
+from city_index import _trigrams, edit_distance, normalize_city
+from mlutils import get_cache_dir
+
+SYMBOLS_FILE = os.environ.get("AIML_SYMBOLS_FILE") or str(get_cache_dir() / "symbols.json")
+
+# Words that do not distinguish listings ("Apple Inc." == "apple")
+SUFFIXES = frozenset("inc incorporated corp corporation co company ltd limited plc the common stock shares ordinary".split())
+ISIN_RE = re.compile(r"^[A-Z]{2}[A-Z0-9]{9}[0-9]$")
+TICKER_RE = re.compile(r"^[A-Z0-9&^][A-Z0-9&.\-^]{0,14}$")
+
+# symbol, name, aliases, ISIN (only where known)
+US_LISTINGS = [
+    ("AAPL", "Apple Inc.", ["apple"], "US0378331005"),
+    ("MSFT", "Microsoft Corporation", [], "US5949181045"),
+    ("GOOGL", "Alphabet Inc. Class A", ["google", "alphabet"], "US02079K3059"),
+    ("AMZN", "Amazon.com Inc.", ["amazon"], "US0231351067"),
+    ("NVDA", "NVIDIA Corporation", [], "US67066G1040"),
+    ("META", "Meta Platforms Inc.", ["facebook", "meta"], "US30303M1027"),
+    ("TSLA", "Tesla Inc.", [], "US88160R1014"),
+    ("BRK-B", "Berkshire Hathaway Inc.", ["berkshire"], None),
+    ("JPM", "JPMorgan Chase & Co.", ["jp morgan", "jpmorgan", "chase"], None),
+    ("V", "Visa Inc.", [], None),
+    ("MA", "Mastercard Incorporated", [], None),
+    ("UNH", "UnitedHealth Group Incorporated", ["united health"], None),
+    ("XOM", "Exxon Mobil Corporation", ["exxon", "exxonmobil"], None),
+    ("JNJ", "Johnson & Johnson", ["j&j"], None),
+    ("WMT", "Walmart Inc.", [], None),
+    ("PG", "Procter & Gamble Company", ["p&g", "procter and gamble"], None),
+    ("HD", "Home Depot Inc.", [], None),
+    ("CVX", "Chevron Corporation", [], None),
+    ("KO", "Coca-Cola Company", ["coke", "coca cola"], None),
+    ("PEP", "PepsiCo Inc.", ["pepsi"], None),
+    ("AVGO", "Broadcom Inc.", [], None),
+    ("COST", "Costco Wholesale Corporation", ["costco"], None),
+    ("ADBE", "Adobe Inc.", [], None),
+    ("CSCO", "Cisco Systems Inc.", ["cisco"], None),
+    ("CRM", "Salesforce Inc.", [], None),
+    ("NFLX", "Netflix Inc.", [], None),
+    ("AMD", "Advanced Micro Devices Inc.", ["amd"], None),
+    ("INTC", "Intel Corporation", [], None),
+    ("ORCL", "Oracle Corporation", [], None),
+    ("IBM", "International Business Machines Corporation", ["ibm"], None),
+    ("DIS", "Walt Disney Company", ["disney"], None),
+    ("NKE", "Nike Inc.", [], None),
+    ("MCD", "McDonald's Corporation", ["mcdonalds"], None),
+    ("BA", "Boeing Company", [], None),
+    ("QCOM", "Qualcomm Incorporated", [], None),
+    ("TXN", "Texas Instruments Incorporated", [], None),
+    ("PYPL", "PayPal Holdings Inc.", ["paypal"], None),
+    ("UBER", "Uber Technologies Inc.", ["uber"], None),
+    ("ABNB", "Airbnb Inc.", [], None),
+    ("SBUX", "Starbucks Corporation", [], None),
+    ("GS", "Goldman Sachs Group Inc.", ["goldman"], None),
+    ("MS", "Morgan Stanley", [], None),
+    ("BAC", "Bank of America Corporation", ["bofa"], None),
+    ("WFC", "Wells Fargo & Company", [], None),
+    ("PFE", "Pfizer Inc.", [], None),
+    ("MRK", "Merck & Co. Inc.", ["merck"], None),
+    ("LLY", "Eli Lilly and Company", ["lilly"], None),
+    ("SPY", "SPDR S&P 500 ETF Trust", ["s&p 500", "s&p 500 etf"], None),
+]
+NSE_LISTINGS = [
+    ("RELIANCE", "Reliance Industries Limited", ["reliance", "ril"], "INE002A01018"),
+    ("TCS", "Tata Consultancy Services Limited", [], "INE467B01029"),
+    ("INFY", "Infosys Limited", [], "INE009A01021"),
+    ("HDFCBANK", "HDFC Bank Limited", [], "INE040A01034"),
+    ("ICICIBANK", "ICICI Bank Limited", [], "INE090A01021"),
+    ("SBIN", "State Bank of India", ["sbi"], "INE062A01020"),
+    ("ITC", "ITC Limited", [], "INE154A01025"),
+    ("HINDUNILVR", "Hindustan Unilever Limited", ["hul"], "INE030A01027"),
+    ("BHARTIARTL", "Bharti Airtel Limited", ["airtel"], "INE397D01024"),
+    ("LT", "Larsen & Toubro Limited", ["l&t", "larsen and toubro"], "INE018A01030"),
+    ("WIPRO", "Wipro Limited", [], "INE075A01022"),
+    ("KOTAKBANK", "Kotak Mahindra Bank Limited", ["kotak"], "INE237A01028"),
+    ("AXISBANK", "Axis Bank Limited", [], "INE238A01034"),
+    ("MARUTI", "Maruti Suzuki India Limited", ["maruti"], "INE585B01010"),
+    ("ASIANPAINT", "Asian Paints Limited", [], "INE021A01026"),
+    ("BAJFINANCE", "Bajaj Finance Limited", [], None),
+    ("HCLTECH", "HCL Technologies Limited", ["hcl"], None),
+    ("TECHM", "Tech Mahindra Limited", [], None),
+    ("SUNPHARMA", "Sun Pharmaceutical Industries Limited", ["sun pharma"], None),
+    ("TITAN", "Titan Company Limited", [], None),
+    ("ULTRACEMCO", "UltraTech Cement Limited", ["ultratech"], None),
+    ("NESTLEIND", "Nestle India Limited", [], None),
+    ("TATASTEEL", "Tata Steel Limited", [], None),
+    ("POWERGRID", "Power Grid Corporation of India Limited", ["power grid"], None),
+    ("NTPC", "NTPC Limited", [], None),
+    ("ONGC", "Oil and Natural Gas Corporation Limited", [], None),
+    ("COALINDIA", "Coal India Limited", [], None),
+    ("ADANIENT", "Adani Enterprises Limited", [], None),
+    ("ADANIPORTS", "Adani Ports and Special Economic Zone Limited", ["adani ports"], None),
+    ("M&M", "Mahindra & Mahindra Limited", ["mahindra", "m&m"], None),
+    ("BAJAJ-AUTO", "Bajaj Auto Limited", [], None),
+    ("HEROMOTOCO", "Hero MotoCorp Limited", ["hero motocorp"], None),
+    ("DRREDDY", "Dr. Reddy's Laboratories Limited", ["dr reddy"], None),
+    ("CIPLA", "Cipla Limited", [], None),
+    ("JSWSTEEL", "JSW Steel Limited", [], None),
+    ("GRASIM", "Grasim Industries Limited", [], None),
+    ("INDUSINDBK", "IndusInd Bank Limited", [], None),
+    ("DMART", "Avenue Supermarts Limited", ["dmart", "d mart"], None),
+    ("IRCTC", "Indian Railway Catering and Tourism Corporation Limited", [], None),
+]
+
+
+class Listing(NamedTuple):
+    symbol: str  # exchange symbol (RELIANCE, AAPL)
+    exchange: str  # "NSE" or "US"
+    name: str
+    isin: Optional[str] = None
+
+    @property
+    def yahoo_symbol(self) -> str:
+        return f"{self.symbol}.NS" if self.exchange == "NSE" else self.symbol
+
+
+class Match(NamedTuple):
+    listing: Listing
+    matched_by: str  # isin, ticker, name, alias, prefix, fuzzy
+
+
+def normalize_name(name: str) -> str:
+    """normalize_city() plus dropping corporate suffixes ("Apple Inc." -> "apple")."""
+    words = normalize_city(re.sub(r"['’]s\b", "", name.replace("&", " and "))).split()
+    return " ".join(w for w in words if w not in SUFFIXES) or " ".join(words)
+
+
+class SymbolIndex:
+    """Exact, leading-words and fuzzy lookup of listings by ticker, ISIN, name and alias."""
+
+    def __init__(self, listings: list[tuple]):
+        self._tickers: dict[str, list[Listing]] = defaultdict(list)
+        self._isins: dict[str, Listing] = {}
+        self._names: dict[str, list[tuple[Listing, str]]] = defaultdict(list)
+        self._by_first_word: dict[str, set[str]] = defaultdict(set)
+        self._trigram_index: dict[str, set[str]] = defaultdict(set)
+
+        for symbol, exchange, name, aliases, isin in listings:
+            listing = Listing(symbol.upper(), exchange, name, isin)
+            self._tickers[listing.symbol].append(listing)
+            if isin:
+                self._isins[isin] = listing
+            self._add_name(name, listing, "name")
+            for alias in aliases:
+                self._add_name(alias, listing, "alias")
+
+    def __len__(self):
+        return sum(len(listings) for listings in self._tickers.values())
+
+    def _add_name(self, name: str, listing: Listing, kind: str):
+        key = normalize_name(name)
+        if not key or any(existing == listing for existing, _ in self._names[key]):
+            return
+        self._names[key].append((listing, kind))
+        self._by_first_word[key.split()[0]].add(key)
+        for gram in _trigrams(key):
+            self._trigram_index[gram].add(key)
+
+    def ticker(self, symbol: str) -> list[Listing]:
+        """Listings with this exact ticker (".NS"/".BO" suffixes select NSE)."""
+        symbol = symbol.strip().upper()
+        if symbol.endswith((".NS", ".BO")):
+            return [listing for listing in self._tickers.get(symbol[:-3], []) if listing.exchange == "NSE"]
+        return list(self._tickers.get(symbol) or self._tickers.get(symbol.replace(".", "-"), []))  # BRK.B -> BRK-B
+
+    def by_name(self, name: str) -> list[Match]:
+        """Exact company name or alias matches only (no prefix or fuzzy guessing)."""
+        return [Match(listing, kind) for listing, kind in self._names.get(normalize_name(name), [])]
+
+    def _fuzzy(self, key: str, max_candidates: int = 20) -> list[str]:
+        if len(key) < 4:
+            return []
+        counts = defaultdict(int)
+        for gram in _trigrams(key):
+            for candidate in self._trigram_index.get(gram, ()):
+                counts[candidate] += 1
+        candidates = sorted(counts, key=counts.get, reverse=True)[:max_candidates]
+        limit = 1 if len(key) < 8 else 2
+        scored = sorted((edit_distance(key, c, limit), c) for c in candidates)
+        return [c for distance, c in scored if distance <= limit]
+
+    def resolve(self, query: str, exchange: Optional[str] = None, limit: int = 5) -> list[Match]:
+        """
+        Listings matching a ticker, ISIN, company name or alias, best first.
+
+        Args:
+            query: e.g. "AAPL", "RELIANCE.NS", "INE002A01018", "Reliance Industries", "microsfot"
+            exchange: Prefer listings on "NSE" or "US" (others still returned after them)
+        """
+        text = query.strip()
+        if not text:
+            return []
+        matches: list[Match] = []
+
+        if ISIN_RE.match(text.upper()) and text.upper() in self._isins:
+            matches.append(Match(self._isins[text.upper()], "isin"))
+        matches += [Match(listing, "ticker") for listing in self.ticker(text)]
+
+        key = normalize_name(re.sub(r"\.(NS|BO)$", "", text, flags=re.IGNORECASE))
+        if key:
+            matches += self.by_name(key)
+            if not matches:
+                # Leading words of a longer name: "reliance" -> "reliance industries"
+                prefixed = sorted(k for k in self._by_first_word.get(key.split()[0], ()) if k.startswith(f"{key} "))
+                matches += [Match(listing, "prefix") for k in sorted(prefixed, key=len) for listing, _ in self._names[k]]
+            if not matches:
+                matches += [Match(listing, "fuzzy") for k in self._fuzzy(key) for listing, _ in self._names[k]]
+
+        unique = list({m.listing: m for m in reversed(matches)}.values())[::-1]  # first match per listing wins
+        if exchange:
+            unique.sort(key=lambda m: m.listing.exchange != exchange.upper())
+        return unique[:limit]
+
+    def normalize(self, text: str, exchange: Optional[str] = None) -> str:
+        """
+        Symbol to send to a quote tool for what the model passed in.
+
+        Only unambiguous matches are applied: an ISIN, a ticker, or an exact company name or
+        alias. Input typed as a ticker ("COKE", "INFY") is kept as it is, not mapped through a
+        name alias or to another exchange. Prefix and fuzzy matches ("tata", "mike") are left
+        to lookup_ticker as suggestions. exchange="NSE" returns a bare NSE symbol,
+        exchange="US" a ticker, exchange=None a Yahoo symbol (".NS" for names resolved to NSE).
+        Unresolved input is returned upper-cased, so unknown but valid tickers still reach the network.
+        """
+        text = text.strip()
+        if ISIN_RE.match(text.upper()) and text.upper() in self._isins:
+            listing = self._isins[text.upper()]
+        elif TICKER_RE.match(text):
+            if exchange == "NSE":
+                return re.sub(r"\.(NS|BO)$", "", text.upper())
+            listings = self.ticker(text)
+            return listings[0].symbol if len(listings) == 1 and listings[0].exchange == "US" else text.upper()  # BRK.B -> BRK-B
+        else:
+            matches = [m for m in self.resolve(text, exchange=exchange) if m.matched_by in ("ticker", "name", "alias")]
+            if not matches:
+                return text.upper()
+            listing = matches[0].listing
+
+        if exchange == "NSE":
+            return listing.symbol if listing.exchange == "NSE" else text.upper()
+        if exchange == "US" and listing.exchange == "US":
+            return listing.symbol
+        return listing.yahoo_symbol
+
+
+def _builtin_listings() -> list[tuple]:
+    return [(s, "US", n, a, i) for s, n, a, i in US_LISTINGS] + [(s, "NSE", n, a, i) for s, n, a, i in NSE_LISTINGS]
+
+
+def _load_listings_file(path: str) -> list[tuple]:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return [(s, e, n, [], i) for s, e, n, i in json.load(f)]
+    except (OSError, ValueError):
+        return []
+
+
+def build_listings(nse_paths: list[str], us_paths: list[str], output: str = SYMBOLS_FILE) -> int:
+    """
+    Compile exchange listing files into the symbols file loaded by get_index().
+
+    Args:
+        nse_paths: NSE equity lists (EQUITY_L.csv: SYMBOL, NAME OF COMPANY, ..., ISIN NUMBER)
+        us_paths: NASDAQ Trader symbol directories (nasdaqlisted.txt / otherlisted.txt, "|"-separated)
+
+    Returns:
+        Number of listings written
+    """
+    rows = []
+    for path in nse_paths:
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                row = {k.strip(): (v or "").strip() for k, v in row.items()}
+                if row.get("SERIES", "EQ") in ("EQ", "BE"):
+                    rows.append([row["SYMBOL"], "NSE", row["NAME OF COMPANY"], row.get("ISIN NUMBER") or None])
+    for path in us_paths:
+        with open(path, encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f, delimiter="|"):
+                symbol = row.get("Symbol") or row.get("ACT Symbol") or ""
+                if not symbol or symbol.startswith("File Creation Time") or row.get("Test Issue") == "Y" or row.get("ETF") == "Y":
+                    continue
+                name = row["Security Name"].split(" - ")[0]
+                rows.append([symbol.replace(".", "-"), "US", name, None])
+
+    tmp_path = f"{output}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(rows, f)
+    os.replace(tmp_path, output)
+    return len(rows)
+
+
+_index: Optional[SymbolIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> SymbolIndex:
+    """Shared index: the built-in large caps plus the compiled symbols file, if present."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = SymbolIndex(_builtin_listings() + _load_listings_file(SYMBOLS_FILE))
+        return _index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Company name -> ticker index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Compile exchange listing files")
+    build.add_argument("--nse", nargs="*", default=[])
+    build.add_argument("--us", nargs="*", default=[])
+    resolve = commands.add_parser("resolve", help="Resolve names, ISINs or tickers")
+    resolve.add_argument("queries", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        print(f"Wrote {build_listings(args.nse, args.us)} listings to {SYMBOLS_FILE}")
+        return
+
+    start = time.perf_counter()
+    index = get_index()
+    print(f"{len(index)} listings loaded in {(time.perf_counter() - start) * 1000:.1f} ms")
+    for query in args.queries:
+        start = time.perf_counter()
+        matches = index.resolve(query)
+        elapsed = (time.perf_counter() - start) * 1e6
+        found = ", ".join(f"{m.listing.yahoo_symbol} ({m.listing.name}, {m.matched_by})" for m in matches) or "no match"
+        print(f"{query!r}: {found} [{elapsed:.0f} us]")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Per-query tool selection to shrink the prompt sent with every model call.
+
+Binding all tools sends every JSON schema on each request, which costs prompt tokens and
+prefill time on every iteration of the agent loop. ToolSelector scores tools against the
+query using keyword rules plus embeddings of the tool descriptions (computed once, when the
+selector is built) and returns only the top-k relevant tools to bind.
+"""
+
+import json
+import re
+import zlib
+from typing import Any, Optional
+
+import numpy as np
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+# Keyword rules: a query matching the pattern pulls in the whole tool group
+KEYWORD_RULES = [
+    (r"\d\s*[-+*/x]\s*\d|\b(add|plus|sum|minus|subtract|multiply|times|divide|divided|product)\b", ["add", "subtract", "multiply", "divide"]),
+    (r"\b(date|today|tomorrow|yesterday|days?|weeks?|months?|years?|age|dob|born|birthday|next|ago|business|weekdays?|monday|tuesday|wednesday|thursday|friday|saturday|sunday)\b", ["get_current_date", "calculate_future_date", "calculate_date_difference", "calculate_dates"]),
+    (r"\b(time|clock|hours?)\b", ["get_current_time", "identify_timezone", "calculate_time_in_timezone", "get_time_in_timezones"]),
+    (r"\b(timezone|time zone|tz)\b", ["get_local_timezone", "identify_timezone"]),
+    (r"\b(weather|temperature|rain|sunny|forecast|humid)", ["get_current_weather", "get_weather_for_locations"]),
+    (r"\b(search|news|latest|who is|look up)\b", ["search"]),
+    (r"\b(wiki|wikipedia|history of|biography)\b", ["wikipedia_search"]),
+    (r"\b(stock|share|ticker|price|market cap|pe ratio|52.week)\b|\b[A-Z]{2,5}\b", ["get_us_stock_price", "get_nse_stock_price"]),
+    (r"\.(NS|BO)\b|\b(nse|bse|india|indian|rupee)", ["get_nse_stock_price", "get_nse_financial_statements"]),
+    (r"\b(financials?|revenue|profit|income|assets|debt|balance sheet|earnings)\b", ["get_us_financial_statements", "get_nse_financial_statements"]),
+]
+
+KEYWORD_WEIGHT = 1.0
+EMBEDDING_DIM = 512
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), good enough for reporting savings."""
+    return max(1, len(text) // 4)
+
+
+def _hash_embed(texts: list[str], dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """Cheap local embedding: hashed word and character-trigram counts, L2 normalized."""
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in re.findall(r"[a-z0-9]+", text.lower()):
+            vectors[row, zlib.crc32(word.encode()) % dim] += 2.0
+            padded = f" {word} "
+            for i in range(len(padded) - 2):
+                vectors[row, zlib.crc32(padded[i : i + 3].encode()) % dim] += 1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _tool_text(tool: Any) -> str:
+    """Text used to embed a tool: its name (split into words) and description."""
+    return f"{tool.name.replace('_', ' ')}. {tool.description}"
+
+
+class ToolSelector:
+    """
+    Score tools against a query and pick the top-k to bind.
+
+    Args:
+        tools: Full list of LangChain tools
+        top_k: Maximum number of tools to bind per query
+        embeddings: Optional LangChain Embeddings (e.g. OllamaEmbeddings). Defaults to a
+            local hashed n-gram embedding that needs no model call.
+        keyword_rules: List of (regex, [tool names]) rules
+    """
+
+    def __init__(self, tools: list, top_k: int = 6, embeddings: Optional[Any] = None, keyword_rules: Optional[list] = None):
+        self.tools = list(tools)
+        self.top_k = top_k
+        self.embeddings = embeddings
+        self.keyword_rules = [(re.compile(pattern), names) for pattern, names in (keyword_rules or KEYWORD_RULES)]
+
+        # Precompute description embeddings and schema sizes once
+        self._tool_vectors = self._embed([_tool_text(t) for t in self.tools], documents=True)
+        self.schema_tokens = {t.name: estimate_tokens(json.dumps(convert_to_openai_tool(t))) for t in self.tools}
+        self.full_schema_tokens = sum(self.schema_tokens.values())
+
+    def _embed(self, texts: list[str], documents: bool = False) -> np.ndarray:
+        if self.embeddings is None:
+            return _hash_embed(texts)
+
+        if documents:
+            vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        else:
+            vectors = np.asarray([self.embeddings.embed_query(texts[0])], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def score(self, query: str) -> dict[str, float]:
+        """Return a relevance score per tool name (keyword boost + cosine similarity)."""
+        similarities = self._tool_vectors @ self._embed([query])[0]
+        scores = {tool.name: float(sim) for tool, sim in zip(self.tools, similarities)}
+
+        for pattern, names in self.keyword_rules:
+            if pattern.search(query) or pattern.search(query.lower()):
+                for name in names:
+                    if name in scores:
+                        scores[name] += KEYWORD_WEIGHT
+        return scores
+
+    def select(self, query: str) -> list:
+        """Return the top-k tools for the query, keeping the original tool order."""
+        scores = self.score(query)
+        ranked = sorted(scores, key=scores.get, reverse=True)[: self.top_k]
+        return [tool for tool in self.tools if tool.name in ranked]
+
+    def tokens_saved(self, selected: list) -> int:
+        """Prompt tokens saved per model call by binding only the selected tools."""
+        return self.full_schema_tokens - sum(self.schema_tokens[t.name] for t in selected)
@@ -0,0 +1,391 @@
+"""General-purpose tools for the basic agent: math, date/time, timezones, weather, search and stocks."""
+
+from langchain_core.tools import tool
+
+from deadline import remaining_time
+from model_switcher import get_model
+from tools_16 import (get_nse_financial_statements, get_nse_stock_price,
+                      get_us_financial_statements, get_us_stock_price)
+
+
+@tool
+def add(a: int, b: int) -> int:
+    """Adds a and b."""
+    return a + b
+
+
+@tool
+def multiply(a: int, b: int) -> int:
+    """Multiplies a and b."""
+    return a * b
+
+
+@tool
+def subtract(a: int, b: int) -> int:
+    """Subtracts b from a."""
+    return a - b
+
+
+@tool
+def divide(a: int, b: int) -> float:
+    """Divides a by b."""
+    if b == 0:
+        return "Error: Division by zero"
+    return a / b
+
+
+@tool
+def get_current_time() -> str:
+    """Get the current time as a string."""
+    from datetime import datetime
+
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+@tool
+def get_local_timezone() -> str:
+    """Get the local timezone as a string."""
+    import time
+
+    return time.tzname[time.localtime().tm_isdst]
+
+
+@tool
+def get_current_date() -> str:
+    """Get the current date as a string in YYYY-MM-DD format."""
+    from datetime import datetime
+
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+@tool
+def calculate_future_date(days: int) -> str:
+    """Calculate a future or past date by adding/subtracting days from today.
+
+    Args:
+        days: Number of days to add (positive) or subtract (negative) from today.
+              For example: days=7 means 7 days from now, days=-7 means 7 days ago.
+
+    Returns:
+        The calculated date in YYYY-MM-DD format with day of week.
+    """
+    from datetime import datetime, timedelta
+
+    try:
+        current_date = datetime.now()
+        future_date = current_date + timedelta(days=days)
+
+        # Format: YYYY-MM-DD (Day Name)
+        formatted_date = future_date.strftime("%Y-%m-%d (%A)")
+
+        return f"Date {days} days from today: {formatted_date}"
+    except Exception as e:
+        return f"Error calculating date: {e}"
+
+
+@tool
+def calculate_date_difference(date1: str, date2: str) -> str:
+    """Calculate the difference between two dates.
+
+    Args:
+        date1: First date in YYYY-MM-DD format
+        date2: Second date in YYYY-MM-DD format
+
+    Returns:
+        The difference in days, months, and years.
+    """
+    from datetime import datetime
+
+    try:
+        d1 = datetime.strptime(date1, "%Y-%m-%d")
+        d2 = datetime.strptime(date2, "%Y-%m-%d")
+
+        diff = abs((d2 - d1).days)
+        years = diff // 365
+        remaining_days = diff % 365
+        months = remaining_days // 30
+        days = remaining_days % 30
+
+        return f"Difference: {diff} total days ({years} years, {months} months, {days} days)"
+    except Exception as e:
+        return f"Error calculating date difference: {e}"
+
+
+@tool
+def calculate_dates(
+    operation: str,
+    dates: list[str],
+    end_dates: list[str] | None = None,
+    years: int = 0,
+    months: int = 0,
+    days: int = 0,
+    weekday: str | None = None,
+) -> str:
+    """Calendar-aware date arithmetic on one or many dates in a single call.
+
+    Args:
+        operation: One of
+            'difference' - years/months/days between dates and end_dates (default: today),
+                           plus totals in months, weeks, days and hours (use for age)
+            'add' - add years/months/days to each date (negative values go back)
+            'business_days' - weekdays between dates and end_dates
+            'add_business_days' - move each date by `days` weekdays
+            'next_weekday' - next `weekday` (e.g. 'sunday') after each date
+        dates: Dates in YYYY-MM-DD format ('today' is accepted)
+        end_dates: Second date for each pair ('difference' and 'business_days'); one date applies to all
+        years: Years to add ('add')
+        months: Months to add ('add')
+        days: Days to add ('add', 'add_business_days')
+        weekday: Day name for 'next_weekday'
+
+    Returns:
+        JSON list with one result per date.
+    """
+    import json
+
+    import numpy as np
+
+    import date_engine
+
+    try:
+        operation = operation.strip().lower()
+        starts = date_engine.parse_dates(dates)
+        ends = date_engine.parse_dates(end_dates) if end_dates else None
+        start_labels = date_engine.format_dates(starts)
+
+        if operation == "difference":
+            diff = date_engine.date_differences(starts, ends)
+            end_labels = date_engine.format_dates(starts + diff["sign"] * diff["total_days"])
+            fields = ["years", "months", "days", "total_months", "total_weeks", "total_days", "total_hours"]
+            results = [
+                {"from": start, "to": end, **{name: int(diff[name][i]) for name in fields}, "end_is_before_start": bool(diff["sign"][i] < 0)}
+                for i, (start, end) in enumerate(zip(start_labels, end_labels))
+            ]
+        elif operation == "add":
+            shifted = date_engine.format_dates(date_engine.add_offsets(starts, years, months, days))
+            results = [{"date": start, "result": result} for start, result in zip(start_labels, shifted)]
+        elif operation == "business_days":
+            if ends is None:
+                return json.dumps({"error": "business_days needs end_dates"}, indent=2)
+            counts = date_engine.business_days(*np.broadcast_arrays(starts, ends))
+            end_labels = date_engine.format_dates(np.broadcast_to(ends, counts.shape))
+            results = [{"from": start, "to": end, "business_days": int(n)} for start, end, n in zip(start_labels, end_labels, counts)]
+        elif operation == "add_business_days":
+            shifted = date_engine.format_dates(date_engine.add_business_days(starts, days))
+            results = [{"date": start, "result": result} for start, result in zip(start_labels, shifted)]
+        elif operation == "next_weekday":
+            if not weekday:
+                return json.dumps({"error": "next_weekday needs weekday"}, indent=2)
+            found = date_engine.format_dates(date_engine.next_weekday(starts, weekday))
+            results = [{"date": start, "result": result} for start, result in zip(start_labels, found)]
+        else:
+            return json.dumps({"error": f"Unknown operation: {operation}"}, indent=2)
+
+        return json.dumps(results, indent=2)
+    except Exception as e:
+        return json.dumps({"error": str(e)}, indent=2)
+
+
+# Separate tools that the agent can chain automatically for finding the time in a city
+@tool
+def identify_timezone(city: str) -> str:
+    """Identify the IANA timezone for a given city.
+    Returns the timezone identifier (e.g., 'America/New_York', 'Asia/Tokyo', 'Europe/London').
+    Use this first before calculating time in a city."""
+
+    from city_index import city_index, resolve_city
+
+    # Prebuilt index (exact), then the compiled gazetteer if built (see gazetteer.py), then fuzzy index - fast path
+    timezone = resolve_city(city)
+    if timezone:
+        return timezone
+
+    # Fallback: Use LLM for unknown cities (slow path)
+    try:
+        from langchain_core.output_parsers import StrOutputParser
+        from langchain_core.prompts import ChatPromptTemplate
+
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", "You are a geography expert. Return ONLY the IANA timezone identifier. "
+                      "Examples: 'America/New_York', 'Asia/Tokyo', 'Europe/London'. No explanation."),
+            ("human", "IANA timezone for {city}?"),
+        ])
+
+        # Reuse global model (don't create new one or print info)
+        llm = get_model(temperature=0)
+        chain = prompt | llm | StrOutputParser()
+
+        timezone = chain.invoke({"city": city}).strip()
+        timezone = timezone.replace("'", "").replace('"', "").strip()
+
+        # Persist validated answers so this city never needs the model again
+        if not city_index.learn(city, timezone):
+            return f"Error: '{timezone}' is not a valid IANA timezone for {city}"
+        return timezone
+    except Exception as e:
+        return f"Error: {e}"
+
+
+@tool
+def calculate_time_in_timezone(timezone: str) -> str:
+    """Calculate the current time in a given IANA timezone.
+    Args:
+        timezone: IANA timezone identifier like 'America/New_York', 'Asia/Tokyo', 'Asia/Kolkata', 'Europe/London'
+    Returns the current time, timezone name, and time difference from local time."""
+    from datetime import datetime
+
+    from tz_convert import get_zone
+
+    try:
+        # Get current time in local timezone
+        local_time = datetime.now().astimezone()
+
+        # Get time in target timezone
+        target_tz = get_zone(timezone)
+        target_time = datetime.now(target_tz)
+
+        # Calculate time difference
+        time_diff = target_time.utcoffset() - local_time.utcoffset()
+        hours_diff = time_diff.total_seconds() / 3600
+
+        return (
+            f"\nCurrent time: {target_time.strftime('%Y-%m-%d %H:%M:%S %Z')}\n" f"Timezone: {timezone}\n" f"Time difference from local: {hours_diff:+.1f} hours"
+        )
+    except Exception as e:
+        return f"Error calculating time for timezone '{timezone}': {e}. Please verify the IANA timezone format."
+
+
+@tool
+def get_time_in_timezones(locations: list[str]) -> str:
+    """Get the current time in many places at once, in a single call.
+    Args:
+        locations: City names ('Tokyo'), IANA timezones ('Asia/Kolkata') or Windows zone names ('India Standard Time')
+    Returns a JSON list with local time, UTC offset and difference from local time for each location."""
+    import json
+
+    from tz_convert import times_in_zones
+
+    try:
+        return json.dumps(times_in_zones(locations), indent=2)
+    except Exception as e:
+        return json.dumps({"error": str(e)}, indent=2)
+
+
+@tool
+def get_current_weather(location: str) -> str:
+    """Get the current weather for a given location. Use city name like 'New York', 'London', 'Tokyo'."""
+    from weather_client import get_weather
+
+    weather = get_weather(location, timeout=remaining_time(15))
+    if "error" in weather:
+        return f"Weather error: Could not fetch weather for {location}. Error: {weather['error']}"
+    return f"Weather in {location}: {weather['temperature_c']}°C, {weather.get('description', 'N/A')}"
+
+
+@tool
+def get_weather_for_locations(locations: list[str]) -> str:
+    """Get the current weather for several locations at once, fetched concurrently in a single call.
+    Use this to compare weather across cities.
+    Args:
+        locations: City names like ['New York', 'London', 'Tokyo']
+    Returns a JSON list with temperature (°C), description, humidity and wind for each location."""
+    import json
+
+    from weather_client import get_weather_many
+
+    try:
+        return json.dumps(get_weather_many(locations, timeout=remaining_time(15)), indent=2)
+    except Exception as e:
+        return json.dumps({"error": str(e)}, indent=2)
+
+
+@tool
+def search(query: str, max_results: int = 5, page: int = 1) -> str:
+    """Search the web using DuckDuckGo.
+
+    Args:
+        query: Search query
+        max_results: Number of results to return (default 5)
+        page: Results page, for more results on the same query (default 1)
+    """
+    from search_cache import cached_search
+
+    try:
+        results = cached_search(query, max_results=max_results, page=page)
+        if not results:
+            return "No results found."
+
+        # Format the results
+        formatted_results = []
+        for i, result in enumerate(results, (page - 1) * max_results + 1):
+            title = result.get("title", "No title")
+            body = result.get("body", "No description")
+            url = result.get("href", "")
+            formatted_results.append(f"{i}. {title}\n   {body}\n   {url}")
+
+        return "\n\n".join(formatted_results)
+    except Exception as e:
+        return f"Search error: {e}"
+
+
+@tool
+def wikipedia_search(query: str) -> str:
+    """Search Wikipedia for a given query and return a summary from the results."""
+    import wikipedia
+
+    from wiki_store import WIKI_TOP_K, fetch_best_summary, get_store
+
+    # Answer from the local store first (see wiki_store.py); stale entries are refreshed
+    store = get_store()
+    local = store.lookup(query)
+    if local and not local.stale:
+        return f"Article: {local.title}\n\n{local.summary}"
+
+    try:
+        # First, search for the query to find matching pages
+        search_results = wikipedia.search(query, results=WIKI_TOP_K)
+
+        if not search_results:
+            return f"No Wikipedia articles found for '{query}'."
+
+        # Fetch the top results' summaries concurrently; the best-ranked real article wins
+        article, errors = fetch_best_summary(search_results, timeout=remaining_time(10))
+        if article is None:
+            if local:
+                return f"Article: {local.title} (cached, may be out of date)\n\n{local.summary}"
+            if errors:
+                return f"Found these articles but couldn't retrieve summary: {', '.join(search_results[:3])}"
+            # Only disambiguation or missing pages: list the options
+            return f"'{query}' is ambiguous. Did you mean one of these?\n" + "\n".join(f"- {opt}" for opt in search_results)
+
+        store.put(article["title"], article["summary"], article["url"], query=query)
+        return f"Article: {article['title']}\n\n{article['summary']}"
+    except Exception as e:
+        if local:
+            return f"Article: {local.title} (cached, may be out of date)\n\n{local.summary}"
+        return f"Wikipedia error: {e}"
+
+
+tools = [
+    add,
+    multiply,
+    subtract,
+    divide,
+    get_current_weather,
+    get_weather_for_locations,
+    get_current_time,
+    get_current_date,
+    calculate_future_date,  
+    calculate_date_difference, 
+    calculate_dates,
+    identify_timezone, 
+    calculate_time_in_timezone, 
+    get_time_in_timezones,
+    search,
+    get_local_timezone,
+    wikipedia_search,
+    get_us_stock_price,
+    get_nse_stock_price,
+    get_us_financial_statements,
+    get_nse_financial_statements,
+]
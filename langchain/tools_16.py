@@ -8,11 +8,21 @@ from langchain_core.tools import tool
 def get_nse_stock_price(symbol: str) -> str:
     """Get detailed stock information for Indian stocks (NSE) including price, company name, market cap, PE ratio, and 52-week range.
     Use stock symbols like 'RELIANCE', 'TCS', 'INFY', 'HDFCBANK', etc."""
-    from nsepython import nse_eq
+    from market_feed import streamed_quote
+    from nse_client import get_client
+    from symbol_index import get_index
 
     try:
-        # Get stock quote data
-        stock_data_raw = nse_eq(symbol.upper())
+        # Company names ("Reliance Industries") resolve locally to NSE symbols
+        symbol = get_index().normalize(symbol, exchange="NSE")
+        # Subscribed symbols come from the live feed; static fields only from an earlier pull, if cached
+        streamed = streamed_quote(f"{symbol.upper()}.NS") or streamed_quote(symbol)
+        if streamed:
+            stock_data_raw = get_client().peek(symbol) or {}
+            stock_data_raw = {**stock_data_raw, "priceInfo": {**stock_data_raw.get("priceInfo", {}), "lastPrice": streamed["price"], "change": streamed["change"], "pChange": streamed["change_pct"]}}
+        else:
+            # Get stock quote data (warm shared NSE session, cached briefly)
+            stock_data_raw = get_client().quote(symbol)
 
         if not stock_data_raw:
             return f"Could not retrieve stock data for symbol '{symbol}'. Please verify the NSE symbol."
@@ -30,6 +40,9 @@ def get_nse_stock_price(symbol: str) -> str:
             "percent_change": stock_data_raw.get("priceInfo", {}).get("pChange"),
         }
 
+        if streamed:
+            stock_data.update(as_of=streamed["as_of"], source="live feed")
+
         # Check if we got valid data
         if stock_data["current_price"] is None:
             return f"Could not retrieve stock data for symbol '{symbol}'. Please verify the NSE symbol."
@@ -54,11 +67,15 @@ def get_nse_stock_price(symbol: str) -> str:
 @tool
 def get_us_stock_price(ticker: str) -> str:
     """Get detailed stock information for a given ticker symbol including price, company name, market cap, PE ratio, and 52-week range."""
-    import yfinance as yf
+    from market_data import get_info, peek_info
+    from market_feed import streamed_quote
+    from symbol_index import get_index
 
     try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
+        ticker = get_index().normalize(ticker, exchange="US")
+        # Subscribed symbols come from the live feed; static fields only from cached info
+        streamed = streamed_quote(ticker)
+        info = (peek_info(ticker) or {}) if streamed else get_info(ticker)
 
         # Extract required information
         stock_data = {
@@ -70,6 +87,8 @@ def get_us_stock_price(ticker: str) -> str:
             "52_week_high": info.get("fiftyTwoWeekHigh"),
             "52_week_low": info.get("fiftyTwoWeekLow"),
         }
+        if streamed:
+            stock_data.update(current_price=streamed["price"], change=streamed["change"], percent_change=streamed["change_pct"], as_of=streamed["as_of"], source="live feed")
 
         # Check if we got valid data
         if stock_data["current_price"] is None:
@@ -94,115 +113,112 @@ def get_us_stock_price(ticker: str) -> str:
 
 
 @tool
-def get_us_financial_statements(ticker: str) -> str:
-    """Retrieve key financial statement data for US/international stocks using ticker symbols like AAPL, TSLA, MSFT.
-    Returns revenue, net income, total assets, and total debt for the latest available period."""
-    import yfinance as yf
+def lookup_ticker(company: str) -> str:
+    """Find the stock symbol for a company name, alias, ISIN or misspelled ticker, e.g. 'Reliance Industries',
+    'Apple', 'HDFC Bank', 'INE009A01021'. Instant local lookup; use it whenever you are unsure of a symbol.
+    Returns matching listings with their exchange (NSE or US) and which price tool to call."""
+    from symbol_index import get_index
 
     try:
-        stock = yf.Ticker(ticker)
-        financials = stock.financials
-        balance_sheet = stock.balance_sheet
-
-        if financials.empty or balance_sheet.empty:
-            return json.dumps({"error": f"No financial data available for {ticker}"}, indent=2)
+        matches = get_index().resolve(company)
+        if not matches:
+            return json.dumps({"error": f"No listing found for '{company}'. Try the exact company name or ticker."}, indent=2)
+
+        return json.dumps(
+            {
+                "query": company,
+                "matches": [
+                    {
+                        "symbol": m.listing.symbol,
+                        "yahoo_symbol": m.listing.yahoo_symbol,
+                        "exchange": m.listing.exchange,
+                        "name": m.listing.name,
+                        "matched_by": m.matched_by,
+                        "price_tool": "get_nse_stock_price" if m.listing.exchange == "NSE" else "get_us_stock_price",
+                    }
+                    for m in matches
+                ],
+            },
+            indent=2,
+            ensure_ascii=False,
+        )
 
-        latest_period = financials.columns[0]
+    except Exception as e:
+        return json.dumps({"error": str(e)}, indent=2)
 
-        # Extract period string
-        period_str = str(latest_period.date()) if hasattr(latest_period, "date") else str(latest_period)
 
-        # Build result dictionary
-        result = {
-            "symbol": ticker.upper(),
-            "period": period_str,
-            "currency": "USD",
-            "revenue": None,
-            "net_income": None,
-            "total_assets": None,
-            "total_debt": None,
-        }
+@tool
+def get_quotes(tickers: list[str]) -> str:
+    """Get quotes for many stocks at once (a watchlist) in a single request: price, day change,
+    day range, volume, 52-week high/low and where the price sits in that range.
+    Use tickers like ['AAPL', 'MSFT', 'NVDA']; Indian NSE stocks take a .NS suffix (e.g. 'TCS.NS').
+    Prefer this over calling get_us_stock_price once per ticker."""
+    from market_data import QUOTE_COLUMNS, get_quotes as fetch_quotes
+    from symbol_index import get_index
 
-        # Safely extract financial data
-        if "Total Revenue" in financials.index:
-            result["revenue"] = float(financials.loc["Total Revenue", latest_period])
-        if "Net Income" in financials.index:
-            result["net_income"] = float(financials.loc["Net Income", latest_period])
-        if "Total Assets" in balance_sheet.index:
-            result["total_assets"] = float(balance_sheet.loc["Total Assets", latest_period])
-        if "Total Debt" in balance_sheet.index:
-            result["total_debt"] = float(balance_sheet.loc["Total Debt", latest_period])
-
-        # Format numbers for readability
-        for key in ["revenue", "net_income", "total_assets", "total_debt"]:
-            if result.get(key) is not None:
-                value = result[key]
-                if abs(value) >= 1_000_000_000:
-                    result[f"{key}_formatted"] = f"${value / 1_000_000_000:.2f}B"
-                elif abs(value) >= 1_000_000:
-                    result[f"{key}_formatted"] = f"${value / 1_000_000:.2f}M"
-                else:
-                    result[f"{key}_formatted"] = f"${value:,.0f}"
+    try:
+        rows, missing = fetch_quotes([get_index().normalize(t) for t in tickers])
+        if not rows:
+            return json.dumps({"error": f"No quote data for {', '.join(missing) or 'the given tickers'}"}, indent=2)
 
-        return json.dumps(result, indent=2, ensure_ascii=False)
+        # Compact table: column names once, then one row per ticker
+        result = {"columns": QUOTE_COLUMNS, "rows": [[row.get(column) for column in QUOTE_COLUMNS] for row in rows]}
+        if missing:
+            result["not_found"] = missing
+        return json.dumps(result, ensure_ascii=False)
 
     except Exception as e:
         return json.dumps({"error": str(e)}, indent=2)
 
 
-@tool
-def get_nse_financial_statements(symbol: str) -> str:
-    """Retrieve key financial statement data for Indian NSE stocks like RELIANCE, TCS, INFY, HDFCBANK.
-    Returns revenue, net income, total assets, and total debt for the latest available period."""
-    import yfinance as yf
+def _statement_figures(yahoo_symbol: str, symbol: str, currency: str, periods: int, quarterly: bool, line_items: list[str] | None) -> str:
+    """Shared body of the US and NSE statement tools (data comes from the statements cache)."""
+    import statements
 
-    try:
-        # Clean symbol and add .NS suffix
-        clean_symbol = symbol.replace(".NS", "").replace(".BO", "").upper()
+    figures = statements.key_figures(yahoo_symbol, currency, periods=max(1, periods), period="quarterly" if quarterly else "annual", items=line_items)
+    if not figures:
+        return json.dumps({"error": f"No financial data available for {symbol}"}, indent=2)
+    if len(figures) == 1:
+        return json.dumps({"symbol": symbol, **figures[0]}, indent=2, ensure_ascii=False)
+    return json.dumps({"symbol": symbol, "currency": currency, "periods": [{k: v for k, v in f.items() if k != "currency"} for f in figures]}, indent=2, ensure_ascii=False)
 
-        stock = yf.Ticker(f"{clean_symbol}.NS")
-        financials = stock.financials
-        balance_sheet = stock.balance_sheet
 
-        if financials.empty or balance_sheet.empty:
-            return json.dumps({"error": f"No financial data available for {clean_symbol}"}, indent=2)
+@tool
+def get_us_financial_statements(ticker: str, periods: int = 1, quarterly: bool = False, line_items: list[str] | None = None) -> str:
+    """Retrieve key financial statement data for US/international stocks using ticker symbols like AAPL, TSLA, MSFT.
+    Returns revenue, net income, total assets, and total debt for the latest available period.
+    Args:
+        ticker: Stock ticker symbol
+        periods: Number of most recent periods to return (default: 1)
+        quarterly: Quarterly instead of annual statements
+        line_items: Extra statement rows, e.g. ['Operating Income', 'Free Cash Flow']
+    """
+    from symbol_index import get_index
 
-        latest_period = financials.columns[0]
+    try:
+        ticker = get_index().normalize(ticker, exchange="US")
+        return _statement_figures(ticker, ticker, "USD", periods, quarterly, line_items)
 
-        # Extract period string
-        period_str = str(latest_period.date()) if hasattr(latest_period, "date") else str(latest_period)
+    except Exception as e:
+        return json.dumps({"error": str(e)}, indent=2)
 
-        # Build result dictionary
-        result = {
-            "symbol": clean_symbol,
-            "period": period_str,
-            "currency": "INR",
-            "revenue": None,
-            "net_income": None,
-            "total_assets": None,
-            "total_debt": None,
-        }
 
-        # Safely extract financial data
-        if "Total Revenue" in financials.index:
-            result["revenue"] = float(financials.loc["Total Revenue", latest_period])
-        if "Net Income" in financials.index:
-            result["net_income"] = float(financials.loc["Net Income", latest_period])
-        if "Total Assets" in balance_sheet.index:
-            result["total_assets"] = float(balance_sheet.loc["Total Assets", latest_period])
-        if "Total Debt" in balance_sheet.index:
-            result["total_debt"] = float(balance_sheet.loc["Total Debt", latest_period])
-
-        # Format numbers in Crores
-        for key in ["revenue", "net_income", "total_assets", "total_debt"]:
-            if result.get(key) is not None:
-                value = result[key]
-                if abs(value) >= 10_000_000:
-                    result[f"{key}_formatted"] = f"₹{value / 10_000_000:.2f} Cr"
-                else:
-                    result[f"{key}_formatted"] = f"₹{value:,.0f}"
+@tool
+def get_nse_financial_statements(symbol: str, periods: int = 1, quarterly: bool = False, line_items: list[str] | None = None) -> str:
+    """Retrieve key financial statement data for Indian NSE stocks like RELIANCE, TCS, INFY, HDFCBANK.
+    Returns revenue, net income, total assets, and total debt for the latest available period.
+    Args:
+        symbol: NSE stock symbol
+        periods: Number of most recent periods to return (default: 1)
+        quarterly: Quarterly instead of annual statements
+        line_items: Extra statement rows, e.g. ['Operating Income', 'Free Cash Flow']
+    """
+    from symbol_index import get_index
 
-        return json.dumps(result, indent=2, ensure_ascii=False)
+    try:
+        # Resolve company names, clean symbol and add .NS suffix
+        clean_symbol = get_index().normalize(symbol, exchange="NSE").replace(".NS", "").replace(".BO", "")
+        return _statement_figures(f"{clean_symbol}.NS", clean_symbol, "INR", periods, quarterly, line_items)
 
     except Exception as e:
         return json.dumps({"error": str(e)}, indent=2)
@@ -215,18 +231,17 @@ def calculate_market_cap_change(ticker: str, days: int = 30) -> str:
         ticker: Stock ticker symbol (e.g., AAPL, TSLA, MSFT)
         days: Number of days to look back (default: 30)
     """
-    import yfinance as yf
+    import price_store
 
     try:
-        stock = yf.Ticker(ticker)
-        hist = stock.history(period=f"{days}d")
+        # Local price store: only missing trailing days are downloaded (see price_store.py)
+        hist = price_store.history(ticker, days)
 
         if hist.empty or len(hist) < 2:
             return json.dumps({"error": f"Insufficient data for {ticker}"}, indent=2)
 
-        # Get shares outstanding
-        info = stock.info
-        shares = info.get("sharesOutstanding")
+        # Get shares outstanding (cached snapshot)
+        shares = price_store.shares_outstanding(ticker)
 
         if not shares:
             return json.dumps({"error": "Shares outstanding data not available"}, indent=2)
@@ -267,38 +282,83 @@ def calculate_market_cap_change(ticker: str, days: int = 30) -> str:
 
 
 @tool
-def compare_stocks(ticker1: str, ticker2: str) -> str:
-    """Compare two stocks side by side with key metrics like price, market cap, PE ratio, and 52-week performance.
-    Works for US stocks (e.g., AAPL vs MSFT)."""
-    import yfinance as yf
+def analyze_portfolio(tickers: list[str], weights: list[float] | None = None, days: int = 365, benchmark: str | None = None, save_full_report: bool = False) -> str:
+    """Analyze a whole portfolio of stocks (2 to 200+ tickers): total return, volatility, Sharpe ratio,
+    max drawdown and beta for the portfolio and each holding, plus correlations between holdings.
+    Args:
+        tickers: Ticker symbols, e.g. ['AAPL', 'MSFT', 'NVDA'] (NSE stocks with .NS suffix)
+        weights: Portfolio weights in the same order as tickers (default: equal weight)
+        days: Look-back window in calendar days (default: 365)
+        benchmark: Index for beta (default: SPY, or ^NSEI for NSE-only portfolios)
+        save_full_report: Also save the full per-ticker table and correlation matrix to a file
+    Returns a compact JSON summary; large portfolios list only the top/bottom names per metric."""
+    import portfolio
 
     try:
-        stocks_data = {}
+        symbols = [t.strip().upper() for t in tickers if t.strip()]
+        if weights and len(weights) != len(symbols):
+            return json.dumps({"error": "weights must have one entry per ticker"}, indent=2)
+        benchmark = benchmark or ("^NSEI" if all(s.endswith((".NS", ".BO")) for s in symbols) else "SPY")
+
+        prices = portfolio.price_matrix(symbols + [benchmark], days)
+        if benchmark not in prices.columns:
+            benchmark_prices = None
+        else:
+            benchmark_prices = prices.pop(benchmark)
+        missing = [s for s in symbols if s not in prices.columns]
+        if prices.shape[1] == 0 or len(prices) < 2:
+            return json.dumps({"error": f"No price history for {', '.join(symbols)}"}, indent=2)
+
+        analytics = portfolio.compute_analytics(prices, dict(zip(symbols, weights)) if weights else None, benchmark_prices)
+        summary = portfolio.summarize(analytics)
+        summary["benchmark"] = benchmark if benchmark_prices is not None else None
+        if missing:
+            summary["no_data"] = missing
+        if save_full_report:
+            summary["full_report"] = portfolio.save_artifact(analytics)
+        return json.dumps(summary, ensure_ascii=False)
 
-        for ticker in [ticker1, ticker2]:
-            stock = yf.Ticker(ticker)
-            info = stock.info
-
-            stocks_data[ticker.upper()] = {
-                "company_name": info.get("longName") or info.get("shortName"),
-                "current_price": info.get("regularMarketPrice") or info.get("currentPrice"),
-                "market_cap": info.get("marketCap"),
-                "market_cap_formatted": None,
-                "pe_ratio": info.get("trailingPE") or info.get("forwardPE"),
-                "52_week_high": info.get("fiftyTwoWeekHigh"),
-                "52_week_low": info.get("fiftyTwoWeekLow"),
-                "52_week_change_percent": info.get("52WeekChange"),
-            }
+    except Exception as e:
+        return json.dumps({"error": str(e)}, indent=2)
+
+
+@tool
+def compare_stocks(tickers: list[str]) -> str:
+    """Compare two or more stocks side by side with key metrics like price, market cap, PE ratio, and 52-week performance.
+    Also ranks them by market cap and PE and shows where each price sits in its 52-week range.
+    Works for US stocks (e.g., ['AAPL', 'MSFT']) and NSE stocks with a .NS suffix (e.g., ['TCS.NS', 'INFY.NS'])."""
+    from market_data import compare_table, get_infos
+    from symbol_index import get_index
+
+    try:
+        infos, errors = get_infos([get_index().normalize(t) for t in tickers])
+        if not infos:
+            return json.dumps({"error": f"No data for {', '.join(errors) or 'the given tickers'}"}, indent=2)
+
+        table = compare_table(infos)
+        stocks_data = {}
+        for symbol, row in table.iterrows():
+            stocks_data[symbol] = {column: (None if value != value else int(value) if column.endswith("_rank") else value) for column, value in row.items()}
+            stocks_data[symbol]["market_cap_formatted"] = None
 
             # Format market cap
-            mc = stocks_data[ticker.upper()]["market_cap"]
+            mc = stocks_data[symbol]["market_cap"]
             if mc:
                 if mc >= 1_000_000_000_000:
-                    stocks_data[ticker.upper()]["market_cap_formatted"] = f"${mc / 1_000_000_000_000:.2f}T"
+                    stocks_data[symbol]["market_cap_formatted"] = f"${mc / 1_000_000_000_000:.2f}T"
                 elif mc >= 1_000_000_000:
-                    stocks_data[ticker.upper()]["market_cap_formatted"] = f"${mc / 1_000_000_000:.2f}B"
-
-        return json.dumps(stocks_data, indent=2, ensure_ascii=False)
+                    stocks_data[symbol]["market_cap_formatted"] = f"${mc / 1_000_000_000:.2f}B"
+
+        result = {"stocks": stocks_data}
+        if len(table) > 2:
+            result["summary"] = {
+                "largest_market_cap": table["market_cap"].idxmax() if table["market_cap"].notna().any() else None,
+                "lowest_pe": table["pe_ratio"].where(table["pe_ratio"] > 0).idxmin() if (table["pe_ratio"] > 0).any() else None,
+                "best_52_week_change": table["52_week_change_percent"].idxmax() if table["52_week_change_percent"].notna().any() else None,
+            }
+        if errors:
+            result["not_found"] = errors
+        return json.dumps(result, indent=2 if len(table) <= 10 else None, ensure_ascii=False, default=float)
 
     except Exception as e:
         return json.dumps({"error": str(e)}, indent=2)
@@ -0,0 +1,232 @@
+"""
+Batched time conversion across many timezones.
+
+calculate_time_in_timezone answers one zone per call. This module converts any number of
+instants across any number of zones in one go:
+
+- ZoneInfo objects are cached per zone name.
+- Each zone gets a NumPy UTC-offset transition table (transition instants + offsets) derived
+  from zoneinfo for a window around today, so converting is a vectorized searchsorted.
+- Locations can be IANA zones, Windows zone names from tz_cities.json ("India Standard
+  Time") or city names (resolved through the city index / gazetteer).
+
+cross_check_tz_cities() compares the offsets in tz_cities.json with zoneinfo and
+reports disagreements (the JSON is a static snapshot; zoneinfo is authoritative).
+"""
+
+import json
+import re
+import time
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+
+TZ_CITIES_FILE = Path(__file__).parent / "tz_cities.json"
+
+# Transition tables cover this many days either side of the day they are built
+WINDOW_DAYS = 400
+DAY = 86_400
+
+
+@lru_cache(maxsize=None)
+def get_zone(name: str) -> ZoneInfo:
+    """Cached ZoneInfo lookup (raises ZoneInfoNotFoundError for unknown zones)."""
+    return ZoneInfo(name)
+
+
+class TransitionTable(NamedTuple):
+    """UTC-offset transitions for one zone: offsets[i] applies from starts[i] (epoch seconds)."""
+
+    zone: str
+    starts: np.ndarray  # int64, sorted
+    offsets: np.ndarray  # int32 seconds east of UTC
+    abbreviations: tuple
+    window_start: int
+    window_end: int
+
+
+def _offset_at(zone: ZoneInfo, epoch: int) -> tuple[int, str]:
+    moment = datetime.fromtimestamp(epoch, tz=timezone.utc).astimezone(zone)
+    return int(moment.utcoffset().total_seconds()), moment.tzname()
+
+
+# About one table per IANA zone (~600), so a long-running server does not keep every past day's tables
+@lru_cache(maxsize=1024)
+def _transition_table(name: str, anchor_day: int) -> TransitionTable:
+    zone = get_zone(name)
+    window_start = (anchor_day - WINDOW_DAYS) * DAY
+    window_end = (anchor_day + WINDOW_DAYS) * DAY
+
+    # Sample daily, then binary-search each change down to the second
+    samples = np.arange(window_start, window_end + 1, DAY, dtype=np.int64)
+    sampled = [_offset_at(zone, int(t)) for t in samples]
+
+    starts, offsets, names = [window_start], [sampled[0][0]], [sampled[0][1]]
+    for i in range(1, len(samples)):
+        if sampled[i] == sampled[i - 1]:
+            continue
+        low, high = int(samples[i - 1]), int(samples[i])  # offset changes in (low, high]
+        while high - low > 1:
+            mid = (low + high) // 2
+            if _offset_at(zone, mid) == sampled[i - 1]:
+                low = mid
+            else:
+                high = mid
+        starts.append(high)
+        offsets.append(sampled[i][0])
+        names.append(sampled[i][1])
+
+    return TransitionTable(name, np.array(starts, dtype=np.int64), np.array(offsets, dtype=np.int32), tuple(names), window_start, window_end)
+
+
+def transition_table(name: str) -> TransitionTable:
+    """Transition table for a zone, rebuilt once per day (cached)."""
+    return _transition_table(name, int(time.time()) // DAY)
+
+
+def utc_offsets(zones: list[str], instants: np.ndarray) -> np.ndarray:
+    """
+    UTC offsets (seconds) for every zone at every instant.
+
+    Args:
+        zones: IANA zone names
+        instants: UTC epoch seconds (int64 array)
+
+    Returns:
+        int32 array of shape (len(zones), len(instants))
+    """
+    instants = np.asarray(instants, dtype=np.int64)
+    result = np.empty((len(zones), len(instants)), dtype=np.int32)
+    for row, name in enumerate(zones):
+        table = transition_table(name)
+        idx = np.searchsorted(table.starts, instants, side="right") - 1
+        result[row] = table.offsets[np.clip(idx, 0, None)]
+
+        # Instants outside the precomputed window fall back to zoneinfo directly
+        outside = (instants < table.window_start) | (instants >= table.window_end)
+        for col in np.flatnonzero(outside):
+            result[row, col] = _offset_at(get_zone(name), int(instants[col]))[0]
+    return result
+
+
+@lru_cache(maxsize=1)
+def load_tz_cities() -> list[dict]:
+    with open(TZ_CITIES_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=1)
+def windows_zone_map() -> dict[str, str]:
+    """Lowercased Windows zone name (tz_cities.json "value") -> first IANA zone."""
+    return {entry["value"].lower(): entry["utc"][0] for entry in load_tz_cities() if entry.get("utc")}
+
+
+def _year_offsets(zone: ZoneInfo, year: int) -> set[int]:
+    """UTC offsets (seconds) a zone uses in mid-winter and mid-summer of a year."""
+    return {int(datetime(year, month, 15, 12, tzinfo=zone).utcoffset().total_seconds()) for month in (1, 7)}
+
+
+def cross_check_tz_cities(year: Optional[int] = None) -> list[dict]:
+    """
+    Compare the offsets in tz_cities.json ("(UTC+05:30) ...") against zoneinfo.
+
+    A zone agrees if the JSON offset is one it actually uses that year (standard, or
+    daylight for the "isdst" entries).
+
+    Returns:
+        One dict per IANA zone whose zoneinfo offsets disagree with the JSON (or is unknown)
+    """
+    year = year or datetime.now().year
+    mismatches = []
+    for entry in load_tz_cities():
+        match = re.match(r"\(UTC([+-])(\d{2}):(\d{2})\)", entry.get("text", ""))
+        if match:
+            sign = 1 if match.group(1) == "+" else -1
+            expected = sign * (int(match.group(2)) * 3600 + int(match.group(3)) * 60)
+        else:  # "(UTC) Coordinated Universal Time"
+            expected = 0
+
+        for name in entry.get("utc", []):
+            try:
+                actual = _year_offsets(get_zone(name), year)
+            except (ZoneInfoNotFoundError, ValueError):
+                mismatches.append({"windows_zone": entry["value"], "zone": name, "expected": expected, "actual": None})
+                continue
+            if expected not in actual:
+                mismatches.append({"windows_zone": entry["value"], "zone": name, "expected": expected, "actual": sorted(actual)})
+    return mismatches
+
+
+def resolve_zone(location: str) -> Optional[str]:
+    """Resolve an IANA zone, Windows zone name or city name to an IANA zone."""
+    location = location.strip()
+    try:
+        get_zone(location)
+        return location
+    except (ZoneInfoNotFoundError, ValueError):
+        pass
+
+    windows = windows_zone_map().get(location.lower())
+    if windows:
+        return windows
+
+    from city_index import resolve_city
+
+    return resolve_city(location)
+
+
+def times_in_zones(locations: list[str], at: Optional[datetime] = None) -> list[dict]:
+    """
+    Local time for every location at one instant (default: now), computed in one batch.
+
+    Returns:
+        One dict per location with timezone, local time, UTC offset and difference from
+        local time, or an "error" entry if the location could not be resolved
+    """
+    at = at or datetime.now(timezone.utc)
+    epoch = int(at.timestamp())
+    local_offset = at.astimezone().utcoffset().total_seconds()
+
+    resolved = [(location, resolve_zone(location)) for location in locations]
+    zones = [zone for _, zone in resolved if zone]
+    offsets = utc_offsets(zones, np.array([epoch]))[:, 0] if zones else []
+
+    results, row = [], 0
+    for location, zone in resolved:
+        if zone is None:
+            results.append({"location": location, "error": "Unknown timezone or city"})
+            continue
+        offset = int(offsets[row])
+        row += 1
+        local = datetime.fromtimestamp(epoch, tz=timezone.utc) + timedelta(seconds=offset)
+        sign = "+" if offset >= 0 else "-"
+        results.append(
+            {
+                "location": location,
+                "timezone": zone,
+                "local_time": local.strftime("%Y-%m-%d %H:%M:%S"),
+                "utc_offset": f"{sign}{abs(offset) // 3600:02d}:{abs(offset) % 3600 // 60:02d}",
+                "difference_from_local_hours": round((offset - local_offset) / 3600, 2),
+            }
+        )
+    return results
+
+
+if __name__ == "__main__":
+    mismatches = cross_check_tz_cities()
+    print(f"tz_cities.json vs zoneinfo: {len(mismatches)} mismatching zone(s)")
+    for m in mismatches[:10]:
+        print(f"  {m}")
+
+    cities = ["New York", "London", "Tokyo", "Mumbai", "Sydney", "India Standard Time", "Europe/Berlin", "America/Sao_Paulo"] * 7
+    start = time.perf_counter()
+    times_in_zones(cities)
+    print(f"First batch of {len(cities)} (builds transition tables): {(time.perf_counter() - start) * 1000:.1f} ms")
+    start = time.perf_counter()
+    for row in times_in_zones(cities)[:8]:
+        print(f"  {row}")
+    print(f"Cached batch of {len(cities)}: {(time.perf_counter() - start) * 1000:.2f} ms")
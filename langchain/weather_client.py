@@ -0,0 +1,135 @@
+"""
+Shared weather client with a short-lived per-location cache.
+
+get_current_weather used to open a new python_weather.Client (and a new event loop) for
+every call and fetch one city at a time. Here a single client lives on a background event
+loop for the whole process, so its HTTP connections are reused; results are cached per
+location for WEATHER_TTL seconds, and get_weather_many() fetches all uncached locations
+concurrently, so comparing five cities costs about one round trip.
+"""
+
+import asyncio
+import os
+import time
+
+from background_loop import BackgroundLoop
+from ttl_cache import TTLCache
+
+# Weather changes slowly; a few minutes of staleness is fine for chat answers
+WEATHER_TTL = float(os.environ.get("AIML_WEATHER_TTL", 600))
+
+_loop = BackgroundLoop("weather-client")
+_cache = TTLCache(ttl=WEATHER_TTL, maxsize=256)
+_client = None
+
+
+async def _get_client():
+    """Create the python_weather client on the background loop (once)."""
+    global _client
+    if _client is None:
+        import python_weather
+
+        _client = python_weather.Client(unit=python_weather.METRIC)
+    return _client
+
+
+async def _close_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
+
+
+_loop.register_shutdown(_close_client)
+
+
+def _cache_key(location: str) -> str:
+    return " ".join(location.lower().split())
+
+
+def _summarize(location: str, forecast) -> dict:
+    """Pick the fields the agent needs from a python_weather Forecast."""
+    result = {"location": location, "temperature_c": forecast.temperature}
+    for field in ("description", "feels_like", "humidity", "wind_speed", "precipitation"):
+        value = getattr(forecast, field, None)
+        if value is not None:
+            result[field] = value if isinstance(value, (int, float, str)) else str(value)
+    result["fetched_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    return result
+
+
+async def _fetch(location: str) -> dict:
+    client = await _get_client()
+    return _summarize(location, await client.get(location))
+
+
+async def _fetch_many(locations: list[str]) -> list:
+    return await asyncio.gather(*(_fetch(location) for location in locations), return_exceptions=True)
+
+
+def get_weather_many(locations: list[str], timeout: float = 15.0) -> list[dict]:
+    """
+    Current weather for several locations, fetching uncached ones concurrently.
+
+    Args:
+        locations: City names like 'New York', 'London', 'Tokyo'
+        timeout: Seconds to wait for the whole batch
+
+    Returns:
+        One dict per location (in order); failed lookups have an "error" key and are not cached
+    """
+    results: dict[str, dict] = {}
+    missing = []
+    for location in locations:
+        key = _cache_key(location)
+        if key in results or key in missing:
+            continue
+        cached = _cache.get(key)
+        if cached is not None:
+            results[key] = cached
+        else:
+            missing.append(key)
+
+    if missing:
+        names = {_cache_key(location): location for location in locations}
+        try:
+            fetched = _loop.run(_fetch_many([names[key] for key in missing]), timeout=timeout)
+        except TimeoutError:
+            fetched = [TimeoutError(f"no response within {timeout:g}s")] * len(missing)
+
+        for key, value in zip(missing, fetched):
+            if isinstance(value, BaseException):
+                results[key] = {"location": names[key], "error": f"{type(value).__name__}: {value}"}
+            else:
+                _cache.set(key, value)
+                results[key] = value
+
+    return [dict(results[_cache_key(location)], location=location) for location in locations]
+
+
+def get_weather(location: str, timeout: float = 15.0) -> dict:
+    """Current weather for one location (cached)."""
+    return get_weather_many([location], timeout=timeout)[0]
+
+
+def cache_stats() -> dict:
+    return _cache.stats()
+
+
+if __name__ == "__main__":
+    cities = ["New York", "London", "Tokyo", "Mumbai", "Sydney"]
+
+    start = time.perf_counter()
+    for city in cities:
+        get_weather(city)
+    print(f"Serial, one city per call (cold): {time.perf_counter() - start:.2f}s")
+
+    _cache.clear()
+    start = time.perf_counter()
+    for row in get_weather_many(cities):
+        print(f"  {row}")
+    print(f"Concurrent batch of {len(cities)} (warm connections): {time.perf_counter() - start:.2f}s")
+
+    start = time.perf_counter()
+    get_weather_many(cities)
+    print(f"Cached batch: {(time.perf_counter() - start) * 1000:.2f} ms, cache {cache_stats()}")
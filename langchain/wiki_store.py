@@ -0,0 +1,371 @@
+"""
+Local Wikipedia summary store (SQLite + FTS5).
+
+wikipedia_search needs at least two network round trips per question (search, then
+summary). Summaries fetched once are kept here with their title and fetch time, indexed
+with FTS5, and the tool answers from the store first:
+
+1. a query seen before maps straight to its article,
+2. otherwise an exact (case-insensitive) title match,
+3. otherwise an FTS5 match with every query term as a whole word in the title, accepted only
+   if the title says no more than the query (all its words are query terms), so "cat" never
+   serves Catalonia and "python" never serves Monty Python; anything else goes to the network.
+
+Entries older than WIKI_MAX_AGE are stale: the tool refreshes them from the network and
+only falls back to the stale text if that fails.
+
+On a miss, fetch_best_summary() requests the REST summaries of the top WIKI_TOP_K search
+hits concurrently on one reused aiohttp session. The best-ranked real article (not a
+disambiguation or missing page) wins as soon as every better-ranked hit has failed, and the
+requests still in flight are cancelled - one round trip instead of several serial ones.
+
+Preload articles so common lookups never touch the network:
+    python wiki_store.py import titles.txt         # one title per line, fetched from Wikipedia
+    python wiki_store.py import articles.jsonl     # {"title", "summary", "url"} per line, offline
+    python wiki_store.py lookup "theory of relativity"
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple, Optional
+
+from background_loop import BackgroundLoop
+from mlutils import get_cache_dir
+from search_cache import normalize_query
+
+WIKI_MAX_AGE = float(os.environ.get("AIML_WIKI_MAX_AGE", 30 * 86400))
+SUMMARY_SENTENCES = 5
+# Search hits whose summaries are fetched concurrently on a store miss
+WIKI_TOP_K = int(os.environ.get("AIML_WIKI_TOP_K", 4))
+REST_SUMMARY_URL = "https://en.wikipedia.org/api/rest_v1/page/summary/{}"
+USER_AGENT = "aiml-langchain-examples/1.0 (wikipedia_search tool)"
+
+# Question and function words: ignored when matching a query against titles ("what is a cat?" -> Cat)
+TITLE_STOP_WORDS = frozenset(
+    "a an and are as at be can do does for how i in is it me my of on or please "
+    "show tell that the this was were what when where which who why will you".split()
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL UNIQUE COLLATE NOCASE,
+    summary TEXT NOT NULL,
+    url TEXT,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS queries (
+    query TEXT PRIMARY KEY,
+    title TEXT NOT NULL COLLATE NOCASE
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(title, summary, content='articles', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+    INSERT INTO articles_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary);
+END;
+CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE ON articles BEGIN
+    INSERT INTO articles_fts(articles_fts, rowid, title, summary) VALUES ('delete', old.id, old.title, old.summary);
+    INSERT INTO articles_fts(rowid, title, summary) VALUES (new.id, new.title, new.summary);
+END;
+"""
+
+
+class Article(NamedTuple):
+    title: str
+    summary: str
+    url: Optional[str]
+    fetched_at: float
+
+    @property
+    def stale(self) -> bool:
+        return time.time() - self.fetched_at > WIKI_MAX_AGE
+
+
+def _title_terms(text: str) -> list[str]:
+    """Normalized words of a query or title without question and function words."""
+    words = normalize_query(text).split()
+    return [w for w in words if w not in TITLE_STOP_WORDS] or words
+
+
+def _fts_query(query: str) -> Optional[str]:
+    """FTS5 query requiring every title term of the query as a whole word in the title ('"a" AND "b"')."""
+    terms = [t.replace('"', "") for t in _title_terms(query)]
+    terms = [t for t in terms if t]
+    if not terms:
+        return None
+    return " AND ".join(f'title:"{t}"' for t in terms)
+
+
+def _title_answers(title: str, query: str) -> bool:
+    """True if a title is the query itself or made only of query terms ("Cat" for "what is a cat?")."""
+    title_terms, query_terms = _title_terms(title), _title_terms(query)
+    return title_terms == query_terms or set(title_terms) <= set(query_terms)
+
+
+class WikiStore:
+    """
+    Persistent summary store, safe to share between threads.
+
+    Args:
+        path: SQLite file (created if missing)
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+
+    def get(self, title: str) -> Optional[Article]:
+        """Article by exact title (case-insensitive)."""
+        with self._lock:
+            row = self._conn.execute("SELECT title, summary, url, fetched_at FROM articles WHERE title = ?", (title,)).fetchone()
+        return Article(*row) if row else None
+
+    def put(self, title: str, summary: str, url: Optional[str] = None, query: Optional[str] = None, fetched_at: Optional[float] = None):
+        """Insert or refresh an article, optionally remembering the query that found it."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO articles(title, summary, url, fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(title) DO UPDATE SET summary = excluded.summary, url = excluded.url, fetched_at = excluded.fetched_at",
+                (title, summary, url, fetched_at or time.time()),
+            )
+            if query:
+                self._conn.execute("INSERT OR REPLACE INTO queries VALUES (?, ?)", (normalize_query(query), title))
+
+    def put_many(self, articles: list[dict]) -> int:
+        """Bulk insert {"title", "summary", "url"} dicts in one transaction."""
+        now = time.time()
+        rows = [(a["title"], a["summary"], a.get("url"), a.get("fetched_at") or now) for a in articles if a.get("title") and a.get("summary")]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO articles(title, summary, url, fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(title) DO UPDATE SET summary = excluded.summary, url = excluded.url, fetched_at = excluded.fetched_at",
+                rows,
+            )
+        return len(rows)
+
+    def search(self, query: str, limit: int = 5) -> list[Article]:
+        """Articles whose title contains every query term as a word, best bm25 match first."""
+        match = _fts_query(query)
+        if match is None:
+            return []
+        with self._lock:
+            try:
+                rows = self._conn.execute(
+                    "SELECT a.title, a.summary, a.url, a.fetched_at FROM articles_fts f JOIN articles a ON a.id = f.rowid "
+                    "WHERE articles_fts MATCH ? ORDER BY bm25(articles_fts, 10.0, 1.0) LIMIT ?",
+                    (match, limit),
+                ).fetchall()
+            except sqlite3.OperationalError:
+                return []
+        return [Article(*row) for row in rows]
+
+    def lookup(self, query: str) -> Optional[Article]:
+        """Best local answer for a query (remembered query, exact title, then FTS), stale or not."""
+        with self._lock:
+            row = self._conn.execute("SELECT title FROM queries WHERE query = ?", (normalize_query(query),)).fetchone()
+        if row:
+            article = self.get(row[0])
+            if article:
+                return article
+
+        article = self.get(query.strip())
+        if article:
+            return article
+
+        # Titles with extra words are other topics ("Monty Python" for "python"): ask the network
+        return next((match for match in self.search(query) if _title_answers(match.title, query)), None)
+
+
+def fetch_summary(title: str) -> dict:
+    """
+    Fetch one article summary from Wikipedia (no auto-suggest).
+
+    Raises:
+        wikipedia.DisambiguationError / wikipedia.PageError as the wikipedia library does
+    """
+    import wikipedia
+
+    summary = wikipedia.summary(title, sentences=SUMMARY_SENTENCES, auto_suggest=False)
+    return {"title": title, "summary": summary, "url": f"https://en.wikipedia.org/wiki/{title.replace(' ', '_')}"}
+
+
+_loop = BackgroundLoop("wikipedia-client")
+_session = None
+
+
+async def _get_session():
+    """One aiohttp session on the background loop, reused for every summary request."""
+    global _session
+    if _session is None or _session.closed:
+        import aiohttp
+
+        _session = aiohttp.ClientSession(headers={"User-Agent": USER_AGENT}, timeout=aiohttp.ClientTimeout(total=15))
+    return _session
+
+
+async def _close_session():
+    if _session is not None and not _session.closed:
+        await _session.close()
+
+
+_loop.register_shutdown(_close_session)
+
+
+async def _rest_summary(title: str) -> Optional[dict]:
+    """Summary of one page from the REST API, or None for missing and disambiguation pages."""
+    from urllib.parse import quote
+
+    session = await _get_session()
+    async with session.get(REST_SUMMARY_URL.format(quote(title.replace(" ", "_"), safe=""))) as response:
+        if response.status == 404:
+            return None
+        response.raise_for_status()
+        data = await response.json()
+    if data.get("type") != "standard" or not data.get("extract"):
+        return None
+    url = data.get("content_urls", {}).get("desktop", {}).get("page")
+    return {"title": data.get("title", title), "summary": data["extract"], "url": url}
+
+
+async def _best_of(titles: list[str]) -> tuple[Optional[dict], list[str]]:
+    """
+    Fetch all summaries concurrently; return the highest-ranked valid one as soon as every
+    better-ranked title has failed, cancelling the requests still in flight.
+    """
+    tasks = [asyncio.ensure_future(_rest_summary(title)) for title in titles]
+    outcomes: dict[int, Optional[dict]] = {}
+    errors = []
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                rank = tasks.index(task)
+                try:
+                    outcomes[rank] = task.result()
+                except Exception as e:
+                    outcomes[rank] = None
+                    errors.append(f"{titles[rank]}: {e}")
+
+            # Walk down the ranking; stop at the first title still in flight
+            for rank in range(len(tasks)):
+                if rank not in outcomes:
+                    break
+                if outcomes[rank] is not None:
+                    return outcomes[rank], errors
+        return None, errors
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def fetch_best_summary(titles: list[str], timeout: float = 10.0) -> tuple[Optional[dict], list[str]]:
+    """
+    Fetch summaries for search hits concurrently, first valid (by search rank) wins.
+
+    Args:
+        titles: Search result titles, best first
+        timeout: Seconds to wait overall
+
+    Returns:
+        (article dict or None if no hit is a real article, list of per-title errors)
+    """
+    if not titles:
+        return None, []
+    try:
+        return _loop.run(_best_of(titles), timeout=timeout)
+    except TimeoutError:
+        return None, [f"no summary within {timeout:g}s"]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> WikiStore:
+    """Shared store at AIML_WIKI_STORE or .cache/wikipedia.sqlite."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = WikiStore(os.environ.get("AIML_WIKI_STORE") or str(get_cache_dir() / "wikipedia.sqlite"))
+    return _store
+
+
+def import_articles(source: str, store: WikiStore, workers: int = 8) -> tuple[int, list[str]]:
+    """
+    Bulk-load articles from a JSONL file (offline) or a titles file (fetched concurrently).
+
+    Returns:
+        (number of articles stored, titles that failed)
+    """
+    with open(source, encoding="utf-8") as f:
+        lines = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    if source.endswith((".jsonl", ".json")):
+        return store.put_many([json.loads(line) for line in lines]), []
+
+    fetched, failed = [], []
+
+    def fetch(title: str):
+        try:
+            fetched.append(fetch_summary(title))
+        except Exception:
+            failed.append(title)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(fetch, lines))
+    return store.put_many(fetched), failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Wikipedia summary store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    load = subparsers.add_parser("import", help="Preload articles from a titles file or JSONL export")
+    load.add_argument("source")
+    load.add_argument("--workers", type=int, default=8)
+
+    lookup = subparsers.add_parser("lookup", help="Look up queries in the local store only")
+    lookup.add_argument("queries", nargs="+")
+
+    subparsers.add_parser("stats", help="Show store size")
+
+    args = parser.parse_args()
+    store = get_store()
+
+    if args.command == "import":
+        start = time.perf_counter()
+        count, failed = import_articles(args.source, store, args.workers)
+        print(f"Stored {count} articles in {store.path} in {time.perf_counter() - start:.1f}s")
+        if failed:
+            print(f"Failed ({len(failed)}): {', '.join(failed[:20])}")
+    elif args.command == "lookup":
+        for query in args.queries:
+            start = time.perf_counter()
+            article = store.lookup(query)
+            elapsed = (time.perf_counter() - start) * 1000
+            if article:
+                print(f"{query}: {article.title}{' (stale)' if article.stale else ''} ({elapsed:.2f} ms)\n  {article.summary[:200]}")
+            else:
+                print(f"{query}: not in store ({elapsed:.2f} ms)")
+    else:
+        print(f"{store.path}: {len(store)} articles")
+
+
+if __name__ == "__main__":
+    main()